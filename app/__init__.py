@@ -2,7 +2,7 @@
 Chat room intent analysis package
 """
 from app.admin import init_admin  # add this import at the top
-from flask import Flask
+from flask import Flask, request, jsonify
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import LoginManager
 from flask_socketio import SocketIO
@@ -17,7 +17,7 @@ from datetime import datetime, UTC
 db = SQLAlchemy()
 migrate = Migrate()
 login_manager = LoginManager()
-socketio = SocketIO(async_mode='threading', cors_allowed_origins="*", logger=True, engineio_logger=True)
+socketio = SocketIO()
 mail = Mail()
 
 def start_intent_updater():
@@ -70,15 +70,64 @@ def start_intent_updater():
     updater_thread = threading.Thread(target=run_updater, daemon=True)
     updater_thread.start()
 
-def create_app():
+def start_model_preload(app):
+    """Warm up the text analysis models according to PRELOAD_MODELS"""
+    from app.text_analysis import text_analyzer
+    
+    mode = app.config.get('PRELOAD_MODELS', 'off')
+    if mode == 'sync':
+        # Runs in the gunicorn master (preload_app) before workers are forked
+        text_analyzer.warm_up(freeze=True)
+    elif mode == 'background':
+        warmup_thread = threading.Thread(target=text_analyzer.warm_up, daemon=True)
+        warmup_thread.start()
+    else:
+        # Lazy loading - models load on first use, nothing to wait for
+        text_analyzer.models_ready.set()
+    
+    @app.before_request
+    def readiness_gate():
+        """Hold back traffic until the models are warm"""
+        if text_analyzer.models_ready.is_set():
+            return None
+        if request.endpoint in ('main.readiness', 'static'):
+            return None
+        response = jsonify({'status': 'warming_up'})
+        response.status_code = 503
+        response.headers['Retry-After'] = '5'
+        return response
+
+def message_queue_options(app):
+    """SocketIO options for the SOCKETIO_MESSAGE_QUEUE broadcast fan-out"""
+    from app.socket_queue import make_client_manager
+    
+    url = app.config.get('SOCKETIO_MESSAGE_QUEUE')
+    channel = app.config.get('SOCKETIO_CHANNEL', 'flask-socketio')
+    if not url:
+        return {}
+    manager = make_client_manager(url, channel=channel,
+                                  max_bytes=app.config.get('SOCKETIO_FILE_QUEUE_MAX_BYTES'))
+    if manager is not None:
+        return {'client_manager': manager}
+    # redis:// and Kombu URLs are handled by Flask-SocketIO
+    return {'message_queue': url, 'channel': channel}
+
+def create_app(config_class=Config):
     app = Flask(__name__)
-    app.config.from_object(Config)
+    app.config.from_object(config_class)
+
+    # Serving mode (SOCKETIO_ASYNC_MODE); adjusts the engine options, so it
+    # runs before the database is set up
+    from app.async_mode import configure as configure_async_mode
+    async_mode = configure_async_mode(app)
 
     db.init_app(app)
     migrate.init_app(app, db)
     login_manager.init_app(app)
     login_manager.login_view = 'auth.login'
-    socketio.init_app(app, async_mode='threading', cors_allowed_origins="*", logger=True, engineio_logger=True)
+    socketio.init_app(app, async_mode=async_mode, cors_allowed_origins="*",
+                      logger=app.config['SOCKETIO_LOGGER'], engineio_logger=app.config['SOCKETIO_LOGGER'],
+                      **message_queue_options(app))
     mail.init_app(app)
 
     # Register custom Jinja2 filters
@@ -103,6 +152,10 @@ def create_app():
         os.makedirs(UPLOAD_FOLDER)
     app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
 
+    # Register CLI commands
+    from app.cli import register_commands
+    register_commands(app)
+
     # Initialize admin after everything else
     init_admin(app, db)
 
@@ -110,13 +163,72 @@ def create_app():
     from app.scheduler import init_scheduler
     scheduler = init_scheduler(app)
 
-    # Import socket event handlers
+    # Register the socket event handlers (one per event, see app/socket_router.py)
     with app.app_context():
         from app import events
+        from app.socket_router import event_router
+        event_router.init_socketio(socketio)
 
     # Start the intent updater when the app starts
     start_intent_updater()
 
+    # Model memory budget and idle eviction
+    from app.model_registry import model_registry
+    model_registry.init_app(app)
+
+    # Bounded concurrency for model calls
+    from app.inference import inference_executor, topic_executor
+    inference_executor.init_app(app)
+    topic_executor.init_app(app, prefix='TOPIC_INFERENCE')
+
+    # Cache of per-message analysis results
+    from app.analysis_cache import analysis_cache
+    analysis_cache.init_app(app)
+
+    # Incremental room keyword summaries
+    from app.room_keywords import room_keywords
+    room_keywords.init_app(app)
+
+    # Near-duplicate (copy-paste flood) detection
+    from app.near_duplicate import near_duplicates
+    near_duplicates.init_app(app)
+
+    # Shared message processing pipeline
+    from app.pipeline import message_pipeline
+    message_pipeline.init_app(app)
+
+    # Per-user socket event rate limits
+    from app.rate_limit import rate_limiter
+    rate_limiter.init_app(app)
+
+    # In-memory room presence with batched membership writes
+    from app.presence import presence
+    presence.init_app(app)
+
+    # Optional group commit for message inserts
+    from app.write_behind import group_commit
+    group_commit.init_app(app)
+
+    # Sequenced room events for catching up after a reconnect
+    from app.room_log import room_log
+    room_log.init_app(app)
+
+    # Batched broadcasts for busy rooms
+    from app.room_batch import room_batcher
+    room_batcher.init_app(app, socketio)
+
+    # Outbound queue limits and slow-client eviction
+    from app.outbound import outbound_guard
+    outbound_guard.init_app(app)
+    outbound_guard.init_socketio(socketio)
+
+    # Coalesced vote_updated broadcasts
+    from app.vote_broadcast import vote_broadcaster
+    vote_broadcaster.init_app(app, socketio)
+
+    # Warm up analysis models (see Config.PRELOAD_MODELS)
+    start_model_preload(app)
+
     return app
 
 from app import models 
\ No newline at end of file
@@ -0,0 +1,182 @@
+"""
+Two-tier cache for TextAnalyzer.analyze_message results
+
+Repeated messages ("hi", "thanks", "ok") and re-analysis backfills would
+otherwise run the rule matcher and up to two transformer models again. Results
+are kept in an in-memory LRU in front of a SQLite file shared by every worker
+process. Keys are a hash of the normalized text plus the model/rule versions,
+so changing a model or a rule table never serves a stale result.
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+def normalize_text(text):
+    """Case and whitespace insensitive form of a message used as the cache key"""
+    return ' '.join(text.lower().split())
+
+class AnalysisCache:
+    def __init__(self, path=None, memory_size=2048, max_entries=100000, ttl=7 * 24 * 3600):
+        self.path = path  # None = memory tier only
+        self.memory_size = memory_size
+        self.max_entries = max_entries
+        self.ttl = ttl  # seconds, 0 = never expire
+        self._lock = threading.Lock()
+        self._memory = OrderedDict()  # key -> (stored_at, result)
+        self._conn = None
+        self._conn_pid = None
+        self._writes = 0
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def init_app(self, app):
+        """Apply the ANALYSIS_CACHE_* settings"""
+        with self._lock:
+            self.path = app.config.get('ANALYSIS_CACHE_PATH', self.path) or None
+            self.memory_size = app.config.get('ANALYSIS_CACHE_MEMORY_SIZE', self.memory_size)
+            self.max_entries = app.config.get('ANALYSIS_CACHE_MAX_ENTRIES', self.max_entries)
+            self.ttl = app.config.get('ANALYSIS_CACHE_TTL', self.ttl)
+            self._memory.clear()
+            self._close()
+
+    def key(self, text, version):
+        return hashlib.sha1(f"{version}\0{normalize_text(text)}".encode('utf-8')).hexdigest()
+
+    def get(self, text, version):
+        """Return the cached result for text, or None"""
+        key = self.key(text, version)
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None and not self._expired(entry[0], now):
+                self._memory.move_to_end(key)
+                self.memory_hits += 1
+                return entry[1]
+            self._memory.pop(key, None)
+
+            row = None
+            conn = self._connection()
+            if conn is not None:
+                try:
+                    row = conn.execute(
+                        'SELECT stored_at, result FROM analysis_cache WHERE key = ?', (key,)
+                    ).fetchone()
+                except sqlite3.Error as e:
+                    print(f"Error reading analysis cache: {e}")
+            if row is None or self._expired(row[0], now):
+                self.misses += 1
+                return None
+
+            result = json.loads(row[1])
+            self._remember(key, row[0], result)
+            self.disk_hits += 1
+            return result
+
+    def set(self, text, version, result):
+        """Store a result in both tiers"""
+        key = self.key(text, version)
+        now = time.time()
+        with self._lock:
+            self._remember(key, now, result)
+            conn = self._connection()
+            if conn is None:
+                return
+            try:
+                conn.execute(
+                    'INSERT OR REPLACE INTO analysis_cache (key, stored_at, result) VALUES (?, ?, ?)',
+                    (key, now, json.dumps(result))
+                )
+                conn.commit()
+                self._writes += 1
+                if self._writes % 500 == 0:
+                    self._prune(now)
+            except sqlite3.Error as e:
+                print(f"Error writing analysis cache: {e}")
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            conn = self._connection()
+            if conn is not None:
+                conn.execute('DELETE FROM analysis_cache')
+                conn.commit()
+
+    def stats(self):
+        """Hit rates and sizes of both tiers"""
+        with self._lock:
+            lookups = self.memory_hits + self.disk_hits + self.misses
+            disk_entries = 0
+            conn = self._connection()
+            if conn is not None:
+                try:
+                    disk_entries = conn.execute('SELECT COUNT(*) FROM analysis_cache').fetchone()[0]
+                except sqlite3.Error:
+                    pass
+            return {
+                'memory_entries': len(self._memory),
+                'disk_entries': disk_entries,
+                'memory_hits': self.memory_hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'hit_rate': round((self.memory_hits + self.disk_hits) / lookups, 3) if lookups else 0.0
+            }
+
+    def _expired(self, stored_at, now):
+        return bool(self.ttl) and now - stored_at > self.ttl
+
+    def _remember(self, key, stored_at, result):
+        self._memory[key] = (stored_at, result)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_size:
+            self._memory.popitem(last=False)
+
+    def _prune(self, now):
+        """Drop expired rows, then the oldest rows over the size cap"""
+        conn = self._conn
+        if self.ttl:
+            conn.execute('DELETE FROM analysis_cache WHERE stored_at < ?', (now - self.ttl,))
+        if self.max_entries:
+            conn.execute(
+                'DELETE FROM analysis_cache WHERE key IN ('
+                'SELECT key FROM analysis_cache ORDER BY stored_at DESC LIMIT -1 OFFSET ?)',
+                (self.max_entries,)
+            )
+        conn.commit()
+
+    def _connection(self):
+        # One connection per process: sqlite connections must not cross a fork
+        if self.path is None:
+            return None
+        if self._conn is None or self._conn_pid != os.getpid():
+            try:
+                os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+                self._conn = sqlite3.connect(self.path, timeout=5, check_same_thread=False)
+                self._conn.execute('PRAGMA journal_mode=WAL')
+                self._conn.execute(
+                    'CREATE TABLE IF NOT EXISTS analysis_cache ('
+                    'key TEXT PRIMARY KEY, stored_at REAL NOT NULL, result TEXT NOT NULL)'
+                )
+                self._conn.execute(
+                    'CREATE INDEX IF NOT EXISTS ix_analysis_cache_stored_at ON analysis_cache (stored_at)'
+                )
+                self._conn.commit()
+                self._conn_pid = os.getpid()
+            except sqlite3.Error as e:
+                print(f"Error opening analysis cache {self.path}: {e}")
+                self._conn = None
+                self.path = None
+        return self._conn
+
+    def _close(self):
+        if self._conn is not None and self._conn_pid == os.getpid():
+            self._conn.close()
+        self._conn = None
+        self._conn_pid = None
+
+# Create a global instance
+analysis_cache = AnalysisCache()
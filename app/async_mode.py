@@ -0,0 +1,86 @@
+"""
+Socket.IO serving modes: threading (default) or eventlet/gevent green threads
+
+In threading mode every websocket holds an OS thread, which caps a box at a
+few hundred connections. With SOCKETIO_ASYNC_MODE=eventlet (or gevent) every
+connection is a green thread and one worker holds thousands of them - as
+long as nothing blocks the event loop:
+
+- the process must be monkey patched before anything else is imported;
+  wsgi.py does this, so green modes are served through it;
+- CPU-bound work (model inference) must not run on a green thread, since it
+  never yields. ``offload`` runs a call on a real OS thread and lets the
+  green thread wait cooperatively; InferenceExecutor uses it for every
+  model call;
+- database drivers must be cooperative. psycopg2 is made green with
+  psycogreen when installed. SQLite calls are short and run inline, but a
+  locked database would stall every connection while the driver waits, so
+  the busy timeout is capped at SQLITE_BUSY_TIMEOUT in green modes.
+"""
+import sys
+
+GREEN_MODES = ('eventlet', 'gevent')
+ASYNC_MODES = ('threading',) + GREEN_MODES
+
+_mode = 'threading'
+
+def is_patched(mode):
+    if mode == 'eventlet':
+        from eventlet import patcher
+        return patcher.is_monkey_patched('socket')
+    if mode == 'gevent':
+        from gevent import monkey
+        return monkey.is_module_patched('socket')
+    return True
+
+def configure(app):
+    """Check the serving mode and make the database access cooperative.
+
+    Called from create_app before the database is initialised.
+    """
+    global _mode
+    mode = app.config.get('SOCKETIO_ASYNC_MODE', 'threading')
+    if mode not in ASYNC_MODES:
+        raise ValueError(f"SOCKETIO_ASYNC_MODE must be one of {', '.join(ASYNC_MODES)}, not '{mode}'")
+    _mode = mode
+    if mode not in GREEN_MODES:
+        return mode
+
+    if not is_patched(mode):
+        print(f"WARNING: SOCKETIO_ASYNC_MODE={mode} but the process is not monkey patched; "
+              f"start it through wsgi.py (gunicorn -c gunicorn.conf.py wsgi:app)")
+
+    uri = app.config.get('SQLALCHEMY_DATABASE_URI', '')
+    if uri.startswith('sqlite'):
+        options = dict(app.config.get('SQLALCHEMY_ENGINE_OPTIONS') or {})
+        connect_args = dict(options.get('connect_args') or {})
+        connect_args.setdefault('timeout', app.config.get('SQLITE_BUSY_TIMEOUT', 1.0))
+        options['connect_args'] = connect_args
+        app.config['SQLALCHEMY_ENGINE_OPTIONS'] = options
+    elif uri.startswith('postgres'):
+        try:
+            if mode == 'eventlet':
+                from psycogreen.eventlet import patch_psycopg
+            else:
+                from psycogreen.gevent import patch_psycopg
+            patch_psycopg()
+        except ImportError:
+            print("WARNING: psycogreen is not installed; PostgreSQL queries will block the event loop")
+    return mode
+
+def offload(fn, *args, **kwargs):
+    """Run a blocking or CPU-bound call without stalling the event loop.
+
+    In green modes the call runs on a real OS thread while the calling green
+    thread yields; in threading mode it simply runs in the caller's thread.
+    """
+    if _mode == 'eventlet' and 'eventlet' in sys.modules:
+        from eventlet import tpool
+        return tpool.execute(fn, *args, **kwargs)
+    if _mode == 'gevent' and 'gevent' in sys.modules:
+        import gevent
+        return gevent.get_hub().threadpool.apply(fn, args, kwargs)
+    return fn(*args, **kwargs)
+
+def current_mode():
+    return _mode
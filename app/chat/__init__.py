@@ -2,4 +2,4 @@ from flask import Blueprint
 
 bp = Blueprint('chat', __name__)
 
-from app.chat import routes, events 
\ No newline at end of file
+from app.chat import routes 
\ No newline at end of file
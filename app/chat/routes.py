@@ -1,15 +1,13 @@
 from flask import render_template, redirect, url_for, flash, request, jsonify
 from flask_login import login_required, current_user
-from app import db, socketio
+from app import db
 from app.chat import bp
 from app.models import Room, Message, RoomMembership
 from app.forms import CreateRoomForm
 from app.text_analysis import text_analyzer
-from app.moderation import check_message
 from datetime import datetime, timedelta
 import json
 from collections import defaultdict
-from flask_socketio import emit, join_room, leave_room
 
 # Predefined lists of states and products
 INDIAN_STATES = [
@@ -63,7 +61,7 @@ def rooms():
 @login_required
 def room(room_id):
     room = Room.query.get_or_404(room_id)
-    messages = Message.query.filter_by(room_id=room_id).order_by(Message.timestamp.asc()).all()
+    messages = Message.query.filter_by(room_id=room_id, is_flagged=False).order_by(Message.timestamp.asc()).all()
     
     # Create or update room membership
     membership = RoomMembership.query.filter_by(user_id=current_user.id, room_id=room_id).first()
@@ -115,6 +113,39 @@ def room_topics(room_id):
             'error': str(e)
         })
 
+@bp.route('/room/<int:room_id>/keywords')
+@login_required
+def room_keywords_summary(room_id):
+    """Get the current keyphrases for a room (cheap, updated incrementally)."""
+    from app.room_keywords import room_keywords
+    from app.inference import topic_executor
+    
+    room = Room.query.get_or_404(room_id)
+    if not room_keywords.is_loaded(room.id):
+        recent = Message.query.filter_by(room_id=room.id, is_flagged=False)\
+            .order_by(Message.timestamp.desc())\
+            .limit(room_keywords.window).all()
+        room_keywords.load_room(room.id, [(m.id, m.content) for m in reversed(recent)])
+    
+    try:
+        # Runs on the topic lane; any other changed rooms are summarized in
+        # the same batch
+        keywords = topic_executor.run(
+            lambda: room_keywords.keywords(room.id, text_analyzer.keyword_model),
+            fallback=lambda: None
+        )
+        if keywords is None:
+            return jsonify({'success': False, 'error': 'Keyword summary is busy, try again shortly'}), 503
+        return jsonify({
+            'success': True,
+            'keywords': [{'phrase': phrase, 'score': score} for phrase, score in keywords]
+        })
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        })
+
 @bp.route('/room/<int:room_id>/leave')
 @login_required
 def leave_room(room_id):
@@ -193,147 +224,3 @@ def room_analytics(room_id):
         'intent_distribution': intent_distribution,
         'last_update': datetime.utcnow().isoformat()
     })
-
-@socketio.on('join')
-def on_join(data):
-    """Event handler for when a user joins a room."""
-    room_id = data.get('room_id')
-    if room_id:
-        join_room(room_id)
-        emit('user_joined', {
-            'username': current_user.username,
-            'room_id': room_id
-        }, room=room_id)
-
-@socketio.on('leave')
-def on_leave(data):
-    """Event handler for when a user leaves a room."""
-    room_id = data.get('room_id')
-    if room_id:
-        leave_room(room_id)
-        emit('user_left', {
-            'username': current_user.username,
-            'room_id': room_id
-        }, room=room_id)
-
-@socketio.on('message')
-def handle_message(data):
-    """Event handler for new messages."""
-    if not current_user.is_authenticated:
-        emit('error', {'message': 'You must be logged in to send messages'}, room=request.sid)
-        return
-        
-    room_id = data.get('room_id')
-    content = data.get('content', '').strip()
-    is_question = data.get('is_question', False)
-    points_offered = data.get('points_offered', 0)
-    
-    if not room_id or not content:
-        emit('error', {'message': 'Invalid message data'}, room=request.sid)
-        return
-        
-    try:
-        # Check message content first - STRICT MODERATION
-        is_appropriate, warning = check_message(content)
-        if not is_appropriate:
-            print(f"Blocked inappropriate message from {current_user.username}: {content}")
-            emit('error', {'message': warning}, room=request.sid)
-            return
-            
-        # Points check for questions
-        if is_question and points_offered > 0:
-            if not current_user.can_afford_question(points_offered):
-                emit('error', {'message': 'Not enough points to ask this question'}, room=request.sid)
-                return
-                
-            if not current_user.deduct_points(points_offered):
-                emit('error', {'message': 'Failed to deduct points'}, room=request.sid)
-                return
-        
-        # Create and save message
-        message = Message(
-            content=content,
-            author=current_user,
-            room_id=room_id,
-            is_question=is_question,
-            points_offered=points_offered if is_question else 0
-        )
-        
-        db.session.add(message)
-        db.session.commit()
-        
-        # Broadcast the message
-        emit('message', {
-            'id': message.id,
-            'content': message.content,
-            'username': current_user.username,
-            'timestamp': message.timestamp.strftime('%H:%M'),
-            'is_question': message.is_question,
-            'points_offered': message.points_offered,
-            'user_id': current_user.id,
-            'parent_id': message.parent_id,
-            'accepted_answer_id': message.accepted_answer_id if hasattr(message, 'accepted_answer_id') else None
-        }, room=room_id)
-        
-    except Exception as e:
-        print(f"Error in handle_message: {str(e)}")
-        db.session.rollback()
-        emit('error', {'message': 'Error saving message'}, room=request.sid)
-
-@socketio.on('answer')
-def handle_answer(data):
-    """Event handler for answers to questions."""
-    if not current_user.is_authenticated:
-        emit('error', {'message': 'You must be logged in to answer questions'}, room=request.sid)
-        return
-        
-    room_id = data.get('room_id')
-    content = data.get('content', '').strip()
-    question_id = data.get('question_id')
-    
-    if not all([room_id, content, question_id]):
-        emit('error', {'message': 'Missing required data for answer'}, room=request.sid)
-        return
-        
-    try:
-        # Check answer content first - STRICT MODERATION
-        is_appropriate, warning = check_message(content)
-        if not is_appropriate:
-            print(f"Blocked inappropriate answer from {current_user.username}: {content}")
-            emit('error', {'message': warning}, room=request.sid)
-            return
-            
-        # Get the question being answered
-        question = Message.query.get(question_id)
-        if not question or not question.is_question:
-            emit('error', {'message': 'Invalid question ID'}, room=request.sid)
-            return
-            
-        # Create answer message
-        answer = Message(
-            content=content,
-            author=current_user,
-            room_id=room_id,
-            parent_id=question_id,
-            is_answer=True
-        )
-        
-        db.session.add(answer)
-        db.session.commit()
-        
-        # Broadcast the answer
-        emit('message', {
-            'id': answer.id,
-            'content': answer.content,
-            'username': current_user.username,
-            'timestamp': answer.timestamp.strftime('%H:%M'),
-            'is_answer': True,
-            'parent_id': question_id,
-            'user_id': current_user.id,
-            'room_id': room_id
-        }, room=room_id)
-        
-    except Exception as e:
-        print(f"Error in handle_answer: {str(e)}")
-        db.session.rollback()
-        emit('error', {'message': 'Error saving answer'}, room=request.sid) 
\ No newline at end of file
@@ -0,0 +1,175 @@
+"""
+Flask CLI commands (run with ``flask --app run <command>``)
+"""
+import json
+import os
+import re
+import subprocess
+import sys
+import tempfile
+
+import click
+
+# Modules that must never be imported just by starting the app
+HEAVY_MODULES = ['spacy', 'transformers', 'torch', 'bertopic', 'keybert', 'hdbscan', 'umap', 'sklearn', 'nltk']
+
+# Startup budget in seconds, checked by `flask startup-report` and test_startup_time.py
+STARTUP_BUDGET_SECONDS = float(os.environ.get('STARTUP_BUDGET_SECONDS', 5.0))
+
+STARTUP_SCRIPT = """
+import time
+start = time.perf_counter()
+from app import create_app
+create_app()
+print('\\nSTARTUP_SECONDS=%f' % (time.perf_counter() - start), flush=True)
+"""
+
+def parse_importtime(stderr):
+    """Parse `python -X importtime` output into a list of import records.
+
+    Each record is a dict with the module name, its nesting depth and the
+    self/cumulative import time in microseconds.
+    """
+    records = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'imported package' in line:
+            continue
+        try:
+            parts = line[len('import time:'):].split('|')
+            self_us, cumulative_us, name = int(parts[0]), int(parts[1]), parts[2]
+        except (ValueError, IndexError):
+            continue
+        depth = (len(name) - len(name.lstrip(' ')) - 1) // 2
+        records.append({
+            'module': name.strip(),
+            'depth': depth,
+            'self_us': self_us,
+            'cumulative_us': cumulative_us
+        })
+    return records
+
+def measure_startup():
+    """Start the app in a fresh interpreter with -X importtime.
+
+    Runs from a temporary directory so the background jobs started by
+    create_app do not touch the working copy. Returns a dict with the wall
+    clock startup time, the total import time and the parsed import records.
+    """
+    project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = dict(os.environ)
+    env['PYTHONPATH'] = project_root + os.pathsep + env.get('PYTHONPATH', '')
+    env['PRELOAD_MODELS'] = 'off'
+
+    with tempfile.TemporaryDirectory() as workdir:
+        result = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', STARTUP_SCRIPT],
+            cwd=workdir,
+            env=env,
+            capture_output=True,
+            text=True,
+            timeout=300
+        )
+
+    # Background threads started by create_app may interleave their output
+    match = re.search(r'STARTUP_SECONDS=([0-9.]+)', result.stdout)
+    if not match:
+        raise RuntimeError(f"App failed to start:\n{result.stderr[-2000:]}")
+
+    records = parse_importtime(result.stderr)
+    top_level = [r for r in records if r['depth'] == 0]
+    imported = {r['module'] for r in records}
+    return {
+        'startup_seconds': float(match.group(1)),
+        'import_seconds': sum(r['cumulative_us'] for r in top_level) / 1e6,
+        'heavy_modules': [m for m in HEAVY_MODULES if m in imported],
+        'records': records
+    }
+
+def register_commands(app):
+    """Register the project's CLI commands on the app"""
+
+    @app.cli.command('startup-report')
+    @click.option('--top', default=25, help='Number of slowest imports to show.')
+    @click.option('--budget', type=float, default=STARTUP_BUDGET_SECONDS, show_default=True,
+                  help='Fail if startup takes longer than this many seconds.')
+    @click.option('--as-json', is_flag=True, help='Print the report as JSON.')
+    def startup_report(top, budget, as_json):
+        """Show an -X importtime style breakdown of app startup."""
+        report = measure_startup()
+        slowest = sorted(report['records'], key=lambda r: r['cumulative_us'], reverse=True)[:top]
+
+        if as_json:
+            click.echo(json.dumps({
+                'startup_seconds': report['startup_seconds'],
+                'import_seconds': report['import_seconds'],
+                'heavy_modules': report['heavy_modules'],
+                'slowest': slowest
+            }, indent=2))
+        else:
+            click.echo(f"Startup time: {report['startup_seconds']:.3f}s "
+                       f"(imports: {report['import_seconds']:.3f}s)")
+            click.echo(f"{'cumulative ms':>14} {'self ms':>9}  module")
+            for r in slowest:
+                click.echo(f"{r['cumulative_us'] / 1000:>14.1f} {r['self_us'] / 1000:>9.1f}  "
+                           f"{'  ' * r['depth']}{r['module']}")
+            if report['heavy_modules']:
+                click.echo(f"WARNING: heavy ML modules imported at startup: "
+                           f"{', '.join(report['heavy_modules'])}")
+
+        if report['startup_seconds'] > budget:
+            raise click.ClickException(
+                f"Startup took {report['startup_seconds']:.3f}s, over the {budget:.3f}s budget")
+
+    @app.cli.command('moderation-backfill')
+    @click.option('--chunk-size', default=1000, show_default=True, help='Messages read and updated per transaction.')
+    @click.option('--workers', type=int, default=None,
+                  help='Matcher processes (default: cores - 1; 0 scans in this process).')
+    @click.option('--start-id', default=0, show_default=True, help='Resume after this message id.')
+    @click.option('--nice', default=10, show_default=True, help='Niceness added to the worker processes.')
+    @click.option('--pause', default=0.05, show_default=True, help='Seconds to sleep after each chunk write.')
+    @click.option('--dry-run', is_flag=True, help='Report matches without writing flags.')
+    @click.option('--keep-flags', is_flag=True, help='Never clear flags of messages that no longer match.')
+    @click.option('--as-json', is_flag=True, help='Print the report as JSON.')
+    def moderation_backfill(chunk_size, workers, start_id, nice, pause, dry_run, keep_flags, as_json):
+        """Re-check stored messages against the current vulgar word list."""
+        from app import db
+        from app.moderation_backfill import run_backfill
+
+        def progress(report):
+            if not as_json:
+                click.echo(f"  scanned {report['scanned']} (last id {report['last_id']}), "
+                           f"{report['newly_flagged']} newly flagged", err=True)
+
+        report = run_backfill(db.engine, chunk_size=chunk_size, workers=workers, start_id=start_id,
+                              nice=nice, pause=pause, dry_run=dry_run, unflag=not keep_flags,
+                              progress=progress)
+        if as_json:
+            click.echo(json.dumps(report, indent=2))
+            return
+        click.echo(f"Scanned {report['scanned']} messages in {report['seconds']:.1f}s "
+                   f"({report['rows_per_second']:.0f}/s){' [dry run]' if dry_run else ''}")
+        click.echo(f"Matching: {report['matched']}, newly flagged: {report['newly_flagged']}, "
+                   f"unflagged: {report['unflagged']}, last id: {report['last_id']}")
+        for word, count in report['top_words']:
+            click.echo(f"{count:>8}  {word}")
+
+    @app.cli.command('points-reconcile')
+    @click.option('--snapshot', is_flag=True, help='Snapshot the ledger balances first.')
+    @click.option('--limit', default=100, show_default=True, help='Mismatching users to list.')
+    @click.option('--as-json', is_flag=True, help='Print the report as JSON.')
+    def points_reconcile(snapshot, limit, as_json):
+        """Check every user's points against the points ledger; fails on mismatches."""
+        from app import db
+        from app.points_ledger import reconcile, snapshot_balances
+
+        if snapshot:
+            snapshot_balances(db.engine, lag_seconds=app.config.get('POINTS_SNAPSHOT_LAG_SECONDS', 60))
+        report = reconcile(db.engine, limit=limit)
+        if as_json:
+            click.echo(json.dumps(report, indent=2))
+        else:
+            click.echo(f"Users: {report['users']}, balance differs from ledger: {report['mismatched']}")
+            for user_id, points, expected in report['mismatches']:
+                click.echo(f"  user {user_id}: points {points}, ledger {expected} ({points - expected:+d})")
+        if report['mismatched']:
+            raise click.ClickException(f"{report['mismatched']} users' points differ from the ledger")
@@ -1,137 +1,142 @@
-from flask import request
+from flask import current_app, request
 from flask_login import current_user
 from flask_socketio import emit, join_room, leave_room
-from app import socketio, db
-from app.models import Message, Room, User, Rating, RoomMembership
-from app.moderation import check_message
-from datetime import datetime
-import json
-import os
+from sqlalchemy.orm import joinedload, make_transient_to_detached
+from app import db
+from app.models import Message, User, Rating
+from app.pipeline import message_pipeline, MessageContext
+from app.text_analysis import text_analyzer
+from app.room_keywords import room_keywords
+from app.near_duplicate import near_duplicates
+from app.socket_router import event_router
+from app.presence import presence
+from app.write_behind import group_commit
+from app.vote_broadcast import vote_broadcaster
+from app.room_batch import room_batcher
 
-def load_vulgar_words():
-    """Load vulgar words directly from JSON file."""
-    try:
-        file_path = os.path.join(os.path.dirname(__file__), 'static', 'data', 'vulgar_words.json')
-        with open(file_path, 'r', encoding='utf-8') as f:
-            return set(json.load(f))
-    except Exception as e:
-        print(f"Error loading vulgar words: {str(e)}")
-        return set()
+def user_room(user_id):
+    """Private room of a user's connections, on every worker (see app/socket_queue.py)"""
+    return f'user_{user_id}'
 
-def contains_vulgar_words(content):
-    """Check if content contains any vulgar words."""
-    vulgar_words = load_vulgar_words()
-    if not vulgar_words:
-        return False
-        
-    # Convert content to lowercase and split into words
-    words = content.lower().split()
-    
-    # Strip punctuation from each word
-    words = [word.strip('.,!?()[]{}":;') for word in words]
-    
-    # Check if any word matches vulgar words
-    return any(word in vulgar_words for word in words)
+def save_message(**values):
+    """Insert a chat message, through the group-commit writer when it is enabled.
+
+    Questions that offer points always commit through the session: the
+    points deduction the handler made there must commit with the message,
+    or not at all.
+    """
+    if not group_commit.enabled or values.get('points_offered'):
+        message = Message(**values)
+        db.session.add(message)
+        db.session.commit()
+        return message
+    # Committed together with the messages of other handlers (app/write_behind.py);
+    # the object is built from the submitted values instead of read back
+    values = group_commit.with_defaults(values)
+    message = Message(id=group_commit.insert(values), **values)
+    make_transient_to_detached(message)
+    db.session.add(message)
+    return message
 
-@socketio.on('connect')
+@event_router.on('connect', auth=False)
 def handle_connect():
     """Handle client connection"""
     if not current_user.is_authenticated:
         return False  # reject connection if user not authenticated
+    if not text_analyzer.models_ready.is_set():
+        return False  # models still warming up, client will retry
+    join_room(user_room(current_user.id))
     print(f"Client connected: {current_user.username}")
 
-@socketio.on('disconnect')
+@event_router.on('disconnect', auth=False)
 def handle_disconnect():
     """Handle client disconnection"""
+    # Rooms this was the user's last connection in
+    for room_id, user_id, username in presence.disconnect(request.sid):
+        room_batcher.emit('user_left', {'username': username, 'user_id': user_id}, room_id)
     if current_user.is_authenticated:
         print(f"Client disconnected: {current_user.username}")
 
-@socketio.on('join')
+@event_router.on('join', error_message='')
 def handle_join(data):
     """Handle user joining a room"""
-    if not current_user.is_authenticated:
-        return
-        
     room_id = data.get('room_id')
     if not room_id:
         return
         
     join_room(str(room_id))
     print(f"User {current_user.username} joined room {room_id}")
+    announce_join(room_id)
+
+@event_router.on('resume', error_message='')
+def handle_resume(data):
+    """Rejoin a room after a reconnect and catch up from the last event the client saw"""
+    room_id = data.get('room_id')
+    if not room_id or not str(room_id).isdigit():
+        return
     
-    # Update room membership
-    try:
-        membership = RoomMembership.query.filter_by(
-            user_id=current_user.id,
-            room_id=room_id
-        ).first()
-        
-        if not membership:
-            membership = RoomMembership(user=current_user, room_id=room_id)
-            db.session.add(membership)
-            
-        membership.is_active = True
-        membership.last_active = datetime.utcnow()
-        db.session.commit()
-        
-        # Get active members
-        room = Room.query.get(room_id)
-        active_members = [m.user.username for m in room.memberships.filter_by(is_active=True).all()] if room else []
-        
-        # Notify room
-        emit('user_joined', {
+    def load_missed():
+        # Chat messages after the client's last one; other events are not stored
+        limit = current_app.config.get('ROOM_LOG_RESUME_LIMIT', 200)
+        messages = Message.query.options(joinedload(Message.author)).filter(
+            Message.room_id == int(room_id),
+            Message.id > int(data.get('last_message_id') or 0),
+            Message.is_flagged.is_(False)
+        ).order_by(Message.id.asc()).limit(limit).all()
+        return [['message', message_payload(m)] for m in messages]
+    
+    source = room_batcher.resume(room_id, request.sid, data.get('epoch'), data.get('seq'),
+                                 join=lambda: join_room(str(room_id)), load_missed=load_missed)
+    print(f"User {current_user.username} resumed room {room_id} from {source}")
+    announce_join(room_id)
+
+def announce_join(room_id):
+    """Record presence, send the member list to the joining sid and the change to the room"""
+    # Presence is kept in memory; the membership row is updated in the next batch
+    appeared = presence.join(room_id, current_user.id, current_user.username, request.sid)
+    emit('members', {'room_id': int(room_id), 'members': presence.active_members(room_id)}, room=request.sid)
+    
+    # Notify room of the change only
+    if appeared:
+        room_batcher.emit('user_joined', {
             'username': current_user.username,
-            'user_id': current_user.id,
-            'active_members': active_members
-        }, room=str(room_id))
-    except Exception as e:
-        print(f"Error in handle_join: {str(e)}")
-        db.session.rollback()
+            'user_id': current_user.id
+        }, room_id, skip_sid=request.sid)
+
+def message_payload(message):
+    """A stored message in the shape of the 'message' broadcast"""
+    return {
+        'id': message.id,
+        'content': message.content,
+        'username': message.author.username if message.author else None,
+        'timestamp': message.timestamp.strftime('%H:%M'),
+        'is_question': message.is_question,
+        'is_answer': message.is_answer,
+        'points_offered': message.points_offered,
+        'user_id': message.user_id,
+        'parent_id': message.parent_id,
+        'accepted_answer_id': message.accepted_answer_id,
+        'room_id': message.room_id
+    }
 
-@socketio.on('leave')
+@event_router.on('leave', error_message='')
 def handle_leave(data):
     """Handle user leaving a room"""
-    if not current_user.is_authenticated:
-        return
-        
     room_id = data.get('room_id')
     if room_id:
         leave_room(str(room_id))
         print(f"User {current_user.username} left room {room_id}")
         
-        try:
-            # Update membership
-            membership = RoomMembership.query.filter_by(
-                user_id=current_user.id,
-                room_id=room_id
-            ).first()
-            
-            if membership:
-                membership.is_active = False
-                membership.last_active = datetime.utcnow()
-                db.session.commit()
-                
-                # Get active members after user left
-                room = Room.query.get(room_id)
-                active_members = [m.user.username for m in room.memberships.filter_by(is_active=True).all()] if room else []
-                
-                # Notify room
-                emit('user_left', {
-                    'username': current_user.username,
-                    'user_id': current_user.id,
-                    'active_members': active_members
-                }, room=str(room_id))
-        except Exception as e:
-            print(f"Error in handle_leave: {str(e)}")
-            db.session.rollback()
+        if presence.leave(room_id, current_user.id, request.sid):
+            room_batcher.emit('user_left', {
+                'username': current_user.username,
+                'user_id': current_user.id
+            }, room_id)
 
-@socketio.on('message')
+@event_router.on('message', auth_message='You must be logged in to send messages', rate_limit='message',
+                 error_message='Error saving message')
 def handle_message(data):
     """Handle new messages and questions"""
-    if not current_user.is_authenticated:
-        emit('error', {'message': 'You must be logged in to send messages'}, room=request.sid)
-        return
-        
     room_id = data.get('room_id')
     content = data.get('content', '').strip()
     is_question = data.get('is_question', False)
@@ -141,68 +146,65 @@ def handle_message(data):
         emit('error', {'message': 'Invalid message data'}, room=request.sid)
         return
     
-    # STRICT WORD CHECK - Do this before any other processing
-    if contains_vulgar_words(content):
-        print(f"BLOCKED INAPPROPRIATE MESSAGE from {current_user.username} in room {room_id}: {content}")
-        emit('error', {'message': 'Your message contains inappropriate language and cannot be sent.'}, room=request.sid)
-        return
-        
-    try:
-        # STRICT MODERATION CHECK
-        is_appropriate, warning = check_message(content)
-        if not is_appropriate:
-            print(f"BLOCKED MESSAGE from {current_user.username} in room {room_id}: {content}")
-            emit('error', {'message': warning}, room=request.sid)
-            return
-            
+    def persist(ctx):
         # Points check for questions
         if is_question and points_offered > 0:
             if not current_user.can_afford_question(points_offered):
-                emit('error', {'message': 'Not enough points to ask this question'}, room=request.sid)
-                return
-                
+                return ctx.reject('Not enough points to ask this question')
             if not current_user.deduct_points(points_offered):
-                emit('error', {'message': 'Failed to deduct points'}, room=request.sid)
-                return
+                return ctx.reject('Not enough points to ask this question')
         
         # Create and save message
-        message = Message(
+        message = save_message(
             content=content,
-            author=current_user,
+            user_id=current_user.id,
             room_id=room_id,
             is_question=is_question,
-            points_offered=points_offered if is_question else 0
+            points_offered=points_offered if is_question else 0,
+            language=ctx.language,
+            sales_intent=ctx.results.get('sales') or 'exploring'
         )
-        
-        db.session.add(message)
-        db.session.commit()
+        ctx.data['message_id'] = message.id
         print(f"Message saved from {current_user.username} in room {room_id}")
-        
-        # Broadcast the message
-        emit('message', {
-            'id': message.id,
-            'content': message.content,
-            'username': current_user.username,
-            'timestamp': message.timestamp.strftime('%H:%M'),
-            'is_question': message.is_question,
-            'points_offered': message.points_offered,
-            'user_id': current_user.id,
-            'parent_id': message.parent_id,
-            'accepted_answer_id': message.accepted_answer_id if hasattr(message, 'accepted_answer_id') else None
-        }, room=str(room_id))
-        
-    except Exception as e:
-        print(f"Error in handle_message: {str(e)}")
-        db.session.rollback()
-        emit('error', {'message': 'Error saving message'}, room=request.sid)
+        room_keywords.add_message(int(room_id), message.id, message.content)
+        
+        # Flag copy-pasted floods; the copy count is a moderation signal
+        ctx.data['duplicate'] = near_duplicates.observe(content, message.id, tokens=ctx.tokens)
+        if ctx.data['duplicate']:
+            print(f"NEAR DUPLICATE from {current_user.username} in room {room_id}: "
+                  f"copy {ctx.data['duplicate']['count']} of message {ctx.data['duplicate']['message_id']}")
+        return message
+    
+    # Moderation, sales intent, saving and (deferred) emotion analysis
+    ctx = message_pipeline.run(MessageContext(content, room_id=room_id, persist=persist))
+    if ctx.rejected:
+        print(f"BLOCKED MESSAGE from {current_user.username} in room {room_id}: {content}")
+        emit('error', {'message': ctx.rejected}, room=request.sid)
+        return
+    message = ctx.results['persist']
+    duplicate = ctx.data['duplicate']
+    
+    if message.points_offered:
+        emit('points_update', {'points': current_user.points}, room=user_room(current_user.id))
+    
+    # Broadcast the message
+    room_batcher.emit('message', {
+        'id': message.id,
+        'content': message.content,
+        'username': current_user.username,
+        'timestamp': message.timestamp.strftime('%H:%M'),
+        'is_question': message.is_question,
+        'points_offered': message.points_offered,
+        'user_id': current_user.id,
+        'parent_id': message.parent_id,
+        'accepted_answer_id': message.accepted_answer_id if hasattr(message, 'accepted_answer_id') else None,
+        'duplicate_of': duplicate['message_id'] if duplicate else None
+    }, room_id)
 
-@socketio.on('answer')
+@event_router.on('answer', auth_message='You must be logged in to answer questions', rate_limit='answer',
+                 error_message='Error saving answer')
 def handle_answer(data):
     """Handle answers to questions"""
-    if not current_user.is_authenticated:
-        emit('error', {'message': 'You must be logged in to answer questions'}, room=request.sid)
-        return
-        
     room_id = data.get('room_id')
     content = data.get('content', '').strip()
     question_id = data.get('question_id')
@@ -211,62 +213,49 @@ def handle_answer(data):
         emit('error', {'message': 'Missing required data for answer'}, room=request.sid)
         return
         
-    # STRICT WORD CHECK - Do this before any other processing
-    if contains_vulgar_words(content):
-        print(f"BLOCKED INAPPROPRIATE ANSWER from {current_user.username} in room {room_id}: {content}")
-        emit('error', {'message': 'Your answer contains inappropriate language and cannot be sent.'}, room=request.sid)
-        return
-        
-    try:
-        # STRICT MODERATION CHECK
-        is_appropriate, warning = check_message(content)
-        if not is_appropriate:
-            print(f"BLOCKED ANSWER from {current_user.username} in room {room_id}: {content}")
-            emit('error', {'message': warning}, room=request.sid)
-            return
-            
+    def persist(ctx):
         # Get the question being answered
         question = Message.query.get(question_id)
         if not question or not question.is_question:
-            emit('error', {'message': 'Invalid question ID'}, room=request.sid)
-            return
+            return ctx.reject('Invalid question ID')
             
         # Create answer message
-        answer = Message(
+        answer = save_message(
             content=content,
-            author=current_user,
+            user_id=current_user.id,
             room_id=room_id,
             parent_id=question_id,
-            is_answer=True
+            is_answer=True,
+            language=ctx.language,
+            sales_intent=ctx.results.get('sales') or 'exploring'
         )
-        
-        db.session.add(answer)
-        db.session.commit()
+        ctx.data['message_id'] = answer.id
         print(f"Answer saved from {current_user.username} in room {room_id}")
-        
-        # Broadcast the answer
-        emit('message', {
-            'id': answer.id,
-            'content': answer.content,
-            'username': current_user.username,
-            'timestamp': answer.timestamp.strftime('%H:%M'),
-            'is_answer': True,
-            'parent_id': question_id,
-            'user_id': current_user.id,
-            'room_id': room_id
-        }, room=str(room_id))
-        
-    except Exception as e:
-        print(f"Error in handle_answer: {str(e)}")
-        db.session.rollback()
-        emit('error', {'message': 'Error saving answer'}, room=request.sid)
+        room_keywords.add_message(int(room_id), answer.id, answer.content)
+        return answer
+    
+    ctx = message_pipeline.run(MessageContext(content, room_id=room_id, persist=persist))
+    if ctx.rejected:
+        print(f"BLOCKED ANSWER from {current_user.username} in room {room_id}: {content}")
+        emit('error', {'message': ctx.rejected}, room=request.sid)
+        return
+    answer = ctx.results['persist']
+    
+    # Broadcast the answer
+    room_batcher.emit('message', {
+        'id': answer.id,
+        'content': answer.content,
+        'username': current_user.username,
+        'timestamp': answer.timestamp.strftime('%H:%M'),
+        'is_answer': True,
+        'parent_id': question_id,
+        'user_id': current_user.id,
+        'room_id': room_id
+    }, room_id)
 
-@socketio.on('start_answer')
+@event_router.on('start_answer')
 def handle_start_answer(data):
     """Handle when a user starts answering a question"""
-    if not current_user.is_authenticated:
-        return
-        
     question_id = data.get('question_id')
     if not question_id:
         return
@@ -279,17 +268,14 @@ def handle_start_answer(data):
     # Join the question's room to receive updates
     join_room(f'question_{question_id}')
     
-    emit('answer_started', {
+    room_batcher.emit('answer_started', {
         'question_id': question_id,
         'username': current_user.username
-    }, room=question.room_id)
+    }, question.room_id)
 
-@socketio.on('cancel_answer')
+@event_router.on('cancel_answer')
 def handle_cancel_answer(data):
     """Handle when a user cancels answering a question"""
-    if not current_user.is_authenticated:
-        return
-        
     question_id = data.get('question_id')
     if not question_id:
         return
@@ -301,17 +287,14 @@ def handle_cancel_answer(data):
     # Leave the question's room
     leave_room(f'question_{question_id}')
     
-    emit('answer_cancelled', {
+    room_batcher.emit('answer_cancelled', {
         'question_id': question_id,
         'username': current_user.username
-    }, room=question.room_id)
+    }, question.room_id)
 
-@socketio.on('get_answers')
+@event_router.on('get_answers')
 def handle_get_answers(data):
     """Get all answers for a question, with optional sorting"""
-    if not current_user.is_authenticated:
-        return
-        
     question_id = data.get('question_id')
     sort_by = data.get('sort_by', 'timestamp')  # Default to timestamp sorting
     
@@ -331,12 +314,9 @@ def handle_get_answers(data):
         'answers': answer_data
     })
 
-@socketio.on('get_question_details')
+@event_router.on('get_question_details')
 def handle_get_question_details(data):
     """Get question details including all answers and their states"""
-    if not current_user.is_authenticated:
-        return
-        
     question_id = data.get('question_id')
     if not question_id:
         return
@@ -362,14 +342,10 @@ def handle_get_question_details(data):
     
     emit('question_details', response_data)
 
-@socketio.on('rate_answer')
+@event_router.on('rate_answer', rate_limit='rate_answer', error_message='Error rating answer')
 def handle_rate_answer(data):
     """Handle rating an answer"""
     print(f"[DEBUG] Rate answer event received: {data}")
-    if not current_user.is_authenticated:
-        print("[DEBUG] User not authenticated")
-        return
-    
     message_id = data.get('message_id')
     rating_value = data.get('rating')
     
@@ -400,53 +376,43 @@ def handle_rate_answer(data):
         emit('error', {'message': 'You have already rated this answer'})
         return
     
-    try:
-        # Create new rating
-        rating = Rating(
-            rater_id=current_user.id,
-            rated_user_id=message.user_id,
-            message_id=message_id,
-            rating=rating_value
-        )
-        
-        if not rating.can_rate():
-            emit('error', {'message': 'Cannot rate your own answer'})
-            return
-            
-        # Add rating to message
-        avg_rating = message.add_rating(rating_value)
-        
-        # Add rating to user's profile
-        message.author.update_rating(rating_value)
-        
-        db.session.add(rating)
-        db.session.commit()
-        
-        print(f"[DEBUG] Successfully rated answer. New average: {avg_rating}")
-        
-        # Emit to both the room and the question thread
-        response_data = {
-            'message_id': message_id,
-            'rating': rating_value,
-            'avg_rating': avg_rating,
-            'rating_count': message.rating_count
-        }
-        emit('answer_rated', response_data, room=question.room_id)
-        emit('answer_rated', response_data, room=f'question_{question.id}')
-        
-    except Exception as e:
-        print(f"[DEBUG] Error rating answer: {str(e)}")
-        emit('error', {'message': str(e)})
+    # Create new rating
+    rating = Rating(
+        rater_id=current_user.id,
+        rated_user_id=message.user_id,
+        message_id=message_id,
+        rating=rating_value
+    )
+    
+    if not rating.can_rate():
+        emit('error', {'message': 'Cannot rate your own answer'})
         return
+        
+    # Add rating to message
+    avg_rating = message.add_rating(rating_value)
+    
+    # Add rating to user's profile
+    message.author.update_rating(rating_value)
+    
+    db.session.add(rating)
+    db.session.commit()
+    
+    print(f"[DEBUG] Successfully rated answer. New average: {avg_rating}")
+    
+    # Emit to both the room and the question thread
+    response_data = {
+        'message_id': message_id,
+        'rating': rating_value,
+        'avg_rating': avg_rating,
+        'rating_count': message.rating_count
+    }
+    room_batcher.emit('answer_rated', response_data, question.room_id)
+    room_batcher.emit('answer_rated', response_data, f'question_{question.id}')
 
-@socketio.on('accept_answer')
+@event_router.on('accept_answer', rate_limit='accept_answer', error_message='Error accepting answer')
 def handle_accept_answer(data):
     """Handle selecting the best answer"""
     print(f"[DEBUG] Accept answer event received: {data}")
-    if not current_user.is_authenticated:
-        print("[DEBUG] User not authenticated")
-        return
-    
     answer_id = data.get('answer_id')
     if not answer_id:
         emit('error', {'message': 'Missing answer ID'}, room=request.sid)
@@ -454,59 +420,50 @@ def handle_accept_answer(data):
     
     print(f"[DEBUG] Accepting answer {answer_id}")
     
-    try:
-        answer = Message.query.get(answer_id)
-        if not answer or not answer.parent_id:
-            emit('error', {'message': 'Invalid answer'}, room=request.sid)
-            return
-        
-        question = Message.query.get(answer.parent_id)
-        if not question:
-            emit('error', {'message': 'Question not found'}, room=request.sid)
-            return
-            
-        if question.user_id != current_user.id:
-            print(f"[DEBUG] Permission denied. Question user: {question.user_id}, Current user: {current_user.id}")
-            emit('error', {'message': 'Only the question asker can select the best answer'}, room=request.sid)
-            return
-        
-        if question.is_closed():
-            emit('error', {'message': 'This question already has an accepted answer'}, room=request.sid)
-            return
+    answer = Message.query.get(answer_id)
+    if not answer or not answer.parent_id:
+        emit('error', {'message': 'Invalid answer'}, room=request.sid)
+        return
+    
+    question = Message.query.get(answer.parent_id)
+    if not question:
+        emit('error', {'message': 'Question not found'}, room=request.sid)
+        return
         
-        success = question.accept_answer(answer_id, db.session)
-        if success:
-            print(f"[DEBUG] Successfully accepted answer {answer_id} for question {question.id}")
-            # Emit to both the room and the question thread
-            response_data = {
-                'answer_id': answer_id,
-                'question_id': question.id,
-                'points_transferred': question.points_offered
-            }
-            emit('answer_accepted', response_data, room=str(question.room_id))
-            emit('answer_accepted', response_data, room=f'question_{question.id}')
-            
-            # Notify the answer author about points received
-            if question.points_offered > 0:
-                emit('points_update', {
-                    'points': answer.author.points
-                }, room=str(answer.author.id))
-        else:
-            print("[DEBUG] Failed to accept answer")
-            emit('error', {'message': 'Failed to accept answer'}, room=request.sid)
-            
-    except Exception as e:
-        print(f"[DEBUG] Error accepting answer: {str(e)}")
-        db.session.rollback()
-        emit('error', {'message': f'Error accepting answer: {str(e)}'}, room=request.sid)
+    if question.user_id != current_user.id:
+        print(f"[DEBUG] Permission denied. Question user: {question.user_id}, Current user: {current_user.id}")
+        emit('error', {'message': 'Only the question asker can select the best answer'}, room=request.sid)
+        return
+    
+    if question.is_closed():
+        emit('error', {'message': 'This question already has an accepted answer'}, room=request.sid)
+        return
+    
+    success = question.accept_answer(answer_id, db.session)
+    if success:
+        print(f"[DEBUG] Successfully accepted answer {answer_id} for question {question.id}")
+        # Emit to both the room and the question thread
+        response_data = {
+            'answer_id': answer_id,
+            'question_id': question.id,
+            'points_transferred': question.points_offered
+        }
+        room_batcher.emit('answer_accepted', response_data, question.room_id)
+        room_batcher.emit('answer_accepted', response_data, f'question_{question.id}')
+        
+        # Notify the answer author about points received
+        if question.points_offered > 0:
+            emit('points_update', {
+                'points': answer.author.points
+            }, room=user_room(answer.author.id))
+    else:
+        print("[DEBUG] Failed to accept answer")
+        emit('error', {'message': 'Failed to accept answer'}, room=request.sid)
 
-@socketio.on('vote_message')
+@event_router.on('vote_message', auth_message='You must be logged in to vote', rate_limit='vote_message',
+                 error_message='Error processing vote')
 def handle_vote(data):
     """Handle message votes (likes/dislikes)"""
-    if not current_user.is_authenticated:
-        emit('error', {'message': 'You must be logged in to vote'}, room=request.sid)
-        return
-
     message_id = data.get('message_id')
     vote_type = data.get('vote_type')  # 'like' or 'dislike'
 
@@ -514,23 +471,14 @@ def handle_vote(data):
         emit('error', {'message': 'Invalid vote data'}, room=request.sid)
         return
 
-    try:
-        message = Message.query.get(message_id)
-        if not message:
-            emit('error', {'message': 'Message not found'}, room=request.sid)
-            return
-
-        # Process the vote
-        new_likes, new_dislikes = message.vote(current_user.id, vote_type)
+    message = Message.query.get(message_id)
+    if not message:
+        emit('error', {'message': 'Message not found'}, room=request.sid)
+        return
+    message_id, room_id = message.id, message.room_id
 
-        # Broadcast vote update to all users in the room
-        emit('vote_updated', {
-            'message_id': message_id,
-            'likes': new_likes,
-            'dislikes': new_dislikes
-        }, room=str(message.room_id))
+    # Process the vote (atomic counter updates, see Message.vote)
+    new_likes, new_dislikes = message.vote(current_user.id, vote_type)
 
-    except Exception as e:
-        print(f"Error in handle_vote: {str(e)}")
-        db.session.rollback()
-        emit('error', {'message': 'Error processing vote'}, room=request.sid) 
\ No newline at end of file
+    # Broadcast vote update to the room, at most once per interval per message
+    vote_broadcaster.publish(message_id, room_id, new_likes, new_dislikes)
@@ -0,0 +1,151 @@
+"""
+Bounded-concurrency executor for model inference
+
+Socket and HTTP threads hand their model calls to a fixed number of inference
+slots instead of running the transformers pipelines themselves. A bounded
+queue sits in front of the slots; when it is full, or a call waits longer
+than its timeout, the caller gets a cheap fallback result immediately instead
+of piling onto an oversubscribed CPU.
+"""
+import os
+import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+
+from app.async_mode import offload
+
+class InferenceUnavailable(Exception):
+    """Raised when a call is rejected or times out and has no fallback"""
+
+class InferenceExecutor:
+    def __init__(self, slots=2, queue_size=16, timeout=5.0, torch_threads=0):
+        self.slots = slots
+        self.queue_size = queue_size
+        self.timeout = timeout
+        self.torch_threads = torch_threads  # 0 = cores // slots
+        self._pool = None
+        self._lock = threading.Lock()
+        self._pending = 0  # queued + running
+        self._running = 0
+        self._torch_configured = False
+        self._wait_times = deque(maxlen=1000)
+        self.completed = 0
+        self.rejected = 0
+        self.timeouts = 0
+        self.fallbacks = 0
+        self.max_queue_depth = 0
+
+    def init_app(self, app, prefix='INFERENCE'):
+        """Apply the <prefix>_SLOTS/_QUEUE_SIZE/_TIMEOUT/_TORCH_THREADS settings"""
+        with self._lock:
+            self.slots = max(1, app.config.get(f'{prefix}_SLOTS', self.slots))
+            self.queue_size = max(0, app.config.get(f'{prefix}_QUEUE_SIZE', self.queue_size))
+            self.timeout = app.config.get(f'{prefix}_TIMEOUT', self.timeout)
+            self.torch_threads = app.config.get(f'{prefix}_TORCH_THREADS', self.torch_threads)
+            if self._pool is not None:
+                self._pool.shutdown(wait=False)
+                self._pool = None
+
+    def run(self, fn, *args, fallback=None, timeout=-1, **kwargs):
+        """Run fn(*args, **kwargs) on an inference slot and return its result.
+
+        If every slot is busy and the queue is full, or the result is not
+        ready within ``timeout`` seconds (default INFERENCE_TIMEOUT, None waits
+        forever), returns ``fallback()`` - or raises InferenceUnavailable when
+        no fallback is given. Exceptions raised by fn propagate to the caller.
+        """
+        if timeout == -1:
+            timeout = self.timeout
+
+        with self._lock:
+            saturated = self._pending >= self.slots + self.queue_size
+            if saturated:
+                self.rejected += 1
+            else:
+                self._pending += 1
+                # Calls beyond the slot count wait; a just-submitted call that
+                # has not reached its idle slot yet is not queued
+                self.max_queue_depth = max(self.max_queue_depth, self._pending - self.slots)
+                if self._pool is None:
+                    self._pool = ThreadPoolExecutor(max_workers=self.slots, thread_name_prefix='inference')
+                pool = self._pool
+        if saturated:
+            return self._fallback(fallback, 'saturated')
+
+        future = pool.submit(self._execute, fn, time.monotonic(), args, kwargs)
+        future.add_done_callback(self._release)
+        try:
+            return future.result(timeout=timeout)
+        except FutureTimeout:
+            with self._lock:
+                self.timeouts += 1
+            # Drop it if it has not started yet; a running call finishes in its slot
+            future.cancel()
+            return self._fallback(fallback, 'timeout')
+
+    def metrics(self):
+        """Queue depth and wait time metrics"""
+        with self._lock:
+            waits = sorted(self._wait_times)
+            return {
+                'slots': self.slots,
+                'queue_size': self.queue_size,
+                'timeout': self.timeout,
+                'running': self._running,
+                'queue_depth': self._pending - self._running,
+                'max_queue_depth': self.max_queue_depth,
+                'completed': self.completed,
+                'rejected': self.rejected,
+                'timeouts': self.timeouts,
+                'fallbacks': self.fallbacks,
+                'wait_ms': {
+                    'avg': round(sum(waits) / len(waits) * 1000, 2) if waits else 0.0,
+                    'p50': round(waits[len(waits) // 2] * 1000, 2) if waits else 0.0,
+                    'p95': round(waits[int(len(waits) * 0.95)] * 1000, 2) if waits else 0.0,
+                    'max': round(waits[-1] * 1000, 2) if waits else 0.0
+                }
+            }
+
+    def _execute(self, fn, submitted, args, kwargs):
+        with self._lock:
+            self._running += 1
+            self._wait_times.append(time.monotonic() - submitted)
+        self._configure_torch()
+        try:
+            # On a real OS thread in the eventlet/gevent modes (see app/async_mode.py)
+            return offload(fn, *args, **kwargs)
+        finally:
+            with self._lock:
+                self._running -= 1
+                self.completed += 1
+
+    def _release(self, future):
+        # Runs when the call finishes or is cancelled before it started
+        with self._lock:
+            self._pending -= 1
+
+    def _configure_torch(self):
+        """Split the cores between slots so concurrent calls don't oversubscribe"""
+        if self._torch_configured or 'torch' not in sys.modules:
+            return
+        self._torch_configured = True
+        threads = self.torch_threads or max(1, (os.cpu_count() or 1) // self.slots)
+        try:
+            sys.modules['torch'].set_num_threads(threads)
+        except Exception as e:
+            print(f"Error setting torch threads: {e}")
+
+    def _fallback(self, fallback, reason):
+        if fallback is None:
+            raise InferenceUnavailable(f"Inference unavailable ({reason})")
+        with self._lock:
+            self.fallbacks += 1
+        return fallback()
+
+# Create global instances: one lane for the latency-sensitive per-message
+# emotion/intent calls, and a separate lane for long topic model fits so a
+# few topic refreshes can never take every per-message slot
+inference_executor = InferenceExecutor()
+topic_executor = InferenceExecutor(slots=1, queue_size=2, timeout=None)
@@ -0,0 +1,96 @@
+"""
+Fast language/script detection for chat messages
+
+Classifies a message by the Unicode script most of its letters belong to,
+and tells romanized Hindi (Hinglish) from English by counting common Hindi
+and English function words. No model is loaded; a message takes a few
+microseconds. Used at ingest to fill Message.language and by TextAnalyzer to
+skip the English-only models for messages they would only misread.
+"""
+import re
+
+# Bump when the rules change: cached analyses depend on the routing
+LANGUAGE_DETECTOR_VERSION = 1
+
+ENGLISH = 'en'
+HINGLISH = 'hi-Latn'
+UNDETERMINED = 'und'
+
+# Script blocks of the languages used across INDIAN_STATES, as
+# (first code point, last code point, language code)
+SCRIPT_RANGES = [
+    (0x0900, 0x097F, 'hi'),  # Devanagari (Hindi, Marathi, Nepali)
+    (0x0980, 0x09FF, 'bn'),  # Bengali (Bengali, Assamese)
+    (0x0A00, 0x0A7F, 'pa'),  # Gurmukhi
+    (0x0A80, 0x0AFF, 'gu'),  # Gujarati
+    (0x0B00, 0x0B7F, 'or'),  # Odia
+    (0x0B80, 0x0BFF, 'ta'),  # Tamil
+    (0x0C00, 0x0C7F, 'te'),  # Telugu
+    (0x0C80, 0x0CFF, 'kn'),  # Kannada
+    (0x0D00, 0x0D7F, 'ml'),  # Malayalam
+    (0x0600, 0x06FF, 'ur'),  # Arabic script (Urdu)
+]
+
+# Frequent romanized Hindi words that are not also English words
+HINGLISH_WORDS = frozenset([
+    'hai', 'hain', 'ho', 'hoga', 'hogi', 'tha', 'thi', 'nahi', 'nahin', 'nhi',
+    'kya', 'kyu', 'kyun', 'kyon', 'kaise', 'kaisa', 'kab', 'kahan', 'kaun', 'kitna',
+    'mein', 'mai', 'mujhe', 'mera', 'meri', 'mere', 'hum', 'humein', 'aap',
+    'aapka', 'aapko', 'tum', 'tumhe', 'tera', 'uska', 'unka', 'yeh', 'ye', 'woh', 'wo',
+    'ka', 'ki', 'ke', 'ko', 'se', 'pe', 'aur', 'bhi', 'toh', 'na', 'ek',
+    'kar', 'karo', 'karna', 'karke', 'kiya', 'raha', 'rahi', 'rahe', 'gaya', 'gayi',
+    'chahiye', 'sakta', 'sakte', 'sakti', 'lena', 'dena', 'milega', 'mila', 'bata',
+    'batao', 'accha', 'acha', 'theek', 'thik', 'haan', 'bhai', 'yaar', 'ji', 'abhi',
+    'kuch', 'sab', 'bahut', 'bohot', 'bilkul', 'sirf', 'wala', 'wali', 'lekin', 'agar'
+])
+
+# Frequent English function words
+ENGLISH_WORDS = frozenset([
+    'the', 'a', 'an', 'is', 'are', 'was', 'were', 'be', 'been', 'am', 'i', 'you', 'he',
+    'she', 'it', 'we', 'they', 'my', 'your', 'his', 'her', 'our', 'their', 'this',
+    'that', 'these', 'those', 'what', 'which', 'who', 'how', 'why', 'when', 'where',
+    'and', 'or', 'but', 'if', 'of', 'in', 'on', 'at', 'for', 'with', 'from', 'about',
+    'do', 'does', 'did', 'have', 'has', 'had', 'can', 'could', 'will', 'would',
+    'should', 'not', 'no', 'yes', 'there', 'here', 'all', 'any', 'some', 'just',
+    'please', 'thanks', 'thank', 'get', 'got', 'want', 'need', 'know', 'think'
+])
+
+_LATIN_WORD_RE = re.compile(r"[a-z]+")
+
+def script_language(char):
+    """Language code of a character's Indic/Arabic script block, or None"""
+    code = ord(char)
+    for start, end, language in SCRIPT_RANGES:
+        if start <= code <= end:
+            return language
+    return None
+
+def detect_language(text):
+    """Return a language code for text: 'en', 'hi-Latn', an Indic code or 'und'"""
+    counts = {}
+    latin = 0
+    for char in text:
+        if 'a' <= char.lower() <= 'z':
+            latin += 1
+        elif char.isalpha() or 'ऀ' <= char <= 'ൿ':
+            # Indic vowel signs are marks, not letters, but belong to the script
+            language = script_language(char)
+            if language:
+                counts[language] = counts.get(language, 0) + 1
+
+    script, script_chars = max(counts.items(), key=lambda x: x[1]) if counts else (None, 0)
+    if script_chars > latin:
+        return script
+    if not latin:
+        return UNDETERMINED
+
+    words = _LATIN_WORD_RE.findall(text.lower())
+    hinglish = sum(1 for w in words if w in HINGLISH_WORDS)
+    english = sum(1 for w in words if w in ENGLISH_WORDS)
+    if (hinglish > english and hinglish >= 2) or (hinglish and not english and len(words) <= 3):
+        return HINGLISH
+    return ENGLISH
+
+def uses_english_models(language):
+    """Whether the English-only models (roberta, bart-mnli, spaCy en) apply"""
+    return language in (ENGLISH, UNDETERMINED, None)
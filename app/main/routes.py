@@ -103,4 +103,61 @@ def profile():
     return render_template('main/profile.html', 
                          title='Profile',
                          user=current_user,
-                         Message=Message) 
\ No newline at end of file
+                         Message=Message)
+
+@bp.route('/health/ready')
+def readiness():
+    """Readiness probe - only route traffic here once the models are warm"""
+    from app.text_analysis import text_analyzer
+    
+    if text_analyzer.models_ready.is_set():
+        return jsonify({'status': 'ready'})
+    return jsonify({'status': 'warming_up'}), 503
+
+@bp.route('/health/models')
+@login_required
+def model_stats():
+    """Memory use and load/unload history of the analysis models"""
+    from app.model_registry import model_registry
+    
+    return jsonify(model_registry.stats())
+
+@bp.route('/health/sockets')
+@login_required
+def socket_stats():
+    """Latency histograms and error counts per socket event, outbound queue depths"""
+    from app.socket_router import event_router
+    from app.outbound import outbound_guard
+    
+    metrics = event_router.metrics()
+    metrics['outbound'] = outbound_guard.stats()
+    return jsonify(metrics)
+
+@bp.route('/health/inference')
+@login_required
+def inference_stats():
+    """Queue depth and wait time of the inference executor"""
+    from app.inference import inference_executor, topic_executor
+    from app.analysis_cache import analysis_cache
+    from app.near_duplicate import near_duplicates
+    from app.pipeline import message_pipeline
+    from app.rate_limit import rate_limiter
+    from app.presence import presence
+    from app.write_behind import group_commit
+    from app.vote_broadcast import vote_broadcaster
+    from app.room_batch import room_batcher
+    from app.room_log import room_log
+    
+    return jsonify({
+        'messages': inference_executor.metrics(),
+        'topics': topic_executor.metrics(),
+        'analysis_cache': analysis_cache.stats(),
+        'near_duplicates': near_duplicates.stats(),
+        'pipeline': message_pipeline.metrics(),
+        'rate_limits': rate_limiter.stats(),
+        'presence': presence.stats(),
+        'group_commit': group_commit.stats(),
+        'vote_broadcasts': vote_broadcaster.stats(),
+        'room_batches': room_batcher.stats(),
+        'room_log': room_log.stats()
+    })
@@ -0,0 +1,222 @@
+"""
+Registry for the large ML models used by TextAnalyzer
+
+Tracks the resident memory of every loaded model, keeps the total under a
+configurable process-wide budget by unloading the least recently used ones,
+unloads models that sit idle longer than a TTL and reloads them on demand.
+
+Models loaded in the gunicorn master and frozen with gc.freeze() are shared
+copy-on-write with the workers. Unloading such a model in a worker frees
+nothing (the master still holds the pages) and reloading it makes a private
+copy, so pin() exempts them from idle and budget eviction.
+"""
+import gc
+import os
+import threading
+import time
+from collections import deque
+from datetime import datetime
+
+def current_rss_bytes():
+    """Resident set size of this process in bytes (0 if unavailable)"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        return 0
+
+def estimate_model_bytes(model):
+    """Size of a model's torch parameters and buffers, if it has any"""
+    # transformers pipelines wrap the module in .model, KeyBERT wraps a
+    # sentence-transformers backend in .model.embedding_model
+    candidates = [model, getattr(model, 'model', None)]
+    backend = getattr(getattr(model, 'model', None), 'embedding_model', None)
+    if backend is not None:
+        candidates.append(backend)
+
+    for candidate in candidates:
+        if hasattr(candidate, 'parameters') and callable(candidate.parameters):
+            try:
+                total = sum(p.numel() * p.element_size() for p in candidate.parameters())
+                if hasattr(candidate, 'buffers'):
+                    total += sum(b.numel() * b.element_size() for b in candidate.buffers())
+                return total
+            except Exception:
+                continue
+    return 0
+
+class ModelRegistry:
+    def __init__(self, memory_budget_mb=0, idle_ttl=0):
+        self.memory_budget = memory_budget_mb * 1024 * 1024  # 0 = unlimited
+        self.idle_ttl = idle_ttl  # seconds, 0 = never unload idle models
+        self._lock = threading.RLock()
+        self._loaders = {}
+        # Loads are serialized so each RSS delta belongs to a single model
+        self._load_lock = threading.Lock()
+        self._models = {}
+        self._pinned = set()
+        self._sweeper_pid = None
+        self.events = deque(maxlen=200)  # recent load/unload events
+        self.load_counts = {}
+
+    def init_app(self, app):
+        """Apply the MODEL_* settings.
+
+        The idle sweeper is started lazily by the first get() in each process,
+        since a thread started in the gunicorn master does not survive fork.
+        """
+        self.memory_budget = app.config.get('MODEL_MEMORY_BUDGET_MB', 0) * 1024 * 1024
+        self.idle_ttl = app.config.get('MODEL_IDLE_TTL', 0)
+
+    def register(self, name, loader, sizer=estimate_model_bytes):
+        """Register a loader callable for a model; nothing is loaded yet"""
+        with self._lock:
+            self._loaders[name] = (loader, sizer)
+            self.load_counts.setdefault(name, 0)
+
+    def get(self, name):
+        """Return the model, loading it (and enforcing the budget) if needed"""
+        self._ensure_sweeper()
+        with self._lock:
+            entry = self._models.get(name)
+            if entry is not None:
+                entry['last_used'] = time.monotonic()
+                return entry['model']
+            if name not in self._loaders:
+                raise KeyError(f"Unknown model: {name}")
+            loader, sizer = self._loaders[name]
+
+        # Load outside the registry lock so loaded models stay usable meanwhile
+        with self._load_lock:
+            with self._lock:
+                entry = self._models.get(name)
+                if entry is not None:
+                    entry['last_used'] = time.monotonic()
+                    return entry['model']
+
+            rss_before = current_rss_bytes()
+            started = time.monotonic()
+            model = loader()
+            load_seconds = time.monotonic() - started
+            memory = max(current_rss_bytes() - rss_before, sizer(model) if sizer else 0, 0)
+
+            with self._lock:
+                now = time.monotonic()
+                self._models[name] = {
+                    'model': model,
+                    'memory_bytes': memory,
+                    'loaded_at': datetime.utcnow(),
+                    'last_used': now,
+                    'load_seconds': load_seconds
+                }
+                self.load_counts[name] += 1
+                self._record('load', name, memory, load_seconds=round(load_seconds, 3))
+                self._enforce_budget(keep=name)
+            return model
+
+    def is_loaded(self, name):
+        with self._lock:
+            return name in self._models
+
+    def pin(self, names=None):
+        """Exempt models (default: every loaded one) from eviction.
+
+        Used after a copy-on-write preload, where evicting would only turn
+        shared pages into a private copy on the next reload.
+        """
+        with self._lock:
+            self._pinned.update(self._models if names is None else names)
+
+    def unload(self, name, reason='manual'):
+        """Drop the registry's reference to a model so its memory can be freed"""
+        with self._lock:
+            entry = self._models.pop(name, None)
+            if entry is None:
+                return False
+            self._record('unload', name, entry['memory_bytes'], reason=reason)
+        del entry
+        gc.collect()
+        return True
+
+    def evict_idle(self):
+        """Unload every model not used within the idle TTL"""
+        if not self.idle_ttl:
+            return []
+        cutoff = time.monotonic() - self.idle_ttl
+        with self._lock:
+            idle = [name for name, entry in self._models.items()
+                    if entry['last_used'] < cutoff and name not in self._pinned]
+        return [name for name in idle if self.unload(name, reason='idle')]
+
+    def total_memory(self):
+        with self._lock:
+            return sum(entry['memory_bytes'] for entry in self._models.values())
+
+    def stats(self):
+        """Memory use and load/unload history, for capacity planning"""
+        with self._lock:
+            now = time.monotonic()
+            return {
+                'memory_budget_mb': round(self.memory_budget / 1024 / 1024, 1),
+                'idle_ttl': self.idle_ttl,
+                'total_memory_mb': round(self.total_memory() / 1024 / 1024, 1),
+                'process_rss_mb': round(current_rss_bytes() / 1024 / 1024, 1),
+                'models': {
+                    name: {
+                        'loaded': name in self._models,
+                        'pinned': name in self._pinned,
+                        'memory_mb': round(self._models[name]['memory_bytes'] / 1024 / 1024, 1) if name in self._models else 0.0,
+                        'idle_seconds': round(now - self._models[name]['last_used'], 1) if name in self._models else None,
+                        'load_seconds': round(self._models[name]['load_seconds'], 3) if name in self._models else None,
+                        'loads': self.load_counts.get(name, 0)
+                    }
+                    for name in self._loaders
+                },
+                'events': list(self.events)
+            }
+
+    def _enforce_budget(self, keep):
+        """Unload least recently used models until the total fits the budget"""
+        if not self.memory_budget:
+            return
+        while self.total_memory() > self.memory_budget:
+            candidates = [(entry['last_used'], name) for name, entry in self._models.items()
+                          if name != keep and name not in self._pinned]
+            if not candidates:
+                print(f"Model memory budget exceeded with nothing left to evict (loading {keep})")
+                return
+            _, victim = min(candidates)
+            self.unload(victim, reason='budget')
+
+    def _record(self, event, name, memory, **extra):
+        record = {
+            'event': event,
+            'model': name,
+            'memory_mb': round(memory / 1024 / 1024, 1),
+            'total_memory_mb': round(self.total_memory() / 1024 / 1024, 1),
+            'timestamp': datetime.utcnow().isoformat()
+        }
+        record.update(extra)
+        self.events.append(record)
+        print(f"Model registry: {event} {name} ({record['memory_mb']} MB, total {record['total_memory_mb']} MB)")
+
+    def _ensure_sweeper(self):
+        """Start the idle sweeper once per process (again after a fork)"""
+        if not self.idle_ttl or self._sweeper_pid == os.getpid():
+            return
+        with self._lock:
+            if self._sweeper_pid == os.getpid():
+                return
+            self._sweeper_pid = os.getpid()
+            threading.Thread(target=self._sweep_idle, daemon=True).start()
+
+    def _sweep_idle(self):
+        while True:
+            time.sleep(max(1, min(self.idle_ttl / 2, 60)))
+            try:
+                self.evict_idle()
+            except Exception as e:
+                print(f"Error evicting idle models: {e}")
+
+# Create a global instance
+model_registry = ModelRegistry()
@@ -7,6 +7,7 @@ from collections import Counter
 import numpy as np
 import json
 from sqlalchemy.orm import validates
+from sqlalchemy.orm.attributes import set_committed_value
 from typing import Dict
 
 @login_manager.user_loader
@@ -107,26 +108,52 @@ class User(UserMixin, db.Model):
             return False
         return self.points >= points_needed
 
-    def deduct_points(self, points):
-        """Deduct points from user"""
-        if points is None or self.points is None:
+    def deduct_points(self, points, reason='question', message_id=None):
+        """Deduct points from user; False if the balance is too low.
+
+        One conditional UPDATE (... WHERE points >= :points), so two
+        concurrent spends can never both pass the balance check. The change
+        is appended to the points ledger in the same transaction; the
+        caller commits.
+        """
+        if points is None or points < 0 or self.points is None:
             return False
-        if self.points >= points:
-            self.points -= points
+        if points == 0:
             return True
-        return False
-
-    def add_points(self, points):
-        """Safely add points to user's balance"""
+        users = User.__table__
+        spent = db.session.execute(
+            users.update().where(users.c.id == self.id, users.c.points >= points)
+            .values(points=users.c.points - points)
+        ).rowcount == 1
+        if spent:
+            self._record_points(-points, reason, message_id)
+        return spent
+
+    def add_points(self, points, reason='adjustment', message_id=None):
+        """Safely add points to user's balance (in SQL, recorded in the ledger; the caller commits)"""
         if points is None or points < 0:
             return False
-            
-        if self.points is None:
-            self.points = 0
-            
-        self.points += points
+        if points == 0:
+            return True
+        users = User.__table__
+        db.session.execute(
+            users.update().where(users.c.id == self.id)
+            .values(points=db.func.coalesce(users.c.points, 0) + points)
+        )
+        self._record_points(points, reason, message_id)
         return True
 
+    def _record_points(self, delta, reason, message_id):
+        """Append a ledger row for a change just made in SQL and load the new balance"""
+        users = User.__table__
+        balance = db.session.execute(db.select(users.c.points).where(users.c.id == self.id)).scalar()
+        # Loaded as the committed value: the ORM must not write it back (or ledger it again)
+        set_committed_value(self, 'points', balance)
+        db.session.execute(PointsLedger.__table__.insert().values(
+            user_id=self.id, delta=delta, balance=balance, reason=reason,
+            message_id=message_id, created_at=datetime.utcnow()
+        ))
+
 class UserProfile(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), unique=True)
@@ -398,6 +425,9 @@ class Message(db.Model):
     
     # Sales intent field
     sales_intent = db.Column(db.String(20), default='exploring')  # Default to exploring
+    
+    # Set by `flask moderation-backfill` when an old message matches the current word list
+    is_flagged = db.Column(db.Boolean, default=False, nullable=False, server_default=db.text('0'), index=True)
 
     def is_closed(self):
         """Check if the question is closed (has accepted answer)"""
@@ -415,13 +445,22 @@ class Message(db.Model):
         if not answer or answer.parent_id != self.id:
             return False
             
-        self.accepted_answer_id = answer_id
+        # Only the first of two concurrent accepts finds the question open
+        messages = Message.__table__
+        accepted = db_session.execute(
+            messages.update().where(messages.c.id == self.id, messages.c.accepted_answer_id.is_(None))
+            .values(accepted_answer_id=answer.id)
+        ).rowcount == 1
+        if not accepted:
+            db_session.rollback()
+            return False
+        set_committed_value(self, 'accepted_answer_id', answer.id)
         
         # Transfer points to answer author
         if self.points_offered > 0:
             answer_author = User.query.get(answer.user_id)
             if answer_author:
-                answer_author.add_points(self.points_offered)
+                answer_author.add_points(self.points_offered, reason='answer_accepted', message_id=answer.id)
                 
         db_session.commit()
         return True
@@ -478,7 +517,7 @@ class Message(db.Model):
         if not self.is_question:
             return []
             
-        query = self.answers
+        query = self.answers.filter(Message.is_flagged.is_(False))
         
         if sort_by == 'rating':
             # Sort by average rating (rating_sum/rating_count)
@@ -494,9 +533,11 @@ class Message(db.Model):
             
         return query.all()
 
-    def update_analysis(self, text_analyzer):
-        """Update message with emotion and intent analysis."""
-        analysis = text_analyzer.analyze_message(self.content)
+    def update_analysis(self, text_analyzer, analysis=None):
+        """Update message with emotion and intent analysis (``analysis``: analyze_message result, if known)."""
+        if analysis is None:
+            analysis = text_analyzer.analyze_message(self.content)
+        self.language = analysis.get('language', self.language)
         
         # Update emotion fields
         self.primary_emotion = analysis['emotions']['primary_emotion']
@@ -572,50 +613,55 @@ class Message(db.Model):
         """Handle user vote on message
         vote_type: 'like' or 'dislike'
         Returns: (new_likes, new_dislikes)
+
+        Concurrent clicks must not lose updates, so nothing is read, changed
+        in Python and written back: the vote row changes with a statement
+        that only applies if the row is still in the state just read
+        (retried otherwise), and the counters are incremented in SQL.
         """
-        # Initialize likes and dislikes if they are None
-        if self.likes is None:
-            self.likes = 0
-        if self.dislikes is None:
-            self.dislikes = 0
-
-        existing_vote = MessageVote.query.filter_by(
-            message_id=self.id,
-            user_id=user_id
-        ).first()
-
-        if existing_vote:
-            if existing_vote.vote_type == vote_type:
+        votes = MessageVote.__table__
+        mine = (votes.c.message_id == self.id) & (votes.c.user_id == user_id)
+        deltas = {'like': 0, 'dislike': 0}
+
+        for _ in range(3):
+            current = db.session.execute(db.select(votes.c.vote_type).where(mine)).scalar()
+            if current is None:
+                # New vote
+                applied = _insert_ignore(votes, {'message_id': self.id, 'user_id': user_id,
+                                                 'vote_type': vote_type})
+                if applied:
+                    deltas[vote_type] += 1
+            elif current == vote_type:
                 # Remove vote if clicking same button
-                if vote_type == 'like':
-                    self.likes = max(0, self.likes - 1)
-                else:
-                    self.dislikes = max(0, self.dislikes - 1)
-                db.session.delete(existing_vote)
+                applied = db.session.execute(
+                    votes.delete().where(mine, votes.c.vote_type == current)
+                ).rowcount == 1
+                if applied:
+                    deltas[vote_type] -= 1
             else:
                 # Change vote type
-                if vote_type == 'like':
-                    self.likes = self.likes + 1
-                    self.dislikes = max(0, self.dislikes - 1)
-                else:
-                    self.likes = max(0, self.likes - 1)
-                    self.dislikes = self.dislikes + 1
-                existing_vote.vote_type = vote_type
-        else:
-            # New vote
-            if vote_type == 'like':
-                self.likes = self.likes + 1
-            else:
-                self.dislikes = self.dislikes + 1
-            new_vote = MessageVote(
-                message_id=self.id,
-                user_id=user_id,
-                vote_type=vote_type
+                applied = db.session.execute(
+                    votes.update().where(mine, votes.c.vote_type == current)
+                    .values(vote_type=vote_type, timestamp=datetime.utcnow())
+                ).rowcount == 1
+                if applied:
+                    deltas[current] -= 1
+                    deltas[vote_type] += 1
+            if applied:
+                break
+
+        messages = Message.__table__
+        if deltas['like'] or deltas['dislike']:
+            db.session.execute(
+                messages.update().where(messages.c.id == self.id)
+                .values(likes=_add_clamped(messages.c.likes, deltas['like']),
+                        dislikes=_add_clamped(messages.c.dislikes, deltas['dislike']))
             )
-            db.session.add(new_vote)
-
+        likes, dislikes = db.session.execute(
+            db.select(messages.c.likes, messages.c.dislikes).where(messages.c.id == self.id)
+        ).one()
         db.session.commit()
-        return self.likes, self.dislikes
+        return likes or 0, dislikes or 0
 
     @classmethod
     def get_recent_intent_distribution(cls, room_id: int, limit: int = 10) -> Dict[str, float]:
@@ -751,4 +797,68 @@ class MessageVote(db.Model):
 
     __table_args__ = (
         db.UniqueConstraint('message_id', 'user_id', name='unique_message_vote'),
-    ) 
\ No newline at end of file
+    )
+
+class PointsLedger(db.Model):
+    """Append-only record of every change to User.points (see app/points_ledger.py)"""
+    __tablename__ = 'points_ledger'
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False, index=True)
+    delta = db.Column(db.Integer, nullable=False)
+    balance = db.Column(db.Integer, nullable=False)  # User.points after the change
+    reason = db.Column(db.String(32), nullable=False)  # 'opening', 'question', 'answer_accepted', 'adjustment', ...
+    message_id = db.Column(db.Integer, db.ForeignKey('message.id', ondelete='SET NULL'), nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False, index=True)
+
+class PointsSnapshot(db.Model):
+    """Balance of a user according to the ledger, up to and including ledger row ledger_id"""
+    __tablename__ = 'points_snapshot'
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False, index=True)
+    balance = db.Column(db.Integer, nullable=False)
+    ledger_id = db.Column(db.Integer, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+@db.event.listens_for(User, 'after_insert')
+def _ledger_opening_balance(mapper, connection, user):
+    """New users start with a ledger row for their opening balance"""
+    connection.execute(PointsLedger.__table__.insert().values(
+        user_id=user.id, delta=user.points or 0, balance=user.points or 0, reason='opening',
+        created_at=datetime.utcnow()
+    ))
+
+@db.event.listens_for(User, 'after_update')
+def _ledger_orm_change(mapper, connection, user):
+    """Points set on the object and flushed by the ORM (admin edits) are ledgered as adjustments"""
+    history = db.inspect(user).attrs.points.history
+    if not history.has_changes():
+        return
+    old = (history.deleted or [0])[0] or 0
+    new = user.points or 0
+    if new != old:
+        connection.execute(PointsLedger.__table__.insert().values(
+            user_id=user.id, delta=new - old, balance=new, reason='adjustment',
+            created_at=datetime.utcnow()
+        ))
+
+def _insert_ignore(table, values):
+    """INSERT that does nothing when it hits a unique constraint; True if the row was added"""
+    dialect = db.session.get_bind().dialect.name
+    if dialect == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert
+    elif dialect == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.exc import IntegrityError
+        try:
+            with db.session.begin_nested():
+                db.session.execute(table.insert().values(**values))
+            return True
+        except IntegrityError:
+            return False
+    return db.session.execute(insert(table).values(**values).on_conflict_do_nothing()).rowcount == 1
+
+def _add_clamped(column, delta):
+    """SQL expression column + delta, treating NULL as 0 and never below 0"""
+    value = db.func.coalesce(column, 0) + delta
+    return db.case((value < 0, 0), else_=value)
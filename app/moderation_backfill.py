@@ -0,0 +1,128 @@
+"""
+Historical re-moderation of stored messages (``flask moderation-backfill``)
+
+When vulgar_words.json grows, messages saved before the change are never
+checked again. The backfill streams Message rows in id order with keyset
+pagination (``WHERE id > last_id ORDER BY id LIMIT n``, so every chunk is an
+index range scan no matter how deep into the table it is), matches them with
+the compiled ProfanityMatcher in a pool of low-priority worker processes and
+writes the flag changes back in one short UPDATE per chunk.
+
+Reads and writes are separate, brief transactions: the live app only ever
+waits for a single chunk update, never for the whole scan.
+"""
+import os
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+from sqlalchemy import text
+
+from app.profanity import ProfanityMatcher, DEFAULT_WORDS_PATH
+
+_worker_matcher = None
+
+def _init_worker(words_path, nice):
+    """Runs once in every worker process"""
+    global _worker_matcher
+    if nice and hasattr(os, 'nice'):
+        try:
+            os.nice(nice)
+        except OSError:
+            pass
+    _worker_matcher = ProfanityMatcher(words_path, check_interval=float('inf'))
+    _worker_matcher.reload()
+
+def scan_chunk(rows, matcher=None):
+    """Return {message_id: [matched entries]} for the rows that match"""
+    matcher = matcher or _worker_matcher
+    flagged = {}
+    for message_id, content in rows:
+        entries = matcher.find(content or '')
+        if entries:
+            flagged[message_id] = entries
+    return flagged
+
+def iter_chunks(engine, chunk_size, start_id=0):
+    """Yield lists of (id, content, is_flagged) rows in id order"""
+    last_id = start_id
+    query = text('SELECT id, content, is_flagged FROM message WHERE id > :last_id ORDER BY id LIMIT :limit')
+    while True:
+        with engine.connect() as conn:
+            rows = conn.execute(query, {'last_id': last_id, 'limit': chunk_size}).fetchall()
+        if not rows:
+            return
+        yield [tuple(row) for row in rows]
+        last_id = rows[-1][0]
+
+def apply_flags(engine, flag_ids, unflag_ids):
+    """Write one chunk's flag changes in a single short transaction"""
+    if not flag_ids and not unflag_ids:
+        return
+    update = text('UPDATE message SET is_flagged = :flag WHERE id = :id')
+    params = [{'flag': True, 'id': i} for i in flag_ids] + [{'flag': False, 'id': i} for i in unflag_ids]
+    with engine.begin() as conn:
+        conn.execute(update, params)
+
+def run_backfill(engine, words_path=DEFAULT_WORDS_PATH, chunk_size=1000, workers=None,
+                 start_id=0, nice=10, pause=0.0, dry_run=False, unflag=True, progress=None):
+    """Re-check every message after start_id and update Message.is_flagged.
+
+    ``workers=0`` scans in this process (useful for tests and tiny tables).
+    ``pause`` sleeps between chunk writes to leave the database to live
+    traffic. Returns a summary report dict.
+    """
+    started = time.perf_counter()
+    report = {
+        'scanned': 0,
+        'matched': 0,
+        'newly_flagged': 0,
+        'unflagged': 0,
+        'last_id': start_id,
+        'top_words': Counter(),
+        'dry_run': dry_run
+    }
+
+    def record(rows, flagged):
+        previously = {message_id for message_id, _, is_flagged in rows if is_flagged}
+        flag_ids = [message_id for message_id in flagged if message_id not in previously]
+        unflag_ids = [message_id for message_id in previously if message_id not in flagged] if unflag else []
+        if not dry_run:
+            apply_flags(engine, flag_ids, unflag_ids)
+            if pause:
+                time.sleep(pause)
+        report['scanned'] += len(rows)
+        report['matched'] += len(flagged)
+        report['newly_flagged'] += len(flag_ids)
+        report['unflagged'] += len(unflag_ids)
+        report['last_id'] = rows[-1][0]
+        for entries in flagged.values():
+            report['top_words'].update(entries)
+        if progress:
+            progress(report)
+
+    if workers == 0:
+        matcher = ProfanityMatcher(words_path, check_interval=float('inf'))
+        matcher.reload()
+        for rows in iter_chunks(engine, chunk_size, start_id):
+            record(rows, scan_chunk([(i, c) for i, c, _ in rows], matcher))
+    else:
+        workers = workers or max(1, (os.cpu_count() or 2) - 1)
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(words_path, nice)) as pool:
+            # Keep a bounded number of chunks in flight; results are written
+            # back in id order so last_id is always a safe resume point
+            pending = []
+            for rows in iter_chunks(engine, chunk_size, start_id):
+                pending.append((rows, pool.submit(scan_chunk, [(i, c) for i, c, _ in rows])))
+                if len(pending) >= workers * 2:
+                    rows, future = pending.pop(0)
+                    record(rows, future.result())
+            for rows, future in pending:
+                record(rows, future.result())
+
+    elapsed = time.perf_counter() - started
+    report['seconds'] = round(elapsed, 3)
+    report['rows_per_second'] = round(report['scanned'] / elapsed, 1) if elapsed else 0.0
+    report['top_words'] = report['top_words'].most_common(20)
+    return report
@@ -0,0 +1,182 @@
+"""
+Near-duplicate message detection with SimHash and LSH buckets
+
+Spam floods and copy-pasted promotions arrive as many almost identical
+messages. Each message gets a 64-bit SimHash over its word shingles; two
+messages whose fingerprints differ in at most ``max_distance`` bits are near
+duplicates. Fingerprints are split into ``max_distance + 1`` bands, so by the
+pigeonhole principle any near duplicate shares at least one band exactly and
+only the messages in those buckets are compared.
+
+The index is bounded: the oldest entries are dropped first. An entry keeps
+the id of the first message, how many copies have been seen and, once one
+copy has been analyzed, its analysis result for reuse.
+"""
+import hashlib
+import re
+import threading
+import time
+from collections import OrderedDict
+
+_TOKEN_RE = re.compile(r'\w+')
+
+def fingerprint_tokens(text):
+    return _TOKEN_RE.findall(text.lower())
+
+def simhash(tokens, shingle_size=3):
+    """64-bit SimHash of the word shingles of a token list"""
+    if len(tokens) < shingle_size:
+        features = [' '.join(tokens)]
+    else:
+        features = [' '.join(tokens[i:i + shingle_size]) for i in range(len(tokens) - shingle_size + 1)]
+
+    weights = [0] * 64
+    for feature in features:
+        h = int.from_bytes(hashlib.blake2b(feature.encode('utf-8'), digest_size=8).digest(), 'big')
+        for bit in range(64):
+            weights[bit] += 1 if h >> bit & 1 else -1
+
+    value = 0
+    for bit, weight in enumerate(weights):
+        if weight > 0:
+            value |= 1 << bit
+    return value
+
+class NearDuplicateIndex:
+    def __init__(self, max_entries=50000, max_distance=3, min_tokens=5):
+        self.max_entries = max_entries
+        self.max_distance = max_distance
+        self.min_tokens = min_tokens  # shorter messages ("ok thanks") are never duplicates
+        self._bands = max_distance + 1
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # fingerprint -> entry
+        self._buckets = {}  # (band, band value) -> set of fingerprints
+        self.checked = 0
+        self.duplicates = 0
+        self.reused = 0
+
+    def init_app(self, app):
+        """Apply the NEAR_DUPLICATE_* settings"""
+        with self._lock:
+            self.max_entries = app.config.get('NEAR_DUPLICATE_MAX_ENTRIES', self.max_entries)
+            self.min_tokens = app.config.get('NEAR_DUPLICATE_MIN_TOKENS', self.min_tokens)
+            max_distance = app.config.get('NEAR_DUPLICATE_MAX_DISTANCE', self.max_distance)
+            if max_distance != self.max_distance:
+                self.max_distance = max_distance
+                self._bands = max_distance + 1
+                self._entries.clear()
+                self._buckets.clear()
+
+    def fingerprint(self, text, tokens=None):
+        """SimHash of text, or None when it is too short to compare"""
+        if tokens is None:
+            tokens = fingerprint_tokens(text)
+        if len(tokens) < self.min_tokens:
+            return None
+        return simhash(tokens)
+
+    def find(self, text, tokens=None):
+        """Return a copy of the closest near-duplicate entry, or None"""
+        fp = self.fingerprint(text, tokens)
+        if fp is None:
+            return None
+        with self._lock:
+            entry = self._closest(fp)
+            return dict(entry) if entry else None
+
+    def observe(self, text, message_id=None, tokens=None):
+        """Record a new message and return the entry it duplicates, if any.
+
+        The returned copy has ``count``, the number of copies seen including
+        this one, which callers can use as a flood or moderation signal.
+        ``tokens`` is fingerprint_tokens(text), if the caller already has it.
+        """
+        fp = self.fingerprint(text, tokens)
+        if fp is None:
+            return None
+        with self._lock:
+            self.checked += 1
+            entry = self._closest(fp)
+            if entry is None:
+                self._insert(fp, message_id)
+                return None
+            self.duplicates += 1
+            entry['count'] += 1
+            entry['last_seen'] = time.time()
+            self._entries.move_to_end(entry['fingerprint'])
+            return dict(entry)
+
+    def analysis_for(self, text, tokens=None):
+        """Analysis result stored for a near-identical message, or None"""
+        entry = self.find(text, tokens)
+        if entry is None or entry['analysis'] is None:
+            return None
+        with self._lock:
+            self.reused += 1
+        return entry['analysis']
+
+    def store_analysis(self, text, analysis, tokens=None):
+        """Remember the analysis of text so near duplicates can reuse it"""
+        fp = self.fingerprint(text, tokens)
+        if fp is None:
+            return
+        with self._lock:
+            entry = self._closest(fp) or self._insert(fp, None)
+            if entry['analysis'] is None:
+                entry['analysis'] = analysis
+
+    def stats(self):
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'checked': self.checked,
+                'duplicates': self.duplicates,
+                'duplicate_rate': round(self.duplicates / self.checked, 3) if self.checked else 0.0,
+                'analysis_reused': self.reused
+            }
+
+    def _band_keys(self, fp):
+        width = 64 // self._bands
+        keys = []
+        for band in range(self._bands):
+            # The last band takes the leftover bits
+            bits = 64 - width * band if band == self._bands - 1 else width
+            keys.append((band, fp >> (width * band) & ((1 << bits) - 1)))
+        return keys
+
+    def _closest(self, fp):
+        best, best_distance = None, self.max_distance + 1
+        for key in self._band_keys(fp):
+            for candidate in self._buckets.get(key, ()):
+                distance = bin(fp ^ candidate).count('1')
+                if distance < best_distance:
+                    best, best_distance = self._entries[candidate], distance
+        return best
+
+    def _insert(self, fp, message_id):
+        now = time.time()
+        entry = self._entries.get(fp)
+        if entry is None:
+            entry = {
+                'fingerprint': fp,
+                'message_id': message_id,
+                'count': 1,
+                'first_seen': now,
+                'last_seen': now,
+                'analysis': None
+            }
+            self._entries[fp] = entry
+            for key in self._band_keys(fp):
+                self._buckets.setdefault(key, set()).add(fp)
+        while len(self._entries) > self.max_entries:
+            old_fp, _ = self._entries.popitem(last=False)
+            for key in self._band_keys(old_fp):
+                bucket = self._buckets.get(key)
+                if bucket is not None:
+                    bucket.discard(old_fp)
+                    if not bucket:
+                        del self._buckets[key]
+        return entry
+
+# Create a global instance
+near_duplicates = NearDuplicateIndex()
@@ -0,0 +1,192 @@
+"""
+Per-connection outbound queue limits and slow-client eviction
+
+Engine.IO keeps one outbound queue per connection and a writer drains it to
+the websocket. A client on a weak mobile link drains it slower than a busy
+room fills it, so the queue - and the process memory - keeps growing.
+OutboundGuard wraps the Socket.IO server's packet send and looks at the
+depth of the recipient's queue (in packets) before every packet:
+
+- at OUTBOUND_QUEUE_HIGH the connection counts as congested and low-priority
+  events (OUTBOUND_LOW_PRIORITY_EVENTS: votes, typing, presence, ...) to it
+  are dropped until the queue drains to OUTBOUND_QUEUE_LOW;
+- a connection congested for OUTBOUND_STUCK_SECONDS, or with
+  OUTBOUND_QUEUE_MAX packets queued, is disconnected: its backlog is
+  discarded and the client reconnects and catches up.
+
+When the whole process is overloaded every queue grows, and the limits then
+cap the memory of every connection, not just the slow ones.
+
+Nothing is tracked for connections below the high watermark, so the cost
+for healthy clients is one queue size lookup per packet. stats() reports
+the queue depth distribution over all connections of the process.
+"""
+import threading
+import time
+from bisect import bisect_left
+
+from socketio import packet as sio_packet
+
+DEFAULT_LOW_PRIORITY_EVENTS = (
+    'vote_updated', 'answer_started', 'answer_cancelled', 'user_joined', 'user_left',
+    'typing', 'topics_updated', 'rating_updated'
+)
+# Upper bounds (packets) of the queue depth histogram buckets
+DEPTH_BUCKETS = [0, 1, 5, 20, 50, 100, 200, 500, 1000]
+
+class OutboundGuard:
+    def __init__(self, high=100, low=20, max_depth=1000, stuck_seconds=30.0, low_priority=None):
+        self.high = high
+        self.low = low
+        self.max_depth = max_depth
+        self.stuck_seconds = stuck_seconds
+        self.low_priority = set(DEFAULT_LOW_PRIORITY_EVENTS if low_priority is None else low_priority)
+        self.enabled = True
+        self._server = None
+        self._lock = threading.Lock()
+        self._congested = {}  # eio_sid -> monotonic time the queue crossed the high watermark
+        self._evicting = set()
+        self.dropped = {}  # event -> packets dropped
+        self.evicted = 0
+
+    def init_app(self, app):
+        """Apply the OUTBOUND_* settings"""
+        self.enabled = app.config.get('OUTBOUND_GUARD_ENABLED', self.enabled)
+        self.high = app.config.get('OUTBOUND_QUEUE_HIGH', self.high)
+        self.low = app.config.get('OUTBOUND_QUEUE_LOW', self.low)
+        self.max_depth = app.config.get('OUTBOUND_QUEUE_MAX', self.max_depth)
+        self.stuck_seconds = app.config.get('OUTBOUND_STUCK_SECONDS', self.stuck_seconds)
+        events = app.config.get('OUTBOUND_LOW_PRIORITY_EVENTS')
+        if events:
+            self.low_priority = {e.strip() for e in events.split(',') if e.strip()}
+
+    def init_socketio(self, socketio):
+        """Guard every packet the Socket.IO server sends.
+
+        Broadcasts are encoded once and sent as Engine.IO packets
+        (_send_eio_packet); packets to a single client go through
+        _send_packet.
+        """
+        self._server = socketio.server
+        send_packet = self._server._send_packet
+        send_eio_packet = self._server._send_eio_packet
+
+        def guarded_send_packet(eio_sid, pkt):
+            if self.allow(eio_sid, pkt, _event_name):
+                send_packet(eio_sid, pkt)
+
+        def guarded_send_eio_packet(eio_sid, eio_pkt):
+            if self.allow(eio_sid, eio_pkt, _encoded_event_name):
+                send_eio_packet(eio_sid, eio_pkt)
+
+        self._server._send_packet = guarded_send_packet
+        self._server._send_eio_packet = guarded_send_eio_packet
+
+    def allow(self, eio_sid, pkt, event_name=None):
+        """False if pkt must not be queued for eio_sid; event_name(pkt) names its event"""
+        if not self.enabled:
+            return True
+        depth = self._depth(eio_sid)
+        if depth is None:
+            return True
+        with self._lock:
+            if eio_sid in self._evicting:
+                return False
+            since = self._congested.get(eio_sid)
+            if since is None:
+                if depth < self.high:
+                    return True
+                since = self._congested[eio_sid] = time.monotonic()
+            elif depth <= self.low:
+                del self._congested[eio_sid]
+                return True
+
+            if depth >= self.max_depth or time.monotonic() - since >= self.stuck_seconds:
+                self._evicting.add(eio_sid)
+                self._congested.pop(eio_sid, None)
+            else:
+                event = (event_name or _event_name)(pkt)
+                if event not in self.low_priority:
+                    return True
+                self.dropped[event] = self.dropped.get(event, 0) + 1
+                return False
+        # Not from here: the caller may be iterating over the room's members
+        print(f"Disconnecting slow client {eio_sid}: {depth} packets queued")
+        self._server.start_background_task(self._evict, eio_sid)
+        return False
+
+    def stats(self):
+        histogram = [0] * (len(DEPTH_BUCKETS) + 1)
+        depths = []
+        sockets = self._sockets()
+        for eio_sid in list(sockets):
+            depth = self._depth(eio_sid)
+            if depth is not None:
+                depths.append(depth)
+                histogram[bisect_left(DEPTH_BUCKETS, depth)] += 1
+        labels = [f'<={bound}' for bound in DEPTH_BUCKETS] + [f'>{DEPTH_BUCKETS[-1]}']
+        depths.sort()
+        with self._lock:
+            # Connections that closed while congested
+            for eio_sid in [sid for sid in self._congested if sid not in sockets]:
+                del self._congested[eio_sid]
+            return {
+                'enabled': self.enabled,
+                'high': self.high,
+                'low': self.low,
+                'max_depth': self.max_depth,
+                'connections': len(depths),
+                'congested': len(self._congested),
+                'max_queue': depths[-1] if depths else 0,
+                'p99_queue': depths[int(len(depths) * 0.99)] if depths else 0,
+                'queue_depths': dict(zip(labels, histogram)),
+                'dropped': dict(self.dropped),
+                'evicted': self.evicted
+            }
+
+    def _sockets(self):
+        return self._server.eio.sockets if self._server is not None else {}
+
+    def _depth(self, eio_sid):
+        socket = self._sockets().get(eio_sid)
+        if socket is None:
+            return None
+        return socket.queue.qsize()
+
+    def _evict(self, eio_sid):
+        """Drop the backlog of a stuck connection and close it"""
+        socket = self._sockets().get(eio_sid)
+        try:
+            if socket is not None:
+                while True:
+                    try:
+                        socket.queue.get_nowait()
+                        socket.queue.task_done()
+                    except Exception:
+                        break
+                socket.close(wait=False, abort=True)
+                self._sockets().pop(eio_sid, None)
+        finally:
+            with self._lock:
+                self._evicting.discard(eio_sid)
+                self.evicted += 1
+
+def _event_name(pkt):
+    """Event of a Socket.IO packet"""
+    if pkt.packet_type == sio_packet.EVENT and isinstance(pkt.data, list) and pkt.data:
+        return pkt.data[0]
+    return None
+
+def _encoded_event_name(eio_pkt):
+    """Event of an Engine.IO packet carrying an encoded Socket.IO EVENT (2[/ns,][id]["name",...])"""
+    data = eio_pkt.data
+    if not isinstance(data, str) or not data.startswith(str(sio_packet.EVENT)):
+        return None
+    start = data.find('["')
+    if start < 0:
+        return None
+    end = data.find('"', start + 2)
+    return data[start + 2:end] if end > 0 else None
+
+# Create a global instance
+outbound_guard = OutboundGuard()
@@ -0,0 +1,230 @@
+"""
+Message processing pipeline shared by the chat handlers
+
+A chat message used to be lowercased and split separately by the vulgar word
+check, check_message, the sales intent regexes, the language detector and
+the emotion/intent rules. MessagePipeline runs ordered stages over a single
+MessageContext that normalizes and tokenizes the text once; every stage reads
+the shared forms from it.
+
+Default stages: normalize -> moderate -> sales -> persist -> emotion. Inline
+stages run in the caller's thread and can reject the message; deferred
+stages (emotion, which may call a model) run afterwards on a small background
+pool inside an app context. Every stage is timed individually.
+"""
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from flask import current_app
+
+from app.language import detect_language
+from app.near_duplicate import fingerprint_tokens
+from app.profanity import normalize, profanity_matcher
+
+MODERATION_WARNING = "Your message contains inappropriate language and cannot be sent."
+
+class MessageContext:
+    """One message on its way through the pipeline.
+
+    The normalized forms are computed on first use and then shared by every
+    stage that needs them.
+    """
+    def __init__(self, text, **data):
+        self.text = text
+        self.data = data  # handler specific values (room_id, user, ...)
+        self.rejected = None  # reason shown to the sender when a stage rejects
+        self.timings = {}  # stage name -> milliseconds
+        self.results = {}  # stage name -> value returned by the stage
+        self._text_lower = None
+        self._tokens = None
+        self._chars = None
+        self._language = None
+
+    @property
+    def text_lower(self):
+        if self._text_lower is None:
+            self._text_lower = self.text.lower()
+        return self._text_lower
+
+    @property
+    def tokens(self):
+        """Lower case word tokens (used for near-duplicate fingerprints)"""
+        if self._tokens is None:
+            self._tokens = fingerprint_tokens(self.text_lower)
+        return self._tokens
+
+    @property
+    def chars(self):
+        """NFKC/case folded characters with original indices (for moderation)"""
+        if self._chars is None:
+            self._chars = normalize(self.text)
+        return self._chars
+
+    @property
+    def language(self):
+        if self._language is None:
+            self._language = detect_language(self.text)
+        return self._language
+
+    def reject(self, reason):
+        self.rejected = reason
+
+class MessagePipeline:
+    def __init__(self, deferred_workers=2, max_deferred=200):
+        self.stages = []  # (name, fn, deferred)
+        self.deferred_workers = deferred_workers
+        self.max_deferred = max_deferred
+        self._executor = None
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._timings = {}  # stage name -> deque of recent milliseconds
+        self._counts = {}
+        self.rejected = 0
+        self.dropped = 0
+
+    def init_app(self, app):
+        """Apply the PIPELINE_* settings"""
+        self.deferred_workers = app.config.get('PIPELINE_DEFERRED_WORKERS', self.deferred_workers)
+        self.max_deferred = app.config.get('PIPELINE_MAX_DEFERRED', self.max_deferred)
+
+    def stage(self, name, deferred=False):
+        """Decorator registering fn(ctx) as the next stage"""
+        def register(fn):
+            self.stages.append((name, fn, deferred))
+            self._timings[name] = deque(maxlen=1000)
+            self._counts[name] = 0
+            return fn
+        return register
+
+    def run(self, ctx):
+        """Run the inline stages, then queue the deferred ones.
+
+        Stops at the first stage that rejects the message; deferred stages
+        only run for accepted messages.
+        """
+        deferred = []
+        for name, fn, is_deferred in self.stages:
+            if is_deferred:
+                deferred.append((name, fn))
+                continue
+            self._run_stage(ctx, name, fn)
+            if ctx.rejected:
+                with self._lock:
+                    self.rejected += 1
+                return ctx
+
+        if deferred:
+            self._defer(ctx, deferred)
+        return ctx
+
+    def metrics(self):
+        """Per-stage call counts and timings"""
+        with self._lock:
+            stages = {}
+            for name, _, deferred in self.stages:
+                timings = sorted(self._timings[name])
+                stages[name] = {
+                    'deferred': deferred,
+                    'calls': self._counts[name],
+                    'avg_ms': round(sum(timings) / len(timings), 3) if timings else 0.0,
+                    'p95_ms': round(timings[int(len(timings) * 0.95)], 3) if timings else 0.0,
+                    'max_ms': round(timings[-1], 3) if timings else 0.0
+                }
+            return {
+                'stages': stages,
+                'rejected': self.rejected,
+                'deferred_pending': self._pending,
+                'deferred_dropped': self.dropped
+            }
+
+    def _run_stage(self, ctx, name, fn):
+        started = time.perf_counter()
+        try:
+            ctx.results[name] = fn(ctx)
+        finally:
+            elapsed = (time.perf_counter() - started) * 1000
+            ctx.timings[name] = elapsed
+            with self._lock:
+                self._timings[name].append(elapsed)
+                self._counts[name] += 1
+
+    def _defer(self, ctx, stages):
+        with self._lock:
+            if self._pending >= self.max_deferred:
+                # Deferred work is best effort; never let it queue without bound
+                self.dropped += 1
+                return
+            self._pending += 1
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.deferred_workers,
+                                                    thread_name_prefix='pipeline')
+            executor = self._executor
+        try:
+            app = current_app._get_current_object()
+        except RuntimeError:
+            app = None
+        executor.submit(self._run_deferred, app, ctx, stages)
+
+    def _run_deferred(self, app, ctx, stages):
+        try:
+            if app is None:
+                for name, fn in stages:
+                    self._run_stage(ctx, name, fn)
+                return
+            with app.app_context():
+                for name, fn in stages:
+                    self._run_stage(ctx, name, fn)
+        except Exception as e:
+            print(f"Error in deferred pipeline stage: {e}")
+        finally:
+            with self._lock:
+                self._pending -= 1
+
+# Create a global instance
+message_pipeline = MessagePipeline()
+
+@message_pipeline.stage('normalize')
+def normalize_stage(ctx):
+    """Tokenize and normalize once; later stages reuse the context's forms"""
+    return {'language': ctx.language, 'tokens': len(ctx.tokens), 'chars': len(ctx.chars)}
+
+@message_pipeline.stage('moderate')
+def moderate_stage(ctx):
+    spans = profanity_matcher.find_spans(ctx.text, chars=ctx.chars)
+    if spans:
+        ctx.reject(MODERATION_WARNING)
+    return spans
+
+@message_pipeline.stage('sales')
+def sales_stage(ctx):
+    from app.sales_analysis import sales_analyzer
+    return sales_analyzer.analyze(ctx.text_lower)
+
+@message_pipeline.stage('persist')
+def persist_stage(ctx):
+    """Save the message with the handler's ``persist`` callback"""
+    persist = ctx.data.get('persist')
+    return persist(ctx) if persist else None
+
+@message_pipeline.stage('emotion', deferred=True)
+def emotion_stage(ctx):
+    """Emotion and intent analysis, stored on the saved message"""
+    from app import db
+    from app.models import Message
+    from app.text_analysis import text_analyzer
+
+    # The forms the inline stages already computed; nothing is lowercased,
+    # tokenized or language-detected again
+    analysis = text_analyzer.analyze_message(ctx.text, text_lower=ctx.text_lower, tokens=ctx.tokens,
+                                             language=ctx.language)
+    message_id = ctx.data.get('message_id')
+    if message_id is None:
+        return analysis
+    message = db.session.get(Message, message_id)
+    if message is None:
+        return None
+    message.update_analysis(text_analyzer, analysis)
+    db.session.commit()
+    return message.primary_emotion
@@ -0,0 +1,210 @@
+"""
+In-memory room presence with delta broadcasts and batched persistence
+
+Joining or leaving a room used to commit a RoomMembership row and then load
+every active member (one query per member for the usernames) to broadcast
+the full list, so each join or leave cost O(members) queries and bytes.
+PresenceService keeps the connected sids per room and user in memory:
+
+- join/leave/disconnect only report whether a user appeared in or vanished
+  from a room, and the handlers broadcast that delta (user_joined/user_left);
+- the full member list is sent once, to the joining client only (members);
+- RoomMembership.is_active/last_active are written lazily: changes are
+  buffered and flushed in one batch every PRESENCE_FLUSH_SECONDS, or when
+  PRESENCE_FLUSH_BATCH changes are pending.
+
+The sids live in the process that holds the connections. With several
+workers the deltas reach every client through SOCKETIO_MESSAGE_QUEUE, and
+the member list for a joining client adds the members other workers have
+flushed to the database (shared=True). A user connected to a room through
+two workers shows as left when one of them disconnects, until they act again.
+"""
+import os
+import threading
+from datetime import datetime
+
+class PresenceService:
+    def __init__(self, flush_interval=5.0, flush_batch=500):
+        self.flush_interval = flush_interval
+        self.flush_batch = flush_batch
+        self.shared = False
+        self._app = None
+        self._lock = threading.Lock()
+        self._rooms = {}  # room_id -> {user_id: set of sids}
+        self._sids = {}  # sid -> {room_id: user_id}
+        self._usernames = {}  # user_id -> username
+        self._pending = {}  # (user_id, room_id) -> (is_active, last_active)
+        self._flusher_pid = None
+        self._wake = threading.Event()
+        self.flushes = 0
+        self.flushed_rows = 0
+
+    def init_app(self, app):
+        """Apply the PRESENCE_* settings; the flusher starts with the first join"""
+        self._app = app
+        self.flush_interval = app.config.get('PRESENCE_FLUSH_SECONDS', self.flush_interval)
+        self.flush_batch = app.config.get('PRESENCE_FLUSH_BATCH', self.flush_batch)
+        self.shared = bool(app.config.get('SOCKETIO_MESSAGE_QUEUE'))
+
+    def join(self, room_id, user_id, username, sid):
+        """Add a connection to a room; True if the user was not present before"""
+        room_id = int(room_id)
+        with self._lock:
+            members = self._rooms.setdefault(room_id, {})
+            sids = members.setdefault(user_id, set())
+            appeared = not sids
+            sids.add(sid)
+            self._sids.setdefault(sid, {})[room_id] = user_id
+            self._usernames[user_id] = username
+            self._mark(user_id, room_id, True)
+        self._ensure_flusher()
+        return appeared
+
+    def leave(self, room_id, user_id, sid):
+        """Remove a connection from a room; True if it was the user's last one"""
+        room_id = int(room_id)
+        with self._lock:
+            rooms = self._sids.get(sid)
+            if rooms is not None:
+                rooms.pop(room_id, None)
+                if not rooms:
+                    del self._sids[sid]
+            return self._remove(room_id, user_id, sid)
+
+    def disconnect(self, sid):
+        """Drop a closed connection; return [(room_id, user_id, username)] it was the last one in"""
+        vanished = []
+        with self._lock:
+            for room_id, user_id in self._sids.pop(sid, {}).items():
+                if self._remove(room_id, user_id, sid):
+                    vanished.append((room_id, user_id, self._usernames.get(user_id)))
+        return vanished
+
+    def members(self, room_id):
+        """[{'user_id', 'username'}] of the users connected to a room in this process"""
+        with self._lock:
+            return [{'user_id': user_id, 'username': self._usernames.get(user_id)}
+                    for user_id in self._rooms.get(int(room_id), {})]
+
+    def is_present(self, room_id, user_id):
+        with self._lock:
+            return bool(self._rooms.get(int(room_id), {}).get(user_id))
+
+    def flush(self):
+        """Write the buffered is_active/last_active changes in one transaction"""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        if not pending or self._app is None:
+            return 0
+        from app import db
+        from app.models import RoomMembership
+
+        table = RoomMembership.__table__
+        try:
+            with self._app.app_context(), db.engine.begin() as conn:
+                room_ids = {room_id for _, room_id in pending}
+                existing = set(conn.execute(
+                    db.select(table.c.user_id, table.c.room_id).where(table.c.room_id.in_(room_ids))
+                ).tuples())
+                updates = [{'u': user_id, 'r': room_id, 'active': active, 'at': at}
+                           for (user_id, room_id), (active, at) in pending.items()
+                           if (user_id, room_id) in existing]
+                inserts = [{'user_id': user_id, 'room_id': room_id, 'is_active': active,
+                            'joined_at': at, 'last_active': at}
+                           for (user_id, room_id), (active, at) in pending.items()
+                           if (user_id, room_id) not in existing]
+                if updates:
+                    conn.execute(
+                        table.update()
+                        .where(table.c.user_id == db.bindparam('u'), table.c.room_id == db.bindparam('r'))
+                        .values(is_active=db.bindparam('active'), last_active=db.bindparam('at')),
+                        updates
+                    )
+                if inserts:
+                    conn.execute(table.insert(), inserts)
+        except Exception as e:
+            print(f"Error flushing presence: {e}")
+            with self._lock:
+                # Keep the changes for the next flush unless newer ones arrived
+                for key, value in pending.items():
+                    self._pending.setdefault(key, value)
+            return 0
+        with self._lock:
+            self.flushes += 1
+            self.flushed_rows += len(pending)
+        return len(pending)
+
+    def active_members(self, room_id):
+        """Members of a room across workers: this process plus the flushed database state"""
+        members = self.members(room_id)
+        if not self.shared:
+            return members
+        from app import db
+        from app.models import RoomMembership, User
+
+        known = {m['user_id'] for m in members}
+        rows = db.session.execute(
+            db.select(User.id, User.username)
+            .join(RoomMembership, RoomMembership.user_id == User.id)
+            .where(RoomMembership.room_id == int(room_id), RoomMembership.is_active.is_(True))
+        ).all()
+        return members + [{'user_id': user_id, 'username': username}
+                          for user_id, username in rows if user_id not in known]
+
+    def stats(self):
+        with self._lock:
+            return {
+                'rooms': len(self._rooms),
+                'connections': len(self._sids),
+                'present': sum(len(members) for members in self._rooms.values()),
+                'pending_writes': len(self._pending),
+                'flushes': self.flushes,
+                'flushed_rows': self.flushed_rows
+            }
+
+    def reset(self):
+        with self._lock:
+            self._rooms.clear()
+            self._sids.clear()
+            self._usernames.clear()
+            self._pending.clear()
+
+    def _remove(self, room_id, user_id, sid):
+        """Drop sid from a room (lock held); True if the user has no connection left there"""
+        members = self._rooms.get(room_id)
+        sids = members.get(user_id) if members else None
+        if not sids or sid not in sids:
+            return False
+        sids.discard(sid)
+        if sids:
+            return False
+        del members[user_id]
+        if not members:
+            del self._rooms[room_id]
+        self._mark(user_id, room_id, False)
+        return True
+
+    def _mark(self, user_id, room_id, active):
+        """Buffer a membership change (lock held); a full buffer wakes the flusher"""
+        self._pending[(user_id, room_id)] = (active, datetime.utcnow())
+        if len(self._pending) >= self.flush_batch:
+            self._wake.set()
+
+    def _ensure_flusher(self):
+        """Start the periodic flusher once per process (again after a fork)"""
+        if self._app is None or self._flusher_pid == os.getpid():
+            return
+        with self._lock:
+            if self._flusher_pid == os.getpid():
+                return
+            self._flusher_pid = os.getpid()
+            threading.Thread(target=self._flush_periodically, daemon=True).start()
+
+    def _flush_periodically(self):
+        while True:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            self.flush()
+
+# Create a global instance
+presence = PresenceService()
@@ -0,0 +1,246 @@
+"""
+Compiled, obfuscation-resistant profanity matcher shared by every moderation check
+
+The word list in static/data/vulgar_words.json is loaded once per process
+and compiled into a character trie; multi-word entries ("f off") get space
+edges. The file's mtime is checked at most every few seconds and the list is
+recompiled when it changes, so editing the file takes effect without a
+restart and without per-message disk reads.
+
+Messages are normalized before matching (see normalize): Unicode NFKC and
+case folding, zero-width and combining characters dropped, look-alike
+letters from other scripts folded to Latin. The trie is then walked as an
+NFA in a single pass over the text, which catches common obfuscations:
+
+- leet spellings ("b@d", "sh1t"): every character is tried both literally and
+  through LEET, since the list itself contains entries like "a$$";
+- repeated letters ("baaad"): a letter may repeat the one just matched;
+- separators ("b.a.d", "b-a-d"): punctuation is skipped inside a match;
+- spacing ("b a d"): whitespace is skipped only between single letters, and
+  only for matches of at least three letters, so normal words never merge.
+
+A match must start at the beginning of a word, end where the next
+character is not a letter or digit, and contain at least one letter. Each step only advances the active
+states, so the scan is linear in the message length.
+"""
+import json
+import os
+import threading
+import time
+import unicodedata
+
+DEFAULT_WORDS_PATH = os.path.join(os.path.dirname(__file__), 'static', 'data', 'vulgar_words.json')
+
+# Punctuation stripped from both ends of every word of a list entry
+STRIP_CHARS = '.,!?()[]{}":;'
+
+# Characters commonly substituted for letters
+LEET = {
+    '@': 'a', '4': 'a', '^': 'a', '8': 'b', '3': 'e', '6': 'g', '9': 'g',
+    '#': 'h', '1': 'il', '!': 'i', '|': 'il', '0': 'o', '5': 's', '$': 's',
+    '7': 't', '+': 't', '2': 'z'
+}
+
+# Look-alike letters from other scripts that NFKC leaves alone
+CONFUSABLES = {
+    'а': 'a', 'в': 'b', 'е': 'e', 'ё': 'e', 'к': 'k', 'м': 'm', 'н': 'h', 'о': 'o',
+    'р': 'p', 'с': 'c', 'т': 't', 'у': 'y', 'х': 'x', 'ѕ': 's', 'і': 'i', 'ј': 'j',
+    'ԁ': 'd', 'ɡ': 'g', 'α': 'a', 'β': 'b', 'ε': 'e', 'η': 'n', 'ι': 'i', 'κ': 'k',
+    'ν': 'v', 'ο': 'o', 'ρ': 'p', 'τ': 't', 'υ': 'u', 'χ': 'x', 'ω': 'w', 'ı': 'i'
+}
+
+# Unicode categories dropped entirely: format (zero-width joiners and the
+# like), and combining marks used to decorate letters
+DROPPED_CATEGORIES = ('Cf', 'Mn', 'Me')
+
+# Matches shorter than this must be a plain word: spaced out ("b c") or
+# punctuated ("B.C.", "M.F.") they are initialisms, and joined to another
+# word ("tf-idf") they are part of a term
+MIN_SPACED_LENGTH = 3
+
+def _joined(chars, start, end):
+    """True if chars[start..end] is attached to another word by a separator ("tf-idf", "r&d")"""
+    before = chars[start - 2:start]
+    after = chars[end + 1:end + 3]
+    return (len(before) == 2 and before[1][0] != ' ' and before[0][0].isalnum()) or \
+           (len(after) == 2 and after[0][0] != ' ' and after[1][0].isalnum())
+
+def normalize(text):
+    """Return [(char, original index), ...] for matching.
+
+    Characters are NFKC normalized and case folded, which can expand one
+    character into several; each keeps the index of the character it came
+    from so matches map back to spans of the original text.
+    """
+    if text.isascii():
+        return [(' ' if char.isspace() else char, index) for index, char in enumerate(text.lower())]
+
+    chars = []
+    for index, char in enumerate(text):
+        if char.isascii():
+            chars.append((' ' if char.isspace() else char.lower(), index))
+            continue
+        for folded in unicodedata.normalize('NFKC', char).casefold():
+            if unicodedata.category(folded) in DROPPED_CATEGORIES:
+                continue
+            folded = CONFUSABLES.get(folded, folded)
+            chars.append((' ' if folded.isspace() else folded, index))
+    return chars
+
+def normalize_entry(entry):
+    """Normalized form of a word list entry: case folded words, single spaced"""
+    words = unicodedata.normalize('NFKC', str(entry)).casefold().split()
+    return ' '.join(w for w in (word.strip(STRIP_CHARS) for word in words) if w)
+
+class ProfanityMatcher:
+    def __init__(self, path=DEFAULT_WORDS_PATH, check_interval=5.0):
+        self.path = path
+        self.check_interval = check_interval  # seconds between mtime checks
+        self._lock = threading.Lock()
+        self._mtime = None
+        self._next_check = 0.0
+        self.words = frozenset()
+        # Trie as parallel lists indexed by node id; node 0 is the root
+        self._children = [{}]
+        self._terminal = [None]
+        self._depth = [0]
+        self.loads = 0
+
+    def reload(self):
+        """Read and compile the word list now"""
+        try:
+            mtime = os.stat(self.path).st_mtime
+            with open(self.path, 'r', encoding='utf-8') as f:
+                entries = json.load(f)
+        except FileNotFoundError:
+            print(f"Vulgar words file not found: {self.path}")
+            entries, mtime = [], None
+        except (OSError, ValueError) as e:
+            # Keep the last good list if the file is mid-edit or broken
+            print(f"Error loading vulgar words: {e}")
+            return False
+
+        words = set()
+        children, terminal, depth = [{}], [None], [0]
+        for entry in entries:
+            entry = normalize_entry(entry)
+            if not entry:
+                continue
+            words.add(entry)
+            node = 0
+            for char in entry:
+                child = children[node].get(char)
+                if child is None:
+                    child = len(children)
+                    children[node][char] = child
+                    children.append({})
+                    terminal.append(None)
+                    depth.append(depth[node] + 1)
+                node = child
+            terminal[node] = entry
+
+        with self._lock:
+            self.words = frozenset(words)
+            self._children, self._terminal, self._depth = children, terminal, depth
+            self._mtime = mtime
+            self.loads += 1
+        return True
+
+    def find_spans(self, text, chars=None):
+        """Return [(start, end, entry), ...] for every listed word or phrase in text.
+
+        ``start``/``end`` index the original text, so ``text[start:end]`` is the
+        matched (possibly obfuscated) substring. ``chars`` is normalize(text),
+        if the caller already has it.
+        """
+        self.reload_if_changed()
+        children, terminal, depth = self._children, self._terminal, self._depth
+        root = children[0]
+        if chars is None:
+            chars = normalize(text)
+        found = {}
+
+        # Active states: (node, last matched char, letters since the last
+        # skipped space, spaced, separated) -> earliest start position
+        states = {}
+        previous = None
+        for position, (char, _) in enumerate(chars):
+            is_alnum = char.isalnum()
+            alternatives = char + LEET.get(char, '')
+            next_states = {}
+
+            # A match can only start at the beginning of a word
+            if (previous is None or (not previous.isalnum() and previous not in LEET)) \
+                    and any(alternative in root for alternative in alternatives):
+                states[(0, None, 0, False, False)] = position
+            if not states:
+                previous = char
+                continue
+
+            for (node, last, run, spaced, separated), start in states.items():
+                candidates = []
+                for alternative in alternatives:
+                    child = children[node].get(alternative)
+                    if child is not None:
+                        if alternative == ' ':
+                            candidates.append((child, alternative, 0, spaced, separated))
+                        elif not spaced or run == 0:
+                            candidates.append((child, alternative, run + 1, spaced, separated))
+                # Repeated letter ("baaad") stays on the same node
+                if last is not None and last in alternatives and (not spaced or last == ' '):
+                    candidates.append((node, last, run, spaced, separated))
+                if node:
+                    if char == ' ':
+                        # Spacing only counts between single letters
+                        if run <= 1 and last != ' ':
+                            candidates.append((node, last, 0, True, separated))
+                    elif not is_alnum:
+                        candidates.append((node, last, run, spaced, True))
+
+                for state in candidates:
+                    if state not in next_states or start < next_states[state]:
+                        next_states[state] = start
+
+            states = next_states
+            previous = char
+
+            # Accept at a terminal node when the word ends here
+            following = chars[position + 1][0] if position + 1 < len(chars) else None
+            if following is not None and following.isalnum():
+                continue
+            for (node, last, run, spaced, separated), start in states.items():
+                matched = terminal[node]
+                # Skipped separators do not end a word
+                if matched is None or last not in alternatives:
+                    continue
+                if depth[node] < MIN_SPACED_LENGTH and (spaced or separated or _joined(chars, start, position)):
+                    continue
+                span = (chars[start][1], chars[position][1] + 1)
+                # Numbers ("8.5") are not leet words
+                if span not in found and any(c.isalpha() for c in text[span[0]:span[1]]):
+                    found[span] = matched
+
+        return sorted((start, end, entry) for (start, end), entry in found.items())
+
+    def find(self, text):
+        """Return the listed words and phrases that occur in text"""
+        return [entry for _, _, entry in self.find_spans(text)]
+
+    def contains_profanity(self, text):
+        return bool(self.find_spans(text))
+
+    def reload_if_changed(self):
+        """Recompile the list if the file changed (checked every check_interval)"""
+        now = time.monotonic()
+        if now < self._next_check:
+            return
+        self._next_check = now + self.check_interval
+        try:
+            mtime = os.stat(self.path).st_mtime
+        except OSError:
+            mtime = None
+        if mtime != self._mtime or not self.loads:
+            self.reload()
+
+# Create a global instance
+profanity_matcher = ProfanityMatcher()
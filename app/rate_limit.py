@@ -0,0 +1,123 @@
+"""
+In-memory token-bucket rate limiter for Socket.IO events
+
+Each (event, user) key gets a bucket holding up to ``burst`` tokens that
+refills at ``rate`` tokens per second; an event spends one token and is
+throttled when the bucket is empty. Client-supplied fields such as room_id
+are not part of the key, or a client could get a fresh budget per value.
+A throttled client is told once per throttled stretch (see notify()), not
+once per dropped event. Checks are a dict lookup and a little
+arithmetic under one lock, so rejecting a flood costs far less than the
+moderation, database commit and broadcast it skips.
+
+Limits are per process: with several workers a client can get up to one
+budget per worker, which is still enough to stop floods.
+"""
+import threading
+import time
+
+# event -> (tokens per second, burst)
+DEFAULT_LIMITS = {
+    'message': (1.0, 5),
+    'answer': (0.5, 3),
+    'vote_message': (2.0, 10),
+    'rate_answer': (1.0, 5),
+    'accept_answer': (0.2, 2),
+}
+
+def parse_limits(spec):
+    """Parse "event=rate/burst,..." (e.g. "message=1/5,vote_message=2/10")"""
+    limits = {}
+    for item in (spec or '').split(','):
+        item = item.strip()
+        if not item:
+            continue
+        try:
+            event, value = item.split('=', 1)
+            rate, burst = value.split('/', 1)
+            limits[event.strip()] = (float(rate), int(burst))
+        except ValueError:
+            print(f"Ignoring invalid rate limit '{item}'")
+    return limits
+
+class RateLimiter:
+    def __init__(self, limits=None, max_buckets=100000):
+        self.limits = dict(DEFAULT_LIMITS if limits is None else limits)
+        self.max_buckets = max_buckets
+        self.enabled = True
+        self._lock = threading.Lock()
+        self._buckets = {}  # (event, user_id) -> [tokens, last refill time, notified]
+        self.allowed = {}  # event -> count
+        self.throttled = {}  # event -> count
+
+    def init_app(self, app):
+        """Apply RATE_LIMIT_ENABLED and the RATE_LIMITS overrides"""
+        self.enabled = app.config.get('RATE_LIMIT_ENABLED', self.enabled)
+        self.limits.update(parse_limits(app.config.get('RATE_LIMITS')))
+
+    def allow(self, event, user_id):
+        """Spend a token for event; False means the event must be dropped"""
+        limit = self.limits.get(event)
+        if not self.enabled or limit is None:
+            return True
+        rate, burst = limit
+        key = (event, user_id)
+        now = time.monotonic()
+
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                if len(self._buckets) >= self.max_buckets:
+                    self._prune(now)
+                bucket = self._buckets[key] = [float(burst), now, False]
+            else:
+                bucket[0] = min(burst, bucket[0] + (now - bucket[1]) * rate)
+                bucket[1] = now
+
+            if bucket[0] >= 1.0:
+                bucket[0] -= 1.0
+                bucket[2] = False
+                self.allowed[event] = self.allowed.get(event, 0) + 1
+                return True
+            self.throttled[event] = self.throttled.get(event, 0) + 1
+            return False
+
+    def notify(self, event, user_id):
+        """True for the first throttled event since the user's last allowed one"""
+        with self._lock:
+            bucket = self._buckets.get((event, user_id))
+            if bucket is None or bucket[2]:
+                return False
+            bucket[2] = True
+            return True
+
+    def reset(self):
+        with self._lock:
+            self._buckets.clear()
+            self.allowed.clear()
+            self.throttled.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'enabled': self.enabled,
+                'buckets': len(self._buckets),
+                'limits': {event: {'rate': rate, 'burst': burst} for event, (rate, burst) in self.limits.items()},
+                'allowed': dict(self.allowed),
+                'throttled': dict(self.throttled)
+            }
+
+    def _prune(self, now):
+        """Drop buckets that have refilled completely; they equal a new bucket"""
+        for key, (tokens, last, _) in list(self._buckets.items()):
+            rate, burst = self.limits.get(key[0], (0.0, 0))
+            if tokens + (now - last) * rate >= burst:
+                del self._buckets[key]
+        # Still full of active clients: drop the oldest half
+        if len(self._buckets) >= self.max_buckets:
+            oldest = sorted(self._buckets, key=lambda k: self._buckets[k][1])
+            for key in oldest[:len(oldest) // 2]:
+                del self._buckets[key]
+
+# Create a global instance
+rate_limiter = RateLimiter()
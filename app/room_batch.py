@@ -0,0 +1,183 @@
+"""
+Batched room broadcasts for high-traffic rooms
+
+Each room broadcast (message, vote_updated, answer_rated, ...) is one
+websocket frame to every member, so a busy room costs events x members
+frames. With ROOM_BATCH_ENABLED, RoomBatcher collects the events of a room
+that is busy - at least ROOM_BATCH_MIN_RATE events in the current or the
+previous second - for ROOM_BATCH_WINDOW_MS and sends them as one frame:
+
+    batch {'room': '12', 'events': [['message', {...}], ['vote_updated', {...}]]}
+
+The client (main.js) hands every event of the frame to its normal handler,
+in order. Quiet rooms are not delayed: their events are sent at once.
+
+Delivery order per room is preserved: while a room has a batch open, every
+new event of that room joins it, and sends happen under one lock, so a
+direct send can never overtake a batch sent before it. A batch is sent
+early when it reaches ROOM_BATCH_MAX_EVENTS. Every room broadcast of the
+chat handlers goes through RoomBatcher.emit, batched or not, for this reason.
+The same lock orders the sequence numbers of the room event log
+(app/room_log.py) and the catch-up replies of RoomBatcher.resume.
+"""
+import threading
+import time
+
+class RoomBatcher:
+    def __init__(self, window_ms=50, max_events=50, min_rate=20):
+        self.window_ms = window_ms
+        self.max_events = max_events
+        self.min_rate = min_rate
+        self.enabled = False
+        self._socketio = None
+        self._log = None
+        self._lock = threading.Lock()
+        self._rates = {}  # room -> [second, events this second, events previous second]
+        self._batches = {}  # room -> (opened at, [[event, data], ...]), insertion ordered
+        self._flushing = False  # a flush task is running
+        self.events = 0
+        self.frames = 0
+        self.batched_events = 0
+        self.batches = 0
+
+    def init_app(self, app, socketio, log=None):
+        """Apply the ROOM_BATCH_* settings; events are numbered by log (room_log)"""
+        from app.room_log import room_log
+        self._socketio = socketio
+        self._log = log or room_log
+        self.enabled = app.config.get('ROOM_BATCH_ENABLED', self.enabled)
+        self.window_ms = app.config.get('ROOM_BATCH_WINDOW_MS', self.window_ms)
+        self.max_events = app.config.get('ROOM_BATCH_MAX_EVENTS', self.max_events)
+        self.min_rate = app.config.get('ROOM_BATCH_MIN_RATE', self.min_rate)
+
+    def emit(self, event, data, room, skip_sid=None):
+        """Broadcast event to room, directly or as part of the room's next batch.
+
+        Events that skip a sid cannot share a frame; they flush the room's
+        open batch and go out on their own.
+        """
+        room = str(room)
+        if not self.enabled or skip_sid is not None:
+            with self._lock:
+                data = self._stamp(room, event, data)
+                if room in self._batches:
+                    self._send(room)
+                self.events += 1
+                self.frames += 1
+                self._socketio.emit(event, data, room=room, skip_sid=skip_sid)
+            return
+
+        now = time.monotonic()
+        start_flusher = False
+        with self._lock:
+            data = self._stamp(room, event, data)
+            self.events += 1
+            busy = self._count(room, now)
+            batch = self._batches.get(room)
+            if batch is None and not busy:
+                self.frames += 1
+                self._socketio.emit(event, data, room=room)
+                return
+            if batch is None:
+                batch = self._batches[room] = (now, [])
+                start_flusher = not self._flushing
+                self._flushing = True
+            batch[1].append([event, data])
+            if len(batch[1]) >= self.max_events:
+                self._send(room)
+        if start_flusher:
+            self._socketio.start_background_task(self._flush_loop)
+
+    def resume(self, room, sid, epoch, seq, join, load_missed):
+        """Join a reconnected client to room and send it what it missed.
+
+        join() adds sid to the room. The reply goes to sid as
+
+            resumed {'room', 'epoch', 'seq', 'source', 'complete', 'events': [[event, data], ...]}
+
+        with the events after (epoch, seq) from the room log, or, when the log
+        cannot answer, load_missed() -> events from the database. Those are chat
+        messages only (votes, ratings and the like are not stored as events),
+        so a database reply is never complete and the client refetches the room.
+        Everything runs under the send lock: a broadcast to the room is either
+        in the reply or sent after it, never lost between the join and the
+        reply. The room's open batch is sent before the join, its events are
+        in the reply.
+        """
+        room = str(room)
+        with self._lock:
+            if room in self._batches:
+                self._send(room)
+            join()
+            events = self._log.since(room, epoch, seq) if self._log else None
+            source, complete = 'log', True
+            if events is None:
+                source, complete = 'database', False
+                events = load_missed()
+            head_epoch, head_seq = self._log.head(room) if self._log else (None, 0)
+            self.frames += 1
+            self._socketio.emit('resumed', {
+                'room': room,
+                'epoch': head_epoch,
+                'seq': head_seq,
+                'source': source,
+                'complete': complete,
+                'events': events
+            }, room=sid)
+            return source
+
+    def stats(self):
+        with self._lock:
+            return {
+                'enabled': self.enabled,
+                'window_ms': self.window_ms,
+                'min_rate': self.min_rate,
+                'events': self.events,
+                'frames': self.frames,
+                'batches': self.batches,
+                'avg_batch': round(self.batched_events / self.batches, 2) if self.batches else 0.0,
+                'open_batches': len(self._batches)
+            }
+
+    def _stamp(self, room, event, data):
+        """Number an event in the room log (lock held)"""
+        return self._log.stamp(room, event, data) if self._log else data
+
+    def _count(self, room, now):
+        """Count an event for room (lock held); True if the room is busy"""
+        second = int(now)
+        rate = self._rates.get(room)
+        if rate is None or second - rate[0] > 1:
+            rate = self._rates[room] = [second, 0, 0]
+        elif second != rate[0]:
+            rate[:] = [second, 0, rate[1]]
+        rate[1] += 1
+        return max(rate[1], rate[2]) >= self.min_rate
+
+    def _send(self, room):
+        """Send the open batch of room as one frame (lock held)"""
+        _, events = self._batches.pop(room)
+        self.frames += 1
+        self.batches += 1
+        self.batched_events += len(events)
+        self._socketio.emit('batch', {'room': room, 'events': events}, room=room)
+
+    def _flush_loop(self):
+        window = self.window_ms / 1000.0
+        while True:
+            self._socketio.sleep(window / 2)
+            now = time.monotonic()
+            with self._lock:
+                for room, (opened, _) in list(self._batches.items()):
+                    if now - opened >= window:
+                        self._send(room)
+                # Forget rooms that have been quiet for a while
+                for room, rate in list(self._rates.items()):
+                    if int(now) - rate[0] > 1:
+                        del self._rates[room]
+                if not self._batches:
+                    self._flushing = False
+                    return
+
+# Create a global instance
+room_batcher = RoomBatcher()
@@ -0,0 +1,174 @@
+"""
+Cheap, incrementally updated keyword summaries for chat rooms
+
+Keeps a sliding window of recent messages per room and extracts keyphrases
+for every room that changed with a single batched KeyBERT call. Message and
+candidate phrase embeddings are cached, so a refresh only encodes the
+messages and phrases that are new since the last one; a room's document
+embedding is the mean of its cached message embeddings instead of an
+encoding of the whole concatenated window.
+"""
+import threading
+import time
+from collections import OrderedDict, deque
+
+import numpy as np
+
+class RoomKeywordSummarizer:
+    def __init__(self, window=200, top_n=8, ngram_range=(1, 2), max_rooms=500, max_embeddings=50000):
+        self.window = window
+        self.top_n = top_n
+        self.ngram_range = ngram_range
+        self.max_rooms = max_rooms
+        self.max_embeddings = max_embeddings
+        self._lock = threading.Lock()
+        self._rooms = OrderedDict()  # room_id -> state dict
+        self._message_embeddings = OrderedDict()  # message_id -> vector
+        self._phrase_embeddings = OrderedDict()  # phrase -> vector
+        self.refreshes = 0
+        self.encoded_messages = 0
+        self.encoded_phrases = 0
+
+    def init_app(self, app):
+        """Apply the ROOM_KEYWORDS_* settings"""
+        self.window = app.config.get('ROOM_KEYWORDS_WINDOW', self.window)
+        self.top_n = app.config.get('ROOM_KEYWORDS_TOP_N', self.top_n)
+
+    def add_message(self, room_id, message_id, text):
+        """Record a new message; the room is re-summarized on the next refresh"""
+        with self._lock:
+            state = self._rooms.get(room_id)
+            if state is None:
+                # Seeded from the database on first use (see keywords)
+                return
+            state['messages'].append((message_id, text))
+            state['dirty'] = True
+
+    def load_room(self, room_id, messages):
+        """Seed a room's window with (message_id, text) pairs, oldest first"""
+        with self._lock:
+            self._rooms[room_id] = {
+                'messages': deque(messages, maxlen=self.window),
+                'keywords': [],
+                'updated_at': None,
+                'dirty': True
+            }
+            self._rooms.move_to_end(room_id)
+            while len(self._rooms) > self.max_rooms:
+                self._rooms.popitem(last=False)
+
+    def is_loaded(self, room_id):
+        with self._lock:
+            return room_id in self._rooms
+
+    def keywords(self, room_id, keyword_model):
+        """Return [(phrase, score), ...] for a room, refreshing changed rooms first"""
+        with self._lock:
+            state = self._rooms.get(room_id)
+            if state is None:
+                return []
+            self._rooms.move_to_end(room_id)
+            dirty = state['dirty']
+        if dirty:
+            self.refresh(keyword_model)
+        with self._lock:
+            return list(state['keywords'])
+
+    def refresh(self, keyword_model, room_ids=None):
+        """Re-summarize every changed room (or room_ids) in one batched call"""
+        with self._lock:
+            rooms = [(room_id, list(state['messages']))
+                     for room_id, state in self._rooms.items()
+                     if state['dirty'] and state['messages'] and (room_ids is None or room_id in room_ids)]
+        if not rooms:
+            return {}
+
+        embedder = keyword_model.model
+        docs = [' '.join(text for _, text in messages) for _, messages in rooms]
+
+        # Encode only messages not seen before, in one batch
+        texts = dict(mid_text for _, messages in rooms for mid_text in messages)
+        message_vectors = self._embed(self._message_embeddings, texts, embedder)
+        doc_embeddings = np.vstack([
+            np.vstack([message_vectors[mid] for mid, _ in messages]).mean(axis=0)
+            for _, messages in rooms
+        ])
+
+        # Candidate phrases, built the same way KeyBERT builds them
+        from sklearn.feature_extraction.text import CountVectorizer
+        vectorizer = CountVectorizer(ngram_range=self.ngram_range, stop_words='english')
+        try:
+            phrases = list(vectorizer.fit(docs).get_feature_names_out())
+        except ValueError:
+            phrases = []  # only stop words
+        if not phrases:
+            return self._store(rooms, [[] for _ in rooms])
+
+        phrase_vectors = self._embed(self._phrase_embeddings, {p: p for p in phrases}, embedder)
+        word_embeddings = np.vstack([phrase_vectors[p] for p in phrases])
+
+        results = keyword_model.extract_keywords(
+            docs,
+            vectorizer=vectorizer,
+            top_n=self.top_n,
+            doc_embeddings=doc_embeddings,
+            word_embeddings=word_embeddings
+        )
+        # KeyBERT returns a flat list for a single document
+        if len(docs) == 1:
+            results = [results]
+        return self._store(rooms, results)
+
+    def stats(self):
+        """Cache sizes and how much encoding the refreshes needed"""
+        with self._lock:
+            return {
+                'rooms': len(self._rooms),
+                'dirty_rooms': sum(1 for state in self._rooms.values() if state['dirty']),
+                'cached_message_embeddings': len(self._message_embeddings),
+                'cached_phrase_embeddings': len(self._phrase_embeddings),
+                'refreshes': self.refreshes,
+                'encoded_messages': self.encoded_messages,
+                'encoded_phrases': self.encoded_phrases
+            }
+
+    def _store(self, rooms, results):
+        now = time.time()
+        updated = {}
+        with self._lock:
+            for (room_id, messages), keywords in zip(rooms, results):
+                state = self._rooms.get(room_id)
+                if state is None:
+                    continue
+                state['keywords'] = [(phrase, round(float(score), 4)) for phrase, score in keywords]
+                state['updated_at'] = now
+                # Messages that arrived during the refresh keep the room dirty
+                state['dirty'] = state['messages'][-1][0] != messages[-1][0]
+                updated[room_id] = state['keywords']
+            self.refreshes += 1
+        return updated
+
+    def _embed(self, cache, texts, embedder):
+        """Return {key: vector} for {key: text}, encoding only uncached keys"""
+        with self._lock:
+            vectors = {key: cache[key] for key in texts if key in cache}
+            for key in vectors:
+                cache.move_to_end(key)
+        missing = [key for key in texts if key not in vectors]
+        if not missing:
+            return vectors
+
+        encoded = embedder.embed([texts[key] for key in missing])
+        with self._lock:
+            for key, vector in zip(missing, encoded):
+                vectors[key] = cache[key] = np.asarray(vector)
+            while len(cache) > self.max_embeddings:
+                cache.popitem(last=False)
+            if cache is self._message_embeddings:
+                self.encoded_messages += len(missing)
+            else:
+                self.encoded_phrases += len(missing)
+        return vectors
+
+# Create a global instance
+room_keywords = RoomKeywordSummarizer()
@@ -0,0 +1,89 @@
+"""
+Sequenced room events for resuming after a reconnect
+
+Every broadcast to a chat room carries 'seq', a per-room number that grows
+by one per event, and 'epoch', which names the process that numbered it:
+
+    message {'id': 42, 'content': '...', ..., 'seq': 1017, 'epoch': '5f2c9a1e'}
+
+RoomEventLog numbers the events (RoomBatcher.emit calls stamp() under its
+send lock, so numbers follow delivery order) and keeps the last
+ROOM_LOG_SIZE of them per room. A client that reconnects sends 'resume'
+with the epoch and seq of the last event it handled and gets the events
+after it from the log (RoomBatcher.resume). When the log cannot answer -
+the events were pushed out of the buffer, the process restarted (new
+epoch), or several workers share a message queue and each numbers its own
+broadcasts - the chat messages after the client's last message id are read
+from the database instead.
+"""
+import threading
+import uuid
+from collections import deque
+
+class RoomEventLog:
+    def __init__(self, size=200):
+        self.size = size
+        self.enabled = False
+        self.shared = False
+        self.epoch = uuid.uuid4().hex[:8]
+        self._lock = threading.Lock()
+        self._rooms = {}  # room -> [last seq, deque of (seq, event, data)]
+        self.resumes = 0
+        self.misses = 0
+
+    def init_app(self, app):
+        """Apply the ROOM_LOG_* settings"""
+        self.enabled = app.config.get('ROOM_LOG_ENABLED', self.enabled)
+        self.size = app.config.get('ROOM_LOG_SIZE', self.size)
+        # Other workers number their broadcasts themselves (see module docstring)
+        self.shared = bool(app.config.get('SOCKETIO_MESSAGE_QUEUE'))
+
+    def stamp(self, room, event, data):
+        """Number an event of room; returns the payload to send"""
+        if not self.enabled or not room.isdigit() or not isinstance(data, dict):
+            return data
+        with self._lock:
+            log = self._rooms.get(room)
+            if log is None:
+                log = self._rooms[room] = [0, deque(maxlen=self.size)]
+            log[0] += 1
+            data = dict(data, seq=log[0], epoch=self.epoch)
+            log[1].append((log[0], event, data))
+        return data
+
+    def head(self, room):
+        """(epoch, seq) of the last event of room"""
+        with self._lock:
+            log = self._rooms.get(room)
+            return self.epoch, log[0] if log else 0
+
+    def since(self, room, epoch, seq):
+        """The [event, data] pairs of room after seq, or None if the log doesn't have all of them"""
+        with self._lock:
+            self.resumes += 1
+            log = self._rooms.get(room)
+            last = log[0] if log else 0
+            if (not self.enabled or self.shared or epoch != self.epoch
+                    or not isinstance(seq, int) or seq < 0 or seq > last):
+                self.misses += 1
+                return None
+            events = [[event, data] for n, event, data in log[1] if n > seq] if log else []
+            if len(events) < last - seq:
+                self.misses += 1
+                return None
+            return events
+
+    def stats(self):
+        with self._lock:
+            return {
+                'enabled': self.enabled,
+                'epoch': self.epoch,
+                'size': self.size,
+                'rooms': len(self._rooms),
+                'events': sum(len(log[1]) for log in self._rooms.values()),
+                'resumes': self.resumes,
+                'database_fallbacks': self.misses
+            }
+
+# Create a global instance
+room_log = RoomEventLog()
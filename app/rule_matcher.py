@@ -0,0 +1,81 @@
+"""
+Multi-pattern keyword matcher for the emotion and intent rule tables
+
+Compiles a {label: [patterns]} table once into an Aho-Corasick automaton, so
+every pattern of every label is found in a single pass over the text instead
+of one ``pattern in text`` scan per pattern.
+"""
+from collections import deque
+
+class RuleMatcher:
+    def __init__(self, rules):
+        """Build the automaton for a {label: [patterns]} table.
+
+        Patterns are matched as plain substrings, exactly like ``in``; lower
+        case them (and the text) for case-insensitive matching.
+        """
+        self.labels = list(rules)
+        self._patterns = []  # (label, pattern) per pattern id
+        self._goto = [{}]
+        self._fail = [0]
+        self._output = [()]
+
+        for label, patterns in rules.items():
+            for pattern in patterns:
+                if not pattern:
+                    continue
+                self._patterns.append((label, pattern))
+                self._add(pattern, len(self._patterns) - 1)
+        self._build_failure_links()
+
+    def _add(self, pattern, pattern_id):
+        state = 0
+        for char in pattern:
+            next_state = self._goto[state].get(char)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto[state][char] = next_state
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append(())
+            state = next_state
+        self._output[state] += (pattern_id,)
+
+    def _build_failure_links(self):
+        # Breadth first, so a state's failure target is finished before it
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fail = self._fail[state]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[next_state] = self._goto[fail].get(char, 0)
+                self._output[next_state] += self._output[self._fail[next_state]]
+
+    def find(self, text):
+        """Return {label: [patterns found in text]}, in rule table order"""
+        goto, fail, output = self._goto, self._fail, self._output
+        found = set()
+        state = 0
+        for char in text:
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if output[state]:
+                found.update(output[state])
+
+        hits = {}
+        for pattern_id in sorted(found):
+            label, pattern = self._patterns[pattern_id]
+            hits.setdefault(label, []).append(pattern)
+        return {label: hits[label] for label in self.labels if label in hits}
+
+    def counts(self, text):
+        """Return {label: number of distinct patterns found}, in rule table order"""
+        return {label: len(patterns) for label, patterns in self.find(text).items()}
+
+    def first_label(self, text):
+        """Return the first label in table order with any pattern in text, or None"""
+        return next(iter(self.find(text)), None)
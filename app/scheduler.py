@@ -58,6 +58,29 @@ def generate_weekly_leaderboard():
         
         db.session.commit()
 
+def refresh_room_keywords():
+    """Re-summarize every room with new messages in one batched call"""
+    from app.room_keywords import room_keywords
+    from app.inference import topic_executor
+    from app.text_analysis import text_analyzer
+    
+    if not room_keywords.stats()['dirty_rooms']:
+        return
+    try:
+        topic_executor.run(lambda: room_keywords.refresh(text_analyzer.keyword_model), fallback=lambda: {})
+    except Exception as e:
+        print(f"Error refreshing room keywords: {e}")
+
+def snapshot_points(app):
+    """Snapshot the points ledger so reconciliation only sums recent rows"""
+    from app.points_ledger import snapshot_balances
+    
+    with app.app_context():
+        try:
+            snapshot_balances(db.engine, lag_seconds=app.config.get('POINTS_SNAPSHOT_LAG_SECONDS', 60))
+        except Exception as e:
+            print(f"Error snapshotting points: {e}")
+
 def init_scheduler(app):
     scheduler = BackgroundScheduler()
     
@@ -76,5 +99,26 @@ def init_scheduler(app):
         replace_existing=True
     )
     
+    # Keep the room keyword summaries fresh between page loads
+    scheduler.add_job(
+        refresh_room_keywords,
+        trigger='interval',
+        seconds=app.config.get('ROOM_KEYWORDS_REFRESH_SECONDS', 120),
+        id='room_keywords',
+        name='Refresh Room Keywords',
+        replace_existing=True
+    )
+    
+    # Ledger balance snapshots (see app/points_ledger.py)
+    scheduler.add_job(
+        snapshot_points,
+        trigger='interval',
+        seconds=app.config.get('POINTS_SNAPSHOT_SECONDS', 3600),
+        args=[app],
+        id='points_snapshot',
+        name='Snapshot Points Ledger',
+        replace_existing=True
+    )
+    
     scheduler.start()
     return scheduler 
\ No newline at end of file
@@ -1,16 +1,24 @@
-import nltk
-from nltk.sentiment import SentimentIntensityAnalyzer
 from datetime import datetime
 
-# Download required NLTK data
-try:
-    nltk.data.find('sentiment/vader_lexicon.zip')
-except LookupError:
-    nltk.download('vader_lexicon')
-
 class SentimentAnalyzer:
     def __init__(self):
-        self.sia = SentimentIntensityAnalyzer()
+        self._sia = None
+
+    @property
+    def sia(self):
+        # nltk (and the vader lexicon download) is deferred until first use so
+        # importing this module stays cheap during app startup
+        if self._sia is None:
+            import nltk
+            from nltk.sentiment import SentimentIntensityAnalyzer
+            
+            # Download required NLTK data
+            try:
+                nltk.data.find('sentiment/vader_lexicon.zip')
+            except LookupError:
+                nltk.download('vader_lexicon')
+            self._sia = SentimentIntensityAnalyzer()
+        return self._sia
 
     def analyze_text(self, text):
         return self.sia.polarity_scores(text)
@@ -34,4 +42,4 @@ class SentimentAnalyzer:
         }
 
 # Create a global instance
-sentiment_analyzer = SentimentAnalyzer() 
\ No newline at end of file
+sentiment_analyzer = SentimentAnalyzer()
@@ -0,0 +1,215 @@
+"""
+Message queue backends for Socket.IO broadcast fan-out across processes
+
+With more than one server process, ``emit(..., room=...)`` only reaches the
+clients connected to the emitting process. Flask-SocketIO fixes this with a
+message queue: every emit is published to the queue and each process
+delivers it to its own clients. SOCKETIO_MESSAGE_QUEUE selects the backend:
+
+- ``redis://host:6379/0`` (or ``rediss://``): Redis pub/sub, needs ``redis``;
+- any Kombu URL (``amqp://...``): RabbitMQ and friends, needs ``kombu``;
+- ``file:///path/to/bus.jsonl``: FileQueueManager, an append-only JSON lines
+  file shared by the processes of one machine, rotated at
+  SOCKETIO_FILE_QUEUE_MAX_BYTES. No dependencies; meant for tests,
+  benchmarks and single-box deployments;
+- ``local://``: LocalQueueManager, in-process only, for tests that run
+  several Socket.IO servers in one interpreter.
+
+The first two are handled by Flask-SocketIO itself; make_client_manager
+returns the manager for the last two.
+"""
+import json
+import os
+import queue
+import threading
+import time
+
+from socketio import PubSubManager
+
+try:
+    import fcntl
+except ImportError:  # Windows: appends are not locked
+    fcntl = None
+
+class FileQueueManager(PubSubManager):
+    """Pub/sub over an append-only file; readers poll it for new lines.
+
+    The file is written in numbered segments. Each one starts with a
+    ``{"segment": n}`` line, and the publisher that takes segment n past
+    max_bytes links it to ``<path>.n`` and atomically replaces the path with
+    a fresh segment n + 1, all under the file lock. The last keep_segments
+    rotated segments are kept, so the queue takes at most
+    (keep_segments + 1) * max_bytes of disk.
+
+    A reader that reaches the end of its segment and finds a different file
+    at the path has seen a rotation: nothing is written to the old segment
+    any more, so the reader finishes it and moves on to the next number,
+    from ``<path>.n`` if the path has already moved past it. A reader more
+    than keep_segments rotations behind loses the segments in between.
+    """
+    name = 'file'
+    keep_segments = 3
+
+    def __init__(self, url='file:///tmp/socketio-queue.jsonl', channel='socketio', write_only=False,
+                 logger=None, poll_interval=0.01, max_bytes=64 * 1024 * 1024):
+        super().__init__(channel=channel, write_only=write_only, logger=logger)
+        self.path = url[len('file://'):] if url.startswith('file://') else url
+        self.poll_interval = poll_interval
+        self.max_bytes = max_bytes
+        self.rotations = 0
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # Create the first segment so readers can start at its current end
+        if not os.path.exists(self.path):
+            self._install_segment(0, replace=False)
+
+    def _install_segment(self, segment, replace=True):
+        """Put a new segment with its header line at the path in one step"""
+        temp = f'{self.path}.{os.getpid()}.{threading.get_ident()}.tmp'
+        with open(temp, 'wb') as f:
+            f.write(json.dumps({'segment': segment}).encode('utf-8') + b'\n')
+        try:
+            if replace:
+                os.replace(temp, self.path)
+            else:
+                os.link(temp, self.path)  # another process may have created it first
+        except FileExistsError:
+            pass
+        finally:
+            if os.path.exists(temp):
+                os.remove(temp)
+
+    def _publish(self, data):
+        line = (json.dumps({'channel': self.channel, 'message': data}, default=str) + '\n').encode('utf-8')
+        while True:
+            with open(self.path, 'a+b') as f:
+                if fcntl:
+                    fcntl.flock(f, fcntl.LOCK_EX)
+                try:
+                    # Rotated while waiting for the lock: write to the new segment
+                    if fcntl and not _same_file(f, self.path):
+                        continue
+                    f.write(line)
+                    f.flush()
+                    if self.max_bytes and f.tell() >= self.max_bytes:
+                        self._rotate(f)
+                    return
+                finally:
+                    if fcntl:
+                        fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _rotate(self, f):
+        """Keep the full segment f as <path>.n and start segment n + 1 (file lock held)"""
+        f.seek(0)
+        segment = _segment_number(f)
+        rotated = f'{self.path}.{segment}'
+        if os.path.exists(rotated):  # left over from an earlier run
+            os.remove(rotated)
+        os.link(self.path, rotated)
+        self._install_segment(segment + 1)
+        try:
+            os.remove(f'{self.path}.{segment - self.keep_segments}')
+        except FileNotFoundError:
+            pass
+        self.rotations += 1
+
+    def _open_segment(self, wanted=None):
+        """Open the segment numbered wanted (default: the current one) just past its header"""
+        f = open(self.path, 'rb')
+        segment = _segment_number(f)
+        if wanted is None or segment <= wanted:
+            return f, segment
+        # The path has moved on more than once since the reader's last segment
+        for number in range(wanted, segment):
+            try:
+                rotated = open(f'{self.path}.{number}', 'rb')
+            except FileNotFoundError:
+                continue
+            if number > wanted:
+                print(f"File queue: segments {wanted} to {number - 1} of {self.path} were removed "
+                      f"before this reader got to them; their messages are lost")
+            f.close()
+            return rotated, _segment_number(rotated)
+        print(f"File queue: segments {wanted} to {segment - 1} of {self.path} were removed "
+              f"before this reader got to them; their messages are lost")
+        return f, segment
+
+    def _listen(self):
+        f, segment = self._open_segment()
+        f.seek(0, os.SEEK_END)  # only messages published from now on
+        partial = b''
+        try:
+            while True:
+                chunk = f.read()
+                if not chunk:
+                    if _same_file(f, self.path):
+                        time.sleep(self.poll_interval)
+                        continue
+                    # Rotated: the old segment is complete once read to its end
+                    chunk = f.read()
+                    f.close()
+                    f, segment = self._open_segment(segment + 1)
+                    if not chunk:
+                        continue
+                partial += chunk
+                *lines, partial = partial.split(b'\n')
+                for line in lines:
+                    try:
+                        envelope = json.loads(line)
+                    except ValueError:
+                        continue
+                    if envelope.get('channel') == self.channel:
+                        yield envelope['message']
+        finally:
+            f.close()
+
+class LocalQueueManager(PubSubManager):
+    """Pub/sub between Socket.IO servers living in the same process"""
+    name = 'local'
+    _subscribers = {}  # channel -> list of queues, shared by every instance
+    _lock = threading.Lock()
+
+    def __init__(self, url='local://', channel='socketio', write_only=False, logger=None):
+        super().__init__(channel=channel, write_only=write_only, logger=logger)
+        self._queue = None
+
+    def _publish(self, data):
+        with self._lock:
+            subscribers = list(self._subscribers.get(self.channel, ()))
+        for subscriber in subscribers:
+            subscriber.put(data)
+
+    def _listen(self):
+        self._queue = queue.Queue()
+        with self._lock:
+            self._subscribers.setdefault(self.channel, []).append(self._queue)
+        while True:
+            yield self._queue.get()
+
+def _same_file(f, path):
+    """True if the open file f is still the file at path (not rotated away)"""
+    try:
+        return os.fstat(f.fileno()).st_ino == os.stat(path).st_ino
+    except FileNotFoundError:
+        return True  # being rotated: the new file appears in a moment
+
+def _segment_number(f):
+    """Read the segment header at the start of f; files without one count as segment 0"""
+    line = f.readline()
+    try:
+        return json.loads(line)['segment']
+    except (ValueError, TypeError, KeyError):
+        f.seek(0)
+        return 0
+
+def make_client_manager(url, channel='flask-socketio', write_only=False, max_bytes=None):
+    """Client manager for the file:// and local:// queues, else None"""
+    if not url:
+        return None
+    if url.startswith('file://'):
+        options = {} if max_bytes is None else {'max_bytes': max_bytes}
+        return FileQueueManager(url, channel=channel, write_only=write_only, **options)
+    if url.startswith('local://'):
+        return LocalQueueManager(url, channel=channel, write_only=write_only)
+    return None
@@ -0,0 +1,205 @@
+"""
+Single registry for the Socket.IO event handlers
+
+Every event has exactly one handler, registered with ``@event_router.on``;
+registering an event twice raises instead of letting import order pick the
+winner. Calls go through a middleware chain:
+
+    timing -> errors -> auth -> rate limit -> handler
+
+- timing records a latency histogram per event (errors and throttled calls
+  included, since they cost time too);
+- errors logs the exception, rolls back the session and sends the event's
+  error message to the sender;
+- auth drops calls from anonymous users (optionally with an error message);
+- rate limit spends a token from app.rate_limit for events that name a limit.
+
+A middleware is ``fn(call, next_fn)``, where ``call`` is an EventCall and
+``next_fn(call)`` runs the rest of the chain.
+"""
+import bisect
+import inspect
+import threading
+import time
+from functools import partial
+
+from flask import request
+from flask_login import current_user
+from flask_socketio import emit
+
+# Upper bounds (ms) of the latency histogram buckets; the last bucket is open
+LATENCY_BUCKETS_MS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500)
+
+class EventCall:
+    """One incoming event on its way through the middleware chain"""
+    def __init__(self, event, args, options):
+        self.event = event
+        self.args = args
+        self.options = options
+        self.outcome = 'ok'  # 'ok', 'error', 'unauthenticated' or 'throttled'
+
+    @property
+    def data(self):
+        return self.args[0] if self.args and isinstance(self.args[0], dict) else {}
+
+class EventStats:
+    def __init__(self):
+        self.buckets = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+        self.calls = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.outcomes = {}
+
+    def record(self, elapsed_ms, outcome):
+        self.buckets[bisect.bisect_left(LATENCY_BUCKETS_MS, elapsed_ms)] += 1
+        self.calls += 1
+        self.total_ms += elapsed_ms
+        self.max_ms = max(self.max_ms, elapsed_ms)
+        self.outcomes[outcome] = self.outcomes.get(outcome, 0) + 1
+
+    def percentile(self, fraction):
+        """Upper bound of the bucket holding the given fraction of calls"""
+        target = self.calls * fraction
+        seen = 0
+        for bound, count in zip(LATENCY_BUCKETS_MS + (None,), self.buckets):
+            seen += count
+            if seen >= target:
+                return bound if bound is not None else round(self.max_ms, 3)
+        return 0.0
+
+    def as_dict(self):
+        labels = [f"<={bound}ms" for bound in LATENCY_BUCKETS_MS] + [f">{LATENCY_BUCKETS_MS[-1]}ms"]
+        return {
+            'calls': self.calls,
+            'errors': self.outcomes.get('error', 0),
+            'outcomes': dict(self.outcomes),
+            'avg_ms': round(self.total_ms / self.calls, 3) if self.calls else 0.0,
+            'p50_ms': self.percentile(0.5) if self.calls else 0.0,
+            'p95_ms': self.percentile(0.95) if self.calls else 0.0,
+            'p99_ms': self.percentile(0.99) if self.calls else 0.0,
+            'max_ms': round(self.max_ms, 3),
+            'histogram': {label: count for label, count in zip(labels, self.buckets) if count}
+        }
+
+class EventRouter:
+    def __init__(self):
+        self.handlers = {}  # event -> (handler, options)
+        self.middleware = []
+        self._lock = threading.Lock()
+        self._stats = {}
+
+    def on(self, event, auth=True, auth_message=None, rate_limit=None, error_message=None):
+        """Register the handler of an event.
+
+        ``auth``: drop calls from anonymous users, emitting ``auth_message``
+        as an error if given. ``rate_limit``: name of the app.rate_limit
+        bucket to spend a token from. ``error_message``: sent to the sender
+        when the handler raises (default "Error processing <event>"; '' only
+        logs).
+        """
+        def register(fn):
+            if event in self.handlers:
+                raise ValueError(f"Socket event '{event}' already handled by "
+                                 f"{self.handlers[event][0].__module__}.{self.handlers[event][0].__name__}")
+            self.handlers[event] = (fn, {
+                'arg_count': _arg_count(fn),
+                'auth': auth,
+                'auth_message': auth_message,
+                'rate_limit': rate_limit,
+                'error_message': f"Error processing {event}" if error_message is None else error_message
+            })
+            return fn
+        return register
+
+    def use(self, middleware):
+        """Append a middleware; the first one added runs outermost"""
+        self.middleware.append(middleware)
+        return middleware
+
+    def init_socketio(self, socketio):
+        """Register one dispatcher per event with Flask-SocketIO"""
+        for event in self.handlers:
+            socketio.on_event(event, partial(self.dispatch, event))
+
+    def dispatch(self, event, *args):
+        handler, options = self.handlers[event]
+        call = EventCall(event, args, options)
+
+        def run(index, call):
+            if index == len(self.middleware):
+                arg_count = call.options['arg_count']
+                return handler(*(call.args if arg_count is None else call.args[:arg_count]))
+            return self.middleware[index](call, partial(run, index + 1))
+
+        started = time.perf_counter()
+        try:
+            return run(0, call)
+        finally:
+            self._record(event, (time.perf_counter() - started) * 1000, call.outcome)
+
+    def metrics(self):
+        """Per-event latency histograms and outcome counts"""
+        with self._lock:
+            return {event: stats.as_dict() for event, stats in sorted(self._stats.items())}
+
+    def reset_metrics(self):
+        with self._lock:
+            self._stats.clear()
+
+    def _record(self, event, elapsed_ms, outcome):
+        with self._lock:
+            stats = self._stats.get(event)
+            if stats is None:
+                stats = self._stats[event] = EventStats()
+            stats.record(elapsed_ms, outcome)
+
+def _arg_count(fn):
+    """Positional parameters of fn, or None if it takes *args.
+
+    Flask-SocketIO passes extra arguments to some events (``connect`` gets
+    the auth payload); handlers that do not declare them are called without.
+    """
+    count = 0
+    for parameter in inspect.signature(fn).parameters.values():
+        if parameter.kind == parameter.VAR_POSITIONAL:
+            return None
+        if parameter.kind in (parameter.POSITIONAL_ONLY, parameter.POSITIONAL_OR_KEYWORD):
+            count += 1
+    return count
+
+def handle_errors(call, next_fn):
+    try:
+        return next_fn(call)
+    except Exception as e:
+        from app import db
+        call.outcome = 'error'
+        print(f"Error in socket event '{call.event}': {str(e)}")
+        db.session.rollback()
+        if call.options['error_message']:
+            emit('error', {'message': call.options['error_message']}, room=request.sid)
+
+def require_auth(call, next_fn):
+    if call.options['auth'] and not current_user.is_authenticated:
+        call.outcome = 'unauthenticated'
+        if call.options['auth_message']:
+            emit('error', {'message': call.options['auth_message']}, room=request.sid)
+        return None
+    return next_fn(call)
+
+def apply_rate_limit(call, next_fn):
+    from app.rate_limit import rate_limiter
+    limit = call.options['rate_limit']
+    if limit and not rate_limiter.allow(limit, current_user.id):
+        call.outcome = 'throttled'
+        # One notice per throttled stretch; a flood must not become a flood of error frames
+        if rate_limiter.notify(limit, current_user.id):
+            emit('error', {'message': 'You are sending too fast. Please slow down.', 'throttled': True},
+                 room=request.sid)
+        return None
+    return next_fn(call)
+
+# Create a global instance
+event_router = EventRouter()
+event_router.use(handle_errors)
+event_router.use(require_auth)
+event_router.use(apply_rate_limit)
@@ -1,6 +1,9 @@
 // Socket.IO instance
 let socket = null;
 
+// Room members: user_id -> username, kept current by presence deltas
+const activeMembers = new Map();
+
 // Get current user ID from the chat container
 const chatContainer = document.querySelector('.chat-container');
 const currentUserId = chatContainer ? parseInt(chatContainer.dataset.userId) : null;
@@ -18,11 +21,17 @@ document.addEventListener('DOMContentLoaded', () => {
                 autoConnect: true
             });
 
+            let initialized = false;
             socket.on('connect', () => {
                 console.log('Connected to server');
                 showToast('Connected to chat server', 'success');
                 
-                // Only initialize other features after socket is connected
+                // Only initialize other features after socket is connected;
+                // a reconnect catches up through followRoom instead
+                if (initialized) {
+                    return;
+                }
+                initialized = true;
                 initializeSocket();
                 initializeAutoRefresh();
                 initializeQASystem();
@@ -248,9 +257,9 @@ function initializeSocket() {
     if (messageForm && messageInput && roomId) {
         console.log('Setting up message form handlers for room:', roomId);
         
-        // Join room
+        // Join room, and resume it after reconnects
         console.log('Joining room:', roomId);
-        socket.emit('join', { room_id: roomId });
+        followRoom(socket, roomId);
 
         // Handle page unload
         window.addEventListener('beforeunload', function() {
@@ -260,6 +269,9 @@ function initializeSocket() {
     }
 
     // Socket event handlers
+    // Busy rooms send several events in one frame; replay them in order
+    socket.on('batch', (data) => unpackBatch(socket, data));
+
     socket.on('message', (data) => {
         console.log('Received message:', data);
         appendMessage(data);
@@ -279,16 +291,25 @@ function initializeSocket() {
         showToast(`Rating submitted successfully! New rating: ${data.new_rating}`, 'success');
     });
 
+    // Presence: the full list arrives once on join, then only changes
+    socket.on('members', (data) => {
+        activeMembers.clear();
+        (data.members || []).forEach(member => activeMembers.set(member.user_id, member.username));
+        updateActiveMembers();
+    });
+
     socket.on('user_joined', (data) => {
         console.log('User joined:', data);
         showToast(`${data.username} joined the room`, 'info');
-        updateActiveMembers(data.active_members);
+        activeMembers.set(data.user_id, data.username);
+        updateActiveMembers();
     });
 
     socket.on('user_left', (data) => {
         console.log('User left:', data);
         showToast(`${data.username} left the room`, 'info');
-        updateActiveMembers(data.active_members);
+        activeMembers.delete(data.user_id);
+        updateActiveMembers();
     });
 
     socket.on('error', (data) => {
@@ -335,6 +356,10 @@ function initializeSocket() {
 function initializeAutoRefresh() {
     // Auto-refresh room topics periodically
     setInterval(updateRoomTopics, 120000); // Every 2 minutes
+
+    // Room keyword summary (refreshed incrementally on the server)
+    loadRoomKeywords();
+    setInterval(loadRoomKeywords, 60000);
 }
 
 function appendMessage(data) {
@@ -469,12 +494,74 @@ function appendMessage(data) {
     }
 }
 
-function updateActiveMembers(members) {
+function unpackBatch(sock, data) {
+    (data.events || []).forEach(([event, payload]) => {
+        sock.listeners(event).forEach(listener => listener(payload));
+    });
+}
+
+// Join a room and keep the position in its event stream: after a reconnect
+// the server sends only the events missed in between (app/room_log.py)
+function followRoom(sock, roomId) {
+    const position = { epoch: null, seq: 0, lastMessageId: 0, joined: false };
+    document.querySelectorAll('.message[data-message-id]').forEach(element => {
+        position.lastMessageId = Math.max(position.lastMessageId, parseInt(element.dataset.messageId) || 0);
+    });
+
+    const note = (event, data) => {
+        if (!data) {
+            return;
+        }
+        if (data.seq) {
+            position.epoch = data.epoch;
+            position.seq = data.seq;
+        }
+        if (event === 'message' && data.id) {
+            position.lastMessageId = Math.max(position.lastMessageId, data.id);
+        }
+    };
+    sock.onAny(note);
+    sock.on('batch', (data) => (data.events || []).forEach(([event, payload]) => note(event, payload)));
+
+    sock.on('resumed', (data) => {
+        console.log(`Resumed room ${data.room}: ${(data.events || []).length} missed events from ${data.source}`);
+        if (!data.complete) {
+            // The log could not answer; the database only has the messages
+            window.location.reload();
+            return;
+        }
+        (data.events || []).forEach(([event, payload]) => {
+            note(event, payload);
+            sock.listeners(event).forEach(listener => listener(payload));
+        });
+        position.epoch = data.epoch;
+        position.seq = data.seq;
+    });
+
+    const join = () => {
+        if (!position.joined) {
+            position.joined = true;
+            sock.emit('join', { room_id: roomId });
+            return;
+        }
+        sock.emit('resume', {
+            room_id: roomId,
+            epoch: position.epoch,
+            seq: position.seq,
+            last_message_id: position.lastMessageId
+        });
+    };
+    sock.on('connect', join);
+    if (sock.connected) {
+        join();
+    }
+}
+
+function updateActiveMembers() {
     try {
         const container = document.getElementById('active-members');
         if (container) {
-            // Handle case where members is undefined or null
-            const membersList = Array.isArray(members) ? members : [];
+            const membersList = Array.from(activeMembers.values());
             container.innerHTML = membersList.map(member => `
                 <span class="badge bg-success me-1">${member}</span>
             `).join('');
@@ -484,6 +571,33 @@ function updateActiveMembers(members) {
     }
 }
 
+function loadRoomKeywords() {
+    const container = document.getElementById('room-keywords');
+    const messageForm = document.getElementById('message-form');
+    if (!container || !messageForm) return;
+
+    fetch(`/room/${messageForm.dataset.roomId}/keywords`)
+        .then(response => response.json())
+        .then(data => {
+            if (!data.success) {
+                return;
+            }
+            if (data.keywords.length === 0) {
+                container.innerHTML = '<p class="card-text">No keywords yet.</p>';
+                return;
+            }
+            container.innerHTML = '';
+            data.keywords.forEach(keyword => {
+                const badge = document.createElement('span');
+                badge.className = 'badge bg-light text-dark me-1 mb-1';
+                badge.title = `Relevance: ${keyword.score.toFixed(2)}`;
+                badge.textContent = keyword.phrase;
+                container.appendChild(badge);
+            });
+        })
+        .catch(error => console.error('Error loading room keywords:', error));
+}
+
 function updateRoomTopics() {
     const topicsContainer = document.getElementById('room-topics');
     if (!topicsContainer) return;
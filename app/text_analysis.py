@@ -1,17 +1,22 @@
-import spacy
-from transformers import pipeline
-from collections import defaultdict
+from collections import defaultdict, OrderedDict
 import numpy as np
 import json
-from bertopic import BERTopic
-from sklearn.feature_extraction.text import TfidfVectorizer
-from keybert import KeyBERT
-import torch
 import os
+import gc
+import hashlib
+import threading
 from pathlib import Path
-import hdbscan
-from umap import UMAP
-from sklearn.metrics.pairwise import cosine_similarity
+from app.model_registry import model_registry
+from app.inference import inference_executor, topic_executor
+from app.rule_matcher import RuleMatcher
+from app.analysis_cache import analysis_cache
+from app.near_duplicate import near_duplicates
+from app.language import detect_language, uses_english_models, LANGUAGE_DETECTOR_VERSION
+
+# Heavy ML libraries (spacy, transformers, torch, bertopic, keybert, hdbscan,
+# umap, sklearn) are imported inside the TextAnalyzer properties that use them.
+# create_app pulls this module in, so importing it must stay cheap for CLI
+# commands, migrations, tests and the admin UI.
 
 # Set up Hugging Face cache directory
 cache_dir = Path(__file__).parent.parent / "models_cache"
@@ -19,9 +24,6 @@ cache_dir.mkdir(exist_ok=True)
 os.environ['TRANSFORMERS_CACHE'] = str(cache_dir.absolute())
 os.environ['HF_HOME'] = str(cache_dir.absolute())
 
-# Load spaCy model
-nlp = spacy.load('en_core_web_sm')
-
 # Custom stopwords for topic modeling
 CUSTOM_STOPWORDS = {
     'great', 'good', 'nice', 'awesome', 'cool', 'amazing', 'excellent',
@@ -146,12 +148,72 @@ EMOTION_EMOJIS = {
     'neutral': "😐"
 }
 
+# Rule-based emotion keywords, matched as lower case substrings
+EMOTION_PATTERNS = {
+    'joy': [
+        'happy', 'joy', 'glad', 'delighted', 'excited', 'wonderful', 
+        'great', 'awesome', 'fantastic', 'amazing', 'love it',
+        'excellent', 'yay', 'woohoo', 'hurray', '😊', '😃', '😄'
+    ],
+    'love': [
+        'love', 'adore', 'cherish', 'beloved', '❤️', '💕', '💗',
+        'loving', 'affection', 'fondness'
+    ],
+    'optimism': [
+        'hope', 'optimistic', 'looking forward', 'promising', 'bright',
+        'positive', 'confident', 'will succeed', 'can do it'
+    ],
+    'anger': [
+        'angry', 'mad', 'furious', 'rage', 'hate', 'annoyed',
+        'frustrated', 'irritated', '😠', '😡'
+    ],
+    'sadness': [
+        'sad', 'unhappy', 'depressed', 'miserable', 'heartbroken',
+        'disappointed', 'sorry', 'regret', '😢', '😭'
+    ],
+    'fear': [
+        'afraid', 'scared', 'worried', 'anxious', 'nervous',
+        'terrified', 'fear', 'frightened', '😨', '😱'
+    ],
+    'surprise': [
+        'wow', 'omg', 'oh my god', 'whoa', 'surprised',
+        'shocked', 'unexpected', 'amazing', '😮', '😲'
+    ]
+}
+
+# Compiled once: all emotion and intent keywords are found in a single pass
+EMOTION_MATCHER = RuleMatcher(EMOTION_PATTERNS)
+INTENT_MATCHER = RuleMatcher({
+    intent: [example.lower() for example in examples]
+    for intent, examples in INTENT_EXAMPLES.items()
+})
+
+EMOTION_MODEL_NAME = "SamLowe/roberta-base-go_emotions"
+INTENT_MODEL_NAME = "facebook/bart-large-mnli"
+
+# Part of every analysis cache key: changing a model or a rule table
+# invalidates the cached results
+ANALYSIS_VERSION = hashlib.sha1(json.dumps(
+    [EMOTION_MODEL_NAME, INTENT_MODEL_NAME, EMOTION_PATTERNS, INTENT_EXAMPLES, LANGUAGE_DETECTOR_VERSION],
+    sort_keys=True
+).encode('utf-8')).hexdigest()[:12]
+
 class TextAnalyzer:
     def __init__(self):
-        self._emotion_classifier = None
-        self._intent_classifier = None
-        self._topic_model = None
-        self._keyword_model = None
+        # Models are owned by the model registry, which tracks their memory,
+        # unloads them when idle or over budget and reloads them on demand
+        model_registry.register('nlp', self._load_nlp)
+        model_registry.register('emotion_classifier', self._load_emotion_classifier)
+        model_registry.register('intent_classifier', self._load_intent_classifier)
+        model_registry.register('topic_model', self._load_topic_model)
+        model_registry.register('keyword_model', self._load_keyword_model)
+        
+        # Set once every model is loaded (see warm_up); gates readiness checks
+        self.models_ready = threading.Event()
+        
+        # Topic keyword embeddings, reused across topic refreshes for coherence
+        self._word_embeddings = OrderedDict()
+        self._word_embeddings_lock = threading.Lock()
         
         # Mapping from go_emotions to our emotion categories
         self.emotion_mapping = {
@@ -182,168 +244,226 @@ class TextAnalyzer:
             'neutral': 'neutral'
         }
 
+    def _load_nlp(self):
+        print("Loading spaCy model...")
+        import spacy
+        return spacy.load('en_core_web_sm')
+
+    def _load_emotion_classifier(self):
+        print("Loading emotion classifier model...")
+        from transformers import pipeline
+        return pipeline(
+            "text-classification", 
+            model=EMOTION_MODEL_NAME,
+            return_all_scores=True,
+            cache_dir=cache_dir
+        )
+
+    def _load_intent_classifier(self):
+        print("Loading intent classifier model...")
+        from transformers import pipeline
+        return pipeline(
+            "zero-shot-classification",
+            model=INTENT_MODEL_NAME,
+            cache_dir=cache_dir,
+            local_files_only=True
+        )
+
+    def _load_topic_model(self):
+        print("Initializing topic model...")
+        from bertopic import BERTopic
+        from umap import UMAP
+        import hdbscan
+        return BERTopic(
+            language="english",
+            calculate_probabilities=True,
+            verbose=True,
+            min_topic_size=2,
+            n_gram_range=(1, 2),
+            top_n_words=5,
+            umap_model=UMAP(
+                n_neighbors=2,
+                n_components=2,
+                min_dist=0.0,
+                metric='cosine'
+            ),
+            hdbscan_model=hdbscan.HDBSCAN(
+                min_cluster_size=2,
+                min_samples=1,
+                metric='euclidean',
+                cluster_selection_method='eom',
+                prediction_data=True
+            )
+        )
+
+    def _load_keyword_model(self):
+        print("Initializing keyword model...")
+        from keybert import KeyBERT
+        return KeyBERT()
+
+    @property
+    def nlp(self):
+        return model_registry.get('nlp')
+
     @property
     def emotion_classifier(self):
-        if self._emotion_classifier is None:
-            print("Loading emotion classifier model...")
-            try:
-                self._emotion_classifier = pipeline(
-                    "text-classification", 
-                    model="SamLowe/roberta-base-go_emotions",
-                    return_all_scores=True,
-                    cache_dir=cache_dir
-                )
-            except Exception as e:
-                print(f"Error loading emotion classifier: {e}")
-                # Return a simple classifier that always returns neutral
-                return lambda text: [[{'label': 'neutral', 'score': 1.0}]]
-        return self._emotion_classifier
+        try:
+            return model_registry.get('emotion_classifier')
+        except Exception as e:
+            print(f"Error loading emotion classifier: {e}")
+            # Return a simple classifier that always returns neutral
+            return lambda text: [[{'label': 'neutral', 'score': 1.0}]]
 
     @property
     def intent_classifier(self):
-        if self._intent_classifier is None:
-            print("Loading intent classifier model...")
-            self._intent_classifier = pipeline(
-                "zero-shot-classification",
-                model="facebook/bart-large-mnli",
-                cache_dir=cache_dir,
-                local_files_only=True
-            )
-        return self._intent_classifier
+        return model_registry.get('intent_classifier')
 
     @property
     def topic_model(self):
-        if self._topic_model is None:
-            print("Initializing topic model...")
-            self._topic_model = BERTopic(
-                language="english",
-                calculate_probabilities=True,
-                verbose=True,
-                min_topic_size=2,
-                n_gram_range=(1, 2),
-                top_n_words=5,
-                umap_model=UMAP(
-                    n_neighbors=2,
-                    n_components=2,
-                    min_dist=0.0,
-                    metric='cosine'
-                ),
-                hdbscan_model=hdbscan.HDBSCAN(
-                    min_cluster_size=2,
-                    min_samples=1,
-                    metric='euclidean',
-                    cluster_selection_method='eom',
-                    prediction_data=True
-                )
-            )
-        return self._topic_model
+        return model_registry.get('topic_model')
 
     @property
     def keyword_model(self):
-        if self._keyword_model is None:
-            print("Initializing keyword model...")
-            self._keyword_model = KeyBERT()
-        return self._keyword_model
+        return model_registry.get('keyword_model')
 
-    def analyze_emotions(self, text):
-        """Analyze emotions in text using rules and the emotion classifier as backup."""
-        text_lower = text.lower()
+    def warm_up(self, freeze=False):
+        """Load all models up front instead of on the first request.
         
-        # Rule-based emotion detection
-        emotion_patterns = {
-            'joy': [
-                'happy', 'joy', 'glad', 'delighted', 'excited', 'wonderful', 
-                'great', 'awesome', 'fantastic', 'amazing', 'love it',
-                'excellent', 'yay', 'woohoo', 'hurray', '😊', '😃', '😄'
-            ],
-            'love': [
-                'love', 'adore', 'cherish', 'beloved', '❤️', '💕', '💗',
-                'loving', 'affection', 'fondness'
-            ],
-            'optimism': [
-                'hope', 'optimistic', 'looking forward', 'promising', 'bright',
-                'positive', 'confident', 'will succeed', 'can do it'
-            ],
-            'anger': [
-                'angry', 'mad', 'furious', 'rage', 'hate', 'annoyed',
-                'frustrated', 'irritated', '😠', '😡'
-            ],
-            'sadness': [
-                'sad', 'unhappy', 'depressed', 'miserable', 'heartbroken',
-                'disappointed', 'sorry', 'regret', '😢', '😭'
-            ],
-            'fear': [
-                'afraid', 'scared', 'worried', 'anxious', 'nervous',
-                'terrified', 'fear', 'frightened', '😨', '😱'
-            ],
-            'surprise': [
-                'wow', 'omg', 'oh my god', 'whoa', 'surprised',
-                'shocked', 'unexpected', 'amazing', '😮', '😲'
-            ]
-        }
+        When called in the gunicorn master before fork (``freeze=True``), the
+        loaded objects are moved out of the garbage collector's reach so the
+        workers keep sharing their pages copy-on-write. Those models are also
+        pinned in the registry, since evicting them in a worker frees nothing.
+        """
+        print("Warming up text analysis models...")
+        for name in ('nlp', 'emotion_classifier', 'intent_classifier', 'topic_model', 'keyword_model'):
+            try:
+                getattr(self, name)
+            except Exception as e:
+                print(f"Error warming up {name}: {e}")
+        
+        if freeze:
+            model_registry.pin()
+            gc.collect()
+            gc.freeze()
         
-        # Check for emotion patterns
+        self.models_ready.set()
+        print("Text analysis models ready")
+
+    def analyze_emotions(self, text, use_model=True, text_lower=None):
+        """Analyze emotions in text using rules and the emotion classifier as backup.
+        
+        With ``use_model=False`` (messages the English model cannot read) only
+        the rules run, and a message without a rule match is neutral.
+        ``text_lower`` is text.lower(), if the caller already has it.
+        """
+        if text_lower is None:
+            text_lower = text.lower()
+        
+        # Rule-based emotion detection: one pass over the text finds every
+        # pattern; each distinct pattern found scores 1.0 for its emotion
         detected_emotions = defaultdict(float)
-        for emotion, patterns in emotion_patterns.items():
-            for pattern in patterns:
-                if pattern in text_lower:
-                    detected_emotions[emotion] += 1.0
+        fallback = False
+        for emotion, count in EMOTION_MATCHER.counts(text_lower).items():
+            detected_emotions[emotion] += float(count)
         
-        # If no emotions detected through rules, try the ML model
-        if not detected_emotions:
+        # If no emotions detected through rules, try the ML model on an
+        # inference slot; when the executor is saturated or the model fails,
+        # fall back to a quick positive/negative word check
+        if not detected_emotions and use_model:
             try:
-                results = self.emotion_classifier(text)[0]
-                for item in results:
-                    mapped_emotion = self.emotion_mapping.get(item['label'], 'neutral')
-                    detected_emotions[mapped_emotion] += item['score']
+                results = inference_executor.run(
+                    lambda: self.emotion_classifier(text)[0],
+                    fallback=lambda: None
+                )
+                if results is None:
+                    fallback = True
+                    detected_emotions.update(self._sentiment_fallback(text_lower))
+                else:
+                    for item in results:
+                        mapped_emotion = self.emotion_mapping.get(item['label'], 'neutral')
+                        detected_emotions[mapped_emotion] += item['score']
             except Exception:
-                # If ML model fails, do one more check for positive/negative sentiment
-                positive_words = ['good', 'nice', 'well', 'fine']
-                negative_words = ['bad', 'not', "n't", 'never']
-                
-                has_positive = any(word in text_lower for word in positive_words)
-                has_negative = any(word in text_lower for word in negative_words)
-                
-                if has_positive and not has_negative:
-                    detected_emotions['joy'] = 1.0
-                elif has_negative:
-                    detected_emotions['sadness'] = 1.0
+                fallback = True
+                detected_emotions.update(self._sentiment_fallback(text_lower))
         
         # Get the dominant emotion
         if detected_emotions:
             top_emotion = max(detected_emotions.items(), key=lambda x: x[1])
-            return {
+            result = {
                 'primary_emotion': top_emotion[0],
                 'emotion_score': top_emotion[1],
                 'all_emotions': dict(detected_emotions),
                 'emoji': EMOTION_EMOJIS.get(top_emotion[0], '😐')
             }
+        else:
+            # Fallback to neutral only if no emotions detected
+            result = {
+                'primary_emotion': 'neutral',
+                'emotion_score': 1.0,
+                'all_emotions': {'neutral': 1.0},
+                'emoji': '😐'
+            }
         
-        # Fallback to neutral only if no emotions detected
-        return {
-            'primary_emotion': 'neutral',
-            'emotion_score': 1.0,
-            'all_emotions': {'neutral': 1.0},
-            'emoji': '😐'
-        }
+        # Flag results produced without the model so they are not cached
+        if fallback:
+            result['fallback'] = True
+        return result
+    
+    def _sentiment_fallback(self, text_lower):
+        """Cheap positive/negative word check used when the ML model is unavailable."""
+        positive_words = ['good', 'nice', 'well', 'fine']
+        negative_words = ['bad', 'not', "n't", 'never']
+        
+        has_positive = any(word in text_lower for word in positive_words)
+        has_negative = any(word in text_lower for word in negative_words)
+        
+        if has_positive and not has_negative:
+            return {'joy': 1.0}
+        elif has_negative:
+            return {'sadness': 1.0}
+        return {}
     
-    def detect_intent(self, text):
-        """Detect the intent of the message using zero-shot classification with examples."""
+    def detect_intent(self, text, use_model=True, text_lower=None):
+        """Detect the intent of the message using zero-shot classification with examples.
+        
+        With ``use_model=False`` only the example phrases are matched, and a
+        message without a match is 'other' with zero confidence.
+        ``text_lower`` is text.lower(), if the caller already has it.
+        """
         try:
             # First try exact pattern matching
-            text_lower = text.lower()
-            for intent, examples in INTENT_EXAMPLES.items():
-                for example in examples:
-                    if example.lower() in text_lower:
-                        return {
-                            'intent': intent,
-                            'confidence': 1.0,
-                            'all_intents': {intent: 1.0},
-                            'emoji': INTENT_EMOJIS.get(intent, '')
-                        }
+            intent = INTENT_MATCHER.first_label(text.lower() if text_lower is None else text_lower)
+            if intent is not None:
+                return {
+                    'intent': intent,
+                    'confidence': 1.0,
+                    'all_intents': {intent: 1.0},
+                    'emoji': INTENT_EMOJIS.get(intent, '')
+                }
             
-            # If no exact match, use zero-shot classification
-            result = self.intent_classifier(text, list(INTENT_EXAMPLES.keys()), multi_label=False)
+            if not use_model:
+                return {
+                    'intent': 'other',
+                    'confidence': 0.0,
+                    'all_intents': {},
+                    'emoji': '💬'
+                }
+            
+            # If no exact match, use zero-shot classification. When the
+            # inference executor is saturated or times out, return a flagged
+            # zero-confidence result so callers can tell it from a real 'other'
+            result = inference_executor.run(
+                lambda: self.intent_classifier(text, list(INTENT_EXAMPLES.keys()), multi_label=False),
+                fallback=lambda: None
+            )
+            if result is None:
+                return {
+                    'intent': 'other',
+                    'confidence': 0.0,
+                    'all_intents': {},
+                    'emoji': '💬',
+                    'fallback': True
+                }
             intent = result['labels'][0]
             return {
                 'intent': intent,
@@ -352,26 +472,58 @@ class TextAnalyzer:
                 'emoji': INTENT_EMOJIS.get(intent, '')
             }
         except Exception as e:
+            print(f"Error detecting intent: {e}")
             return {
                 'intent': 'other',
                 'confidence': 1.0,
                 'all_intents': {'other': 1.0},
-                'emoji': '💬'
+                'emoji': '💬',
+                'fallback': True
             }
     
-    def analyze_message(self, text):
-        """Comprehensive analysis of a message including emotions and intent."""
-        emotions = self.analyze_emotions(text)
-        intent = self.detect_intent(text)
+    def analyze_message(self, text, text_lower=None, tokens=None, language=None):
+        """Comprehensive analysis of a message including emotions and intent.
         
-        return {
+        Results are cached by normalized text (see app.analysis_cache), except
+        degraded ones produced while the inference executor was saturated.
+        Near-identical messages (see app.near_duplicate) reuse the analysis
+        of the first copy. Messages not in English (see app.language) skip the
+        English-only models and are scored by the rules alone.
+        
+        The message pipeline passes the lower case text, the fingerprint
+        tokens and the language it already computed (see app.pipeline).
+        """
+        cached = analysis_cache.get(text, ANALYSIS_VERSION)
+        if cached is not None:
+            return cached
+        
+        duplicate = near_duplicates.analysis_for(text, tokens=tokens)
+        if duplicate is not None:
+            return duplicate
+        
+        if language is None:
+            language = detect_language(text)
+        use_model = uses_english_models(language)
+        emotions = self.analyze_emotions(text, use_model=use_model, text_lower=text_lower)
+        intent = self.detect_intent(text, use_model=use_model, text_lower=text_lower)
+        analysis = {
             'emotions': emotions,
-            'intent': intent
+            'intent': intent,
+            'language': language
         }
+        
+        if not emotions.get('fallback') and not intent.get('fallback'):
+            analysis_cache.set(text, ANALYSIS_VERSION, analysis)
+            near_duplicates.store_analysis(text, analysis, tokens=tokens)
+        return analysis
     
     def preprocess_text(self, text):
         """Preprocess text for topic modeling."""
-        doc = nlp(text.lower())
+        # en_core_web_sm only produces noise for other languages
+        if not uses_english_models(detect_language(text)):
+            return text.lower()
+        
+        doc = self.nlp(text.lower())
         # Remove stopwords, punctuation, and lemmatize
         tokens = [token.lemma_ for token in doc 
                  if not token.is_stop 
@@ -381,26 +533,67 @@ class TextAnalyzer:
         return ' '.join(tokens)
     
     def calculate_topic_coherence(self, topic_words, embeddings):
-        """Calculate topic coherence using word embeddings."""
+        """Calculate topic coherence as the mean pairwise cosine similarity.
+        
+        ``embeddings`` holds one row per entry of ``topic_words``.
+        """
         if len(topic_words) < 2:
             return 0.0
         
-        # Get embeddings for topic words
-        word_embeddings = embeddings[topic_words]
+        vectors = np.asarray(embeddings, dtype=np.float64)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        vectors = vectors / np.where(norms == 0, 1.0, norms)
+        similarities = vectors @ vectors.T
+        
+        # Mean of the upper triangle (every distinct pair once)
+        rows, cols = np.triu_indices(len(vectors), k=1)
+        return float(similarities[rows, cols].mean())
+    
+    def embed_words(self, topic_model, words, max_cached=20000):
+        """Embed topic keywords with the topic model's embedding backend.
         
-        # Calculate pairwise cosine similarities
-        similarities = cosine_similarity(word_embeddings)
+        Embeddings are cached per word, so only keywords not seen in earlier
+        topic refreshes are encoded, in a single batch.
+        """
+        with self._word_embeddings_lock:
+            missing = [w for w in dict.fromkeys(words) if w not in self._word_embeddings]
         
-        # Calculate average similarity (coherence)
-        n = len(similarities)
-        total_similarity = 0
-        count = 0
-        for i in range(n):
-            for j in range(i + 1, n):
-                total_similarity += similarities[i][j]
-                count += 1
+        if missing:
+            vectors = topic_model.embedding_model.embed_words(missing, verbose=False)
+            with self._word_embeddings_lock:
+                for word, vector in zip(missing, vectors):
+                    self._word_embeddings[word] = np.asarray(vector)
+                while len(self._word_embeddings) > max_cached:
+                    self._word_embeddings.popitem(last=False)
         
-        return total_similarity / count if count > 0 else 0.0
+        with self._word_embeddings_lock:
+            for word in words:
+                self._word_embeddings.move_to_end(word)
+            return np.vstack([self._word_embeddings[w] for w in words])
+    
+    def _fit_topics(self, messages):
+        """Preprocess messages, fit the topic model and score topic coherence."""
+        processed_messages = [self.preprocess_text(msg) for msg in messages]
+        
+        # Hold one reference for the whole call so the registry cannot
+        # swap in a fresh, unfitted model halfway through
+        topic_model = self.topic_model
+        topics, probs = topic_model.fit_transform(processed_messages)
+        
+        # BERTopic pads short topics with empty keywords
+        topic_words = {
+            topic: [word for word, _ in topic_model.get_topic(topic) if word]
+            for topic in set(topics) if topic != -1
+        }
+        coherence = {}
+        try:
+            all_words = [w for words in topic_words.values() for w in words]
+            vectors = dict(zip(all_words, self.embed_words(topic_model, all_words))) if all_words else {}
+            for topic, words in topic_words.items():
+                coherence[topic] = self.calculate_topic_coherence(words, [vectors[w] for w in words])
+        except Exception as e:
+            print(f"Error calculating topic coherence: {e}")
+        return topic_model, topics, probs, coherence
     
     def extract_topics(self, messages, room_id):
         """Extract topics from messages using enhanced BERTopic."""
@@ -412,21 +605,20 @@ class TextAnalyzer:
                 'message_count': len(messages) if messages else 0
             }
         
-        # Preprocess messages
-        processed_messages = [self.preprocess_text(msg) for msg in messages]
-        
         try:
-            # Fit and transform the messages
-            topics, probs = self.topic_model.fit_transform(processed_messages)
+            # Preprocessing and fitting run on the separate topic lane so they
+            # never hold the per-message inference slots; topic refreshes are
+            # not latency sensitive, but a full lane rejects instead of queueing
+            topic_model, topics, probs, coherence = topic_executor.run(self._fit_topics, messages)
             
             # Get topic information
-            topic_info = self.topic_model.get_topic_info()
+            topic_info = topic_model.get_topic_info()
             
             # Format results
             formatted_topics = []
             for topic in set(topics):
                 if topic != -1:  # Skip outlier topic
-                    topic_words = self.topic_model.get_topic(topic)
+                    topic_words = topic_model.get_topic(topic)
                     topic_docs = [messages[i] for i, t in enumerate(topics) if t == topic]
                     
                     topic_data = {
@@ -434,7 +626,7 @@ class TextAnalyzer:
                         'keywords': [word for word, _ in topic_words],
                         'size': len(topic_docs),
                         'documents': topic_docs[:2],  # Include up to 2 example messages
-                        'coherence': 0.0  # Simplified for small datasets
+                        'coherence': coherence.get(topic, 0.0)
                     }
                     formatted_topics.append(topic_data)
             
@@ -0,0 +1,122 @@
+"""
+Coalesced vote_updated broadcasts
+
+Every vote used to send a vote_updated to the whole room, so a popular
+answer voted on by a room full of people cost one room-wide broadcast per
+click. VoteBroadcaster sends at most one vote_updated per message every
+VOTE_BROADCAST_INTERVAL_MS:
+
+- the first vote after a quiet period is broadcast at once, with the counts
+  of the handler that recorded it;
+- votes inside the interval only mark the message; when the interval is up
+  a background task reads the current counts of every marked message in one
+  query and broadcasts them. Reading them then, instead of remembering the
+  last handler's counts, means the final broadcast is never older than a
+  vote that raced with it.
+"""
+import threading
+import time
+
+class VoteBroadcaster:
+    def __init__(self, interval_ms=250):
+        self.interval_ms = interval_ms
+        self._app = None
+        self._socketio = None
+        self._batcher = None
+        self._lock = threading.Lock()
+        self._last_sent = {}  # message_id -> monotonic time of its last broadcast
+        self._pending = {}  # message_id -> room_id, votes waiting for the next broadcast
+        self._flushing = False  # a flush task is running
+        self.votes = 0
+        self.broadcasts = 0
+
+    def init_app(self, app, socketio, batcher=None):
+        """Apply VOTE_BROADCAST_INTERVAL_MS; broadcasts go through batcher (room_batcher)"""
+        from app.room_batch import room_batcher
+        self._app = app
+        self._socketio = socketio
+        self._batcher = batcher or room_batcher
+        self.interval_ms = app.config.get('VOTE_BROADCAST_INTERVAL_MS', self.interval_ms)
+
+    def publish(self, message_id, room_id, likes, dislikes):
+        """Announce new counts for a message; broadcast now or with the next batch"""
+        now = time.monotonic()
+        interval = self.interval_ms / 1000.0
+        with self._lock:
+            self.votes += 1
+            last = self._last_sent.get(message_id)
+            send_now = message_id not in self._pending and (last is None or now - last >= interval)
+            start_flusher = False
+            if send_now:
+                self._last_sent[message_id] = now
+                self.broadcasts += 1
+            else:
+                self._pending[message_id] = room_id
+                start_flusher = not self._flushing
+                self._flushing = True
+        if start_flusher:
+            self._socketio.start_background_task(self._flush_loop)
+        if send_now:
+            self._emit(message_id, room_id, likes, dislikes)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'interval_ms': self.interval_ms,
+                'votes': self.votes,
+                'broadcasts': self.broadcasts,
+                'pending': len(self._pending)
+            }
+
+    def _emit(self, message_id, room_id, likes, dislikes):
+        self._batcher.emit('vote_updated', {
+            'message_id': message_id,
+            'likes': likes,
+            'dislikes': dislikes
+        }, room_id)
+
+    def _due(self, now):
+        """Take the pending messages whose interval is up (lock held)"""
+        interval = self.interval_ms / 1000.0
+        due = {message_id: room_id for message_id, room_id in self._pending.items()
+               if now - self._last_sent.get(message_id, 0) >= interval}
+        for message_id in due:
+            del self._pending[message_id]
+            self._last_sent[message_id] = now
+        # Messages idle for a whole interval are as good as never sent
+        for message_id, sent in list(self._last_sent.items()):
+            if now - sent >= interval and message_id not in self._pending:
+                del self._last_sent[message_id]
+        self.broadcasts += len(due)
+        return due
+
+    def _flush_loop(self):
+        from app import db
+        from app.models import Message
+
+        while True:
+            self._socketio.sleep(self.interval_ms / 2000.0)
+            with self._lock:
+                due = self._due(time.monotonic())
+                if not due and not self._pending:
+                    self._flushing = False
+                    return
+            if not due:
+                continue
+            try:
+                with self._app.app_context():
+                    rows = db.session.execute(
+                        db.select(Message.id, Message.likes, Message.dislikes).where(Message.id.in_(due))
+                    ).all()
+                    db.session.remove()
+            except Exception as e:
+                print(f"Error reading vote counts: {e}")
+                with self._lock:
+                    for message_id, room_id in due.items():
+                        self._pending.setdefault(message_id, room_id)
+                continue
+            for message_id, likes, dislikes in rows:
+                self._emit(message_id, due[message_id], likes or 0, dislikes or 0)
+
+# Create a global instance
+vote_broadcaster = VoteBroadcaster()
@@ -0,0 +1,216 @@
+"""
+Group-commit writer for chat message inserts
+
+Every chat message used to be its own transaction. SQLite allows one writer
+at a time and syncs the journal on every commit, so in a busy room the
+handlers queue up behind each other's fsyncs. GroupCommitWriter collects the
+inserts submitted by many handlers for up to GROUP_COMMIT_MAX_DELAY_MS (or
+GROUP_COMMIT_MAX_BATCH rows), writes them in one transaction on a dedicated
+connection, and completes each sender's future with the new row id. The
+delay only applies under load: when the previous batch held a single row the
+next one is written as soon as it arrives.
+
+GROUP_COMMIT_ACK sets what the sender has been promised when its future
+completes (SQLite's synchronous setting on the writer connection):
+
+- ``durable``: the transaction is committed and synced to disk
+  (synchronous=FULL); survives a power cut;
+- ``committed``: committed; synced at the journal's natural sync points
+  (synchronous=NORMAL); survives a crash of the app, a power cut may lose
+  the last batches. This is the default;
+- ``written``: committed to the OS without any sync (synchronous=OFF);
+  survives a crash of the app only while the OS keeps running.
+
+Other databases ignore the setting; their commits are durable.
+
+If a batch fails, its rows are retried one transaction each so a single bad
+row only fails its own sender.
+"""
+import queue
+import threading
+import time
+from concurrent.futures import Future, TimeoutError
+
+ACK_MODES = {
+    'durable': 'FULL',
+    'committed': 'NORMAL',
+    'written': 'OFF',
+}
+
+class GroupCommitWriter:
+    def __init__(self, table=None, max_delay_ms=5, max_batch=100, ack='committed', timeout=5.0):
+        self.table = table
+        self.max_delay_ms = max_delay_ms
+        self.max_batch = max_batch
+        self.ack = ack
+        self.timeout = timeout
+        self.enabled = False
+        self._app = None
+        self._engine = None
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+        self.batches = 0
+        self.rows = 0
+        self.failed = 0
+        self.largest_batch = 0
+
+    def init_app(self, app, table=None):
+        """Apply the GROUP_COMMIT_* settings; table defaults to the message table"""
+        if table is None and self.table is None:
+            from app.models import Message
+            table = Message.__table__
+        self.table = table if table is not None else self.table
+        self.enabled = app.config.get('GROUP_COMMIT_ENABLED', self.enabled)
+        self.max_delay_ms = app.config.get('GROUP_COMMIT_MAX_DELAY_MS', self.max_delay_ms)
+        self.max_batch = app.config.get('GROUP_COMMIT_MAX_BATCH', self.max_batch)
+        self.ack = app.config.get('GROUP_COMMIT_ACK', self.ack)
+        self.timeout = app.config.get('GROUP_COMMIT_TIMEOUT', self.timeout)
+        if self.ack not in ACK_MODES:
+            raise ValueError(f"GROUP_COMMIT_ACK must be one of {', '.join(ACK_MODES)}, not '{self.ack}'")
+        self._app = app
+
+    def bind(self, engine):
+        """Write through engine (the app's engine is used by default)"""
+        self._engine = engine
+
+    def with_defaults(self, values):
+        """values plus the table's Python-side column defaults for the missing columns.
+
+        Lets the caller build the ORM object of the new row from what it
+        submitted and the returned id, without reading the row back.
+        """
+        row = dict(values)
+        for column in self.table.columns:
+            default = column.default
+            if column.key in row or default is None or column.primary_key:
+                continue
+            if default.is_scalar:
+                row[column.key] = default.arg
+            elif default.is_callable:
+                row[column.key] = default.arg(None)
+        return row
+
+    def submit(self, values):
+        """Queue one row; the future resolves to its id once the batch is acknowledged"""
+        future = Future()
+        self._ensure_thread()
+        self._queue.put((self.with_defaults(values), future))
+        return future
+
+    def insert(self, values):
+        """Insert one row and wait for the acknowledgement; returns the new id"""
+        future = self.submit(values)
+        try:
+            return future.result(timeout=self.timeout)
+        except TimeoutError:
+            # Not written yet: drop it so a late write cannot surprise the sender
+            if future.cancel():
+                raise
+            # Already being written; its batch finishes shortly
+            return future.result()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'enabled': self.enabled,
+                'ack': self.ack,
+                'max_delay_ms': self.max_delay_ms,
+                'max_batch': self.max_batch,
+                'batches': self.batches,
+                'rows': self.rows,
+                'failed': self.failed,
+                'largest_batch': self.largest_batch,
+                'avg_batch': round(self.rows / self.batches, 2) if self.batches else 0.0,
+                'queued': self._queue.qsize()
+            }
+
+    def _ensure_thread(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, daemon=True)
+                self._thread.start()
+
+    def _get_engine(self):
+        if self._engine is None:
+            from app import db
+            with self._app.app_context():
+                self._engine = db.engine
+        return self._engine
+
+    def _connect(self):
+        conn = self._get_engine().connect()
+        if conn.dialect.name == 'sqlite':
+            conn.exec_driver_sql(f'PRAGMA synchronous={ACK_MODES[self.ack]}')
+            conn.commit()
+        return conn
+
+    def _collect(self, wait):
+        """Block for the first row, then take what is queued.
+
+        With wait (the previous batch had company) keep gathering for up to
+        max_delay_ms; a lone sender on an idle server is written at once.
+        """
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + (self.max_delay_ms / 1000.0 if wait else 0)
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            try:
+                batch.append(self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        conn = None
+        busy = False
+        while True:
+            batch = self._collect(wait=busy)
+            busy = len(batch) > 1
+            batch = [(values, future) for values, future in batch if future.set_running_or_notify_cancel()]
+            if not batch:
+                continue
+            try:
+                if conn is None:
+                    conn = self._connect()
+                ids = self._write(conn, [values for values, _ in batch])
+            except Exception as e:
+                print(f"Group commit of {len(batch)} rows failed, retrying one by one: {e}")
+                if conn is not None:
+                    conn.close()
+                    conn = None
+                self._write_each(batch)
+                continue
+            for (_, future), row_id in zip(batch, ids):
+                future.set_result(row_id)
+            with self._lock:
+                self.batches += 1
+                self.rows += len(batch)
+                self.largest_batch = max(self.largest_batch, len(batch))
+
+    def _write(self, conn, rows):
+        """Insert rows in one transaction; return their ids in order"""
+        insert = self.table.insert()
+        with conn.begin():
+            return [conn.execute(insert, values).inserted_primary_key[0] for values in rows]
+
+    def _write_each(self, batch):
+        for values, future in batch:
+            try:
+                with self._connect() as conn:
+                    row_id = self._write(conn, [values])[0]
+            except Exception as e:
+                with self._lock:
+                    self.failed += 1
+                future.set_exception(e)
+                continue
+            future.set_result(row_id)
+            with self._lock:
+                self.batches += 1
+                self.rows += 1
+                self.largest_batch = max(self.largest_batch, 1)
+
+# Create a global instance
+group_commit = GroupCommitWriter()
@@ -0,0 +1,109 @@
+"""
+Room broadcast latency across server processes sharing a message queue
+
+    python bench_broadcast.py [clients_per_worker] [workers ...]
+
+For each worker count (default: 1 2 4) starts that many `python wsgi.py`
+servers (eventlet) on one scratch database, connected through a
+file:// SOCKETIO_MESSAGE_QUEUE, and joins clients_per_worker clients on every
+server to the same room. One client then sends MESSAGES chat messages
+through the normal `message` handler; every client records when each
+broadcast arrives. Reports delivery ratio and latency from send to arrival,
+per delivery and until the last client of the room has it. A single server
+without a queue is measured first as the baseline.
+"""
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+
+from bench_connections import free_port, open_connection, prepare_database, start_server
+
+MESSAGES = 40
+SEND_INTERVAL = 0.1
+
+def listen(ws, arrivals, stop):
+    while not stop.is_set():
+        try:
+            packet = ws.receive(timeout=0.5)
+        except Exception:
+            return
+        if packet is None:
+            continue
+        if packet == '2':
+            ws.send('3')
+        elif packet.startswith('42["message"'):
+            now = time.perf_counter()
+            content = json.loads(packet[2:])[1].get('content', '')
+            if content.startswith('bench ping '):
+                arrivals.append((int(content.split()[2]), now))
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))] * 1000 if values else 0.0
+
+def run(workers, clients_per_worker, cookie, room_id, database, directory, use_queue=True):
+    env = {'RATE_LIMITS': 'message=1000/1000'}
+    if use_queue:
+        env['SOCKETIO_MESSAGE_QUEUE'] = f"file://{os.path.join(directory, f'bus-{workers}.jsonl')}"
+    ports = [free_port() for _ in range(workers)]
+    servers = [start_server('eventlet', port, database, **env) for port in ports]
+    stop = threading.Event()
+    clients, arrivals = [], []
+    try:
+        for port in ports:
+            url = f'ws://127.0.0.1:{port}/socket.io/?EIO=4&transport=websocket'
+            for _ in range(clients_per_worker):
+                ws, error = open_connection(url, cookie)
+                if ws is None:
+                    raise RuntimeError(f"connect failed: {error}")
+                ws.send('42' + json.dumps(['join', {'room_id': room_id}]))
+                client_arrivals = []
+                arrivals.append(client_arrivals)
+                threading.Thread(target=listen, args=(ws, client_arrivals, stop), daemon=True).start()
+                clients.append(ws)
+        time.sleep(2)  # joins processed and queue listeners attached
+
+        sender = clients[0]
+        sent = {}
+        for n in range(MESSAGES):
+            sent[n] = time.perf_counter()
+            sender.send('42' + json.dumps(['message', {'room_id': room_id, 'content': f'bench ping {n}'}]))
+            time.sleep(SEND_INTERVAL)
+        time.sleep(3)
+
+        deliveries, fan_out = [], []
+        for n, started in sent.items():
+            times = [t for client in arrivals for m, t in client if m == n]
+            deliveries.extend(t - started for t in times)
+            if len(times) == len(clients):
+                fan_out.append(max(times) - started)
+        expected = MESSAGES * len(clients)
+        label = f"{workers}{'' if use_queue else ' (no queue)'}"
+        print(f"{label:<14} clients {len(clients):>5}  delivered {len(deliveries) / expected:>7.2%}  "
+              f"delivery p50 {percentile(deliveries, 0.5):6.1f} ms  p95 {percentile(deliveries, 0.95):6.1f} ms  "
+              f"all clients p50 {percentile(fan_out, 0.5):6.1f} ms  p95 {percentile(fan_out, 0.95):6.1f} ms",
+              flush=True)
+    finally:
+        stop.set()
+        for ws in clients:
+            try:
+                ws.close()
+            except Exception:
+                pass
+        for server in servers:
+            server.kill()
+            server.wait()
+
+if __name__ == "__main__":
+    clients_per_worker = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    worker_counts = [int(w) for w in sys.argv[2:]] or [1, 2, 4]
+    with tempfile.TemporaryDirectory() as directory:
+        database = os.path.join(directory, 'bench.db')
+        cookie, room_id = prepare_database(database)
+        print(f"{MESSAGES} messages, {clients_per_worker} clients per worker")
+        run(1, clients_per_worker, cookie, room_id, database, directory, use_queue=False)
+        for workers in worker_counts:
+            run(workers, clients_per_worker, cookie, room_id, database, directory)
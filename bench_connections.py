@@ -0,0 +1,174 @@
+"""
+Websocket connection ceiling benchmark for the Socket.IO serving modes
+
+    python bench_connections.py [max_connections] [mode ...]
+
+For each mode (default: threading eventlet) starts `python wsgi.py` on a
+scratch SQLite database, then opens authenticated Socket.IO websocket
+connections in steps of STEP, CONCURRENT_CONNECTS at a time, until more
+than MAX_FAILURE_RATE of a step fail to connect within CONNECT_TIMEOUT
+seconds, or max_connections is reached. Every open connection stays open. Reports the connections held, connect latency, and
+the server's threads and resident memory at the end.
+"""
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+import simple_websocket
+
+STEP = 250
+CONNECT_TIMEOUT = 5.0
+# Connections opened at once; a larger burst only measures the listen backlog
+CONCURRENT_CONNECTS = 32
+MAX_FAILURE_RATE = 0.05
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+def prepare_database(path):
+    """Create the schema, a user and a room; return (session cookie of the user, room id)"""
+    os.environ['DATABASE_URL'] = f'sqlite:///{path}'
+    os.environ['SOCKETIO_LOGGER'] = 'false'
+    from app import create_app, db
+    from app.models import User, Room
+
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        user = User(username='bench', email='bench@example.com', state='Goa')
+        user.set_password('bench')
+        room = Room(name='bench', description='Benchmark room')
+        db.session.add_all([user, room])
+        db.session.commit()
+        serializer = app.session_interface.get_signing_serializer(app)
+        cookie = serializer.dumps({'_user_id': str(user.id), '_fresh': True})
+        room_id = room.id
+    return f"{app.config.get('SESSION_COOKIE_NAME', 'session')}={cookie}", room_id
+
+def start_server(mode, port, database, **extra_env):
+    env = dict(os.environ, SOCKETIO_ASYNC_MODE=mode, GUNICORN_BIND=f'127.0.0.1:{port}',
+               DATABASE_URL=f'sqlite:///{database}', SOCKETIO_LOGGER='false', PRELOAD_MODELS='off',
+               **extra_env)
+    server = subprocess.Popen([sys.executable, 'wsgi.py'], env=env,
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        try:
+            urllib.request.urlopen(f'http://127.0.0.1:{port}/health/ready', timeout=1)
+            return server
+        except OSError:
+            time.sleep(0.2)
+    server.kill()
+    raise RuntimeError(f"{mode} server did not start")
+
+def open_connection(url, cookie, attempts=3):
+    """Open one Socket.IO connection; return (client, seconds) or (None, error).
+
+    The simple-websocket client occasionally misses a first frame that
+    arrives together with the HTTP upgrade response; such attempts are
+    retried (the latency includes the retry).
+    """
+    started = time.perf_counter()
+    error = None
+    for _ in range(attempts):
+        ws = None
+        try:
+            ws = simple_websocket.Client.connect(url, headers={'Cookie': cookie})
+            if not str(ws.receive(timeout=CONNECT_TIMEOUT)).startswith('0'):
+                raise RuntimeError('no Engine.IO handshake')
+            ws.send('40')
+            reply = str(ws.receive(timeout=CONNECT_TIMEOUT))
+            if not reply.startswith('40'):
+                raise RuntimeError(f'namespace connect refused: {reply[:40]}')
+            return ws, time.perf_counter() - started
+        except Exception as e:
+            error = str(e) or type(e).__name__
+            if ws is not None:
+                try:
+                    ws.close()
+                except Exception:
+                    pass
+    return None, error
+
+def keep_alive(clients, stop):
+    """Answer the server's Engine.IO pings so idle connections stay open"""
+    while not stop.is_set():
+        for ws in list(clients):
+            try:
+                while True:
+                    packet = ws.receive(timeout=0)
+                    if packet is None:
+                        break
+                    if packet == '2':
+                        ws.send('3')
+            except Exception:
+                pass
+        stop.wait(1)
+
+def process_stats(pid):
+    stats = {}
+    with open(f'/proc/{pid}/status') as f:
+        for line in f:
+            key, _, value = line.partition(':')
+            if key in ('Threads', 'VmRSS'):
+                stats[key] = value.strip()
+    return stats
+
+def bench(mode, max_connections, cookie, database):
+    port = free_port()
+    server = start_server(mode, port, database)
+    url = f'ws://127.0.0.1:{port}/socket.io/?EIO=4&transport=websocket'
+    clients, latencies, failures, error = [], [], 0, None
+    stop = threading.Event()
+    threading.Thread(target=keep_alive, args=(clients, stop), daemon=True).start()
+    try:
+        while len(clients) < max_connections and error is None:
+            with ThreadPoolExecutor(CONCURRENT_CONNECTS) as pool:
+                results = list(pool.map(lambda _: open_connection(url, cookie),
+                                         range(min(STEP, max_connections - len(clients)))))
+            step_failures = [value for ws, value in results if ws is None]
+            failures += len(step_failures)
+            if len(step_failures) > MAX_FAILURE_RATE * len(results):
+                error = step_failures[0]
+            for ws, value in results:
+                if ws is not None:
+                    clients.append(ws)
+                    latencies.append(value)
+            print(f"  {mode}: {len(clients)} connections open", flush=True)
+
+        time.sleep(2)  # let the server settle before measuring it
+        stats = process_stats(server.pid)
+        latencies.sort()
+        print(f"{mode:<10} held {len(clients):>6} connections  "
+              f"connect p50 {latencies[len(latencies) // 2] * 1000:.1f} ms  "
+              f"p95 {latencies[int(len(latencies) * 0.95)] * 1000:.1f} ms  "
+              f"failed {failures}  server threads {stats.get('Threads')}  rss {stats.get('VmRSS')}"
+              + (f"  stopped by: {error}" if error else ""))
+    finally:
+        stop.set()
+        for ws in clients:
+            try:
+                ws.close()
+            except Exception:
+                pass
+        server.kill()
+        server.wait()
+
+if __name__ == "__main__":
+    max_connections = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    modes = sys.argv[2:] or ['threading', 'eventlet']
+    threading.stack_size(512 * 1024)  # one client thread per connection
+    with tempfile.TemporaryDirectory() as directory:
+        database = os.path.join(directory, 'bench.db')
+        cookie, _ = prepare_database(database)
+        print(f"Opening up to {max_connections} connections in steps of {STEP}")
+        for mode in modes:
+            bench(mode, max_connections, cookie, database)
@@ -0,0 +1,85 @@
+"""
+Chat message insert throughput: one transaction per message vs group commit
+
+    python bench_group_commit.py [messages] [senders ...]
+
+Creates a scratch SQLite database and has `senders` threads (default: 1 16
+64) save `messages` chat messages between them through the same
+save_message call the socket handlers use: first with one commit per
+message, then through the group-commit writer with each GROUP_COMMIT_ACK
+mode. Reports messages per second, per-message latency, errors and the
+average batch size.
+"""
+import os
+import sys
+import tempfile
+import threading
+import time
+
+def run(app, label, senders, messages, user_id, room_id, writer):
+    from app import db, events
+
+    events.group_commit = writer
+    latencies, errors = [], []
+    lock = threading.Lock()
+
+    def send(count):
+        with app.app_context():
+            for n in range(count):
+                started = time.perf_counter()
+                try:
+                    events.save_message(content=f'bench message {n}', user_id=user_id, room_id=room_id)
+                except Exception as e:
+                    with lock:
+                        errors.append(str(e))
+                    db.session.rollback()
+                    continue
+                with lock:
+                    latencies.append(time.perf_counter() - started)
+            db.session.remove()
+
+    per_sender = max(1, messages // senders)
+    threads = [threading.Thread(target=send, args=(per_sender,)) for _ in range(senders)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    p50 = latencies[len(latencies) // 2] * 1000 if latencies else 0.0
+    p95 = latencies[int(len(latencies) * 0.95)] * 1000 if latencies else 0.0
+    batch = f"  avg batch {writer.stats()['avg_batch']:6.1f}" if writer.enabled else ""
+    print(f"{label:<22} senders {senders:>3}  {len(latencies) / elapsed:8.0f} msg/s  "
+          f"p50 {p50:7.2f} ms  p95 {p95:7.2f} ms  errors {len(errors):>4}{batch}", flush=True)
+
+if __name__ == "__main__":
+    messages = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    sender_counts = [int(s) for s in sys.argv[2:]] or [1, 16, 64]
+    with tempfile.TemporaryDirectory() as directory:
+        os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(directory, 'bench.db')}"
+        os.environ['SOCKETIO_LOGGER'] = 'false'
+        os.environ['PRELOAD_MODELS'] = 'off'
+        from app import create_app, db
+        from app.models import User, Room
+        from app.write_behind import GroupCommitWriter, ACK_MODES
+
+        app = create_app()
+        with app.app_context():
+            db.create_all()
+            user = User(username='bench', email='bench@example.com', state='Goa')
+            user.set_password('bench')
+            room = Room(name='bench', description='Benchmark room')
+            db.session.add_all([user, room])
+            db.session.commit()
+            user_id, room_id = user.id, room.id
+
+        print(f"{messages} messages per run")
+        for senders in sender_counts:
+            run(app, 'commit per message', senders, messages, user_id, room_id, GroupCommitWriter())
+            for ack in ACK_MODES:
+                writer = GroupCommitWriter()
+                writer.init_app(app)
+                writer.enabled, writer.ack = True, ack
+                run(app, f'group commit ({ack})', senders, messages, user_id, room_id, writer)
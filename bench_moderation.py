@@ -0,0 +1,55 @@
+"""
+Throughput benchmark for the moderation hot path
+
+    python bench_moderation.py [messages]
+
+Compares the old whitespace-split set lookup with the normalizing
+ProfanityMatcher on a mix of clean chat messages and obfuscated profanity,
+and reports messages per second and microseconds per message.
+"""
+import random
+import sys
+import time
+
+from app.profanity import ProfanityMatcher
+
+clean_messages = [
+    "Which credit card has the lowest annual fee for students?",
+    "Thanks a lot, that really helped me close the lead today!",
+    "bhai ye demat account kaise open karte hain?",
+    "The customer wants a home loan of 25 lakh at 8.5% interest",
+    "Can someone share the latest insurance brochure? 🙏",
+    "Meeting at 5pm, please join on time",
+]
+
+obfuscated_messages = [
+    "this is such b.s. honestly",
+    "what a s h i t day",
+    "you a$$hole",
+    "shhhiiiit",
+    "sh​it happens",
+]
+
+def old_check(content, vulgar_words):
+    words = [word.strip('.,!?()[]{}":;') for word in content.lower().split()]
+    return any(word in vulgar_words for word in words)
+
+def bench(label, check, messages):
+    start = time.perf_counter()
+    flagged = sum(1 for message in messages if check(message))
+    elapsed = time.perf_counter() - start
+    print(f"{label:<24} {len(messages) / elapsed:>12,.0f} msg/s "
+          f"{elapsed / len(messages) * 1e6:>8.1f} us/msg  flagged={flagged}")
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    random.seed(0)
+    # 95% clean traffic, 5% obfuscated profanity
+    messages = [random.choice(obfuscated_messages) if random.random() < 0.05 else random.choice(clean_messages)
+                for _ in range(count)]
+    
+    matcher = ProfanityMatcher()
+    matcher.reload()
+    print(f"{count} messages, {len(matcher.words)} list entries")
+    bench("old split + set lookup", lambda m: old_check(m, matcher.words), messages)
+    bench("ProfanityMatcher", matcher.contains_profanity, messages)
@@ -16,4 +16,141 @@ class Config:
     MAIL_USE_TLS = os.environ.get('MAIL_USE_TLS', 'true').lower() in ['true', 'on', '1']
     MAIL_USERNAME = os.environ.get('MAIL_USERNAME')
     MAIL_PASSWORD = os.environ.get('MAIL_PASSWORD')
-    MAIL_DEFAULT_SENDER = os.environ.get('MAIL_DEFAULT_SENDER', 'noreply@samudaayconnect.com') 
\ No newline at end of file
+    MAIL_DEFAULT_SENDER = os.environ.get('MAIL_DEFAULT_SENDER', 'noreply@samudaayconnect.com')
+
+    # Socket.IO serving mode: 'threading' (one OS thread per connection, fine
+    # for development) or 'eventlet'/'gevent' (green threads, thousands of
+    # connections per worker; serve through wsgi.py, which monkey patches).
+    # SQLITE_BUSY_TIMEOUT caps how long a locked SQLite database may stall
+    # the event loop in the green modes.
+    SOCKETIO_ASYNC_MODE = os.environ.get('SOCKETIO_ASYNC_MODE', 'threading').lower()
+    SOCKETIO_LOGGER = os.environ.get('SOCKETIO_LOGGER', 'true').lower() in ['true', 'on', '1']
+    SQLITE_BUSY_TIMEOUT = float(os.environ.get('SQLITE_BUSY_TIMEOUT', 1.0))
+
+    # Broadcast fan-out between server processes: a Redis URL, a Kombu URL
+    # (amqp://...), file:///path/bus.jsonl for a single machine, or empty for
+    # a single process. Processes sharing a channel share broadcasts.
+    SOCKETIO_MESSAGE_QUEUE = os.environ.get('SOCKETIO_MESSAGE_QUEUE', '')
+    SOCKETIO_CHANNEL = os.environ.get('SOCKETIO_CHANNEL', 'flask-socketio')
+    # The file:// queue starts a new segment when it reaches this size
+    SOCKETIO_FILE_QUEUE_MAX_BYTES = int(os.environ.get('SOCKETIO_FILE_QUEUE_MAX_BYTES', 64 * 1024 * 1024))
+
+    # Model preloading for the TextAnalyzer models:
+    #   'off'        - load lazily, per worker, on first use
+    #   'sync'       - warm everything in the master before gunicorn forks, so
+    #                  workers share the model pages copy-on-write
+    #   'background' - warm in a thread while the server starts (single process);
+    #                  /health/ready answers 503 until warm-up finishes
+    PRELOAD_MODELS = os.environ.get('PRELOAD_MODELS', 'off').lower()
+
+    # Model registry: process-wide memory budget for loaded models (0 = unlimited)
+    # and seconds of inactivity after which a model is unloaded (0 = never).
+    # Unloaded models are reloaded on their next use.
+    MODEL_MEMORY_BUDGET_MB = int(os.environ.get('MODEL_MEMORY_BUDGET_MB', 0))
+    MODEL_IDLE_TTL = int(os.environ.get('MODEL_IDLE_TTL', 0))
+
+    # Inference executor: number of model calls allowed to run at once, extra
+    # calls allowed to wait for a slot, and seconds a caller waits before
+    # falling back to the rule-based result. Torch threads per call default
+    # to cores // slots (0).
+    INFERENCE_SLOTS = int(os.environ.get('INFERENCE_SLOTS', 2))
+    INFERENCE_QUEUE_SIZE = int(os.environ.get('INFERENCE_QUEUE_SIZE', 16))
+    INFERENCE_TIMEOUT = float(os.environ.get('INFERENCE_TIMEOUT', 5.0))
+    INFERENCE_TORCH_THREADS = int(os.environ.get('INFERENCE_TORCH_THREADS', 0))
+
+    # Topic model fits (BERTopic) run on their own lane so a slow refresh never
+    # holds a per-message slot. Capacity trade-off: up to INFERENCE_SLOTS +
+    # TOPIC_INFERENCE_SLOTS model calls can run at once, so size the torch
+    # threads for both lanes together on small boxes.
+    TOPIC_INFERENCE_SLOTS = int(os.environ.get('TOPIC_INFERENCE_SLOTS', 1))
+    TOPIC_INFERENCE_QUEUE_SIZE = int(os.environ.get('TOPIC_INFERENCE_QUEUE_SIZE', 2))
+    TOPIC_INFERENCE_TIMEOUT = None  # wait for the fit to finish
+
+    # Cache of analyze_message results: an in-memory LRU of
+    # ANALYSIS_CACHE_MEMORY_SIZE entries in front of a SQLite file shared by
+    # the workers (empty path = memory only). Entries expire after
+    # ANALYSIS_CACHE_TTL seconds; the file keeps at most
+    # ANALYSIS_CACHE_MAX_ENTRIES rows.
+    ANALYSIS_CACHE_PATH = os.environ.get('ANALYSIS_CACHE_PATH',
+                                         os.path.join(basedir, 'models_cache', 'analysis_cache.db'))
+    ANALYSIS_CACHE_MEMORY_SIZE = int(os.environ.get('ANALYSIS_CACHE_MEMORY_SIZE', 2048))
+    ANALYSIS_CACHE_MAX_ENTRIES = int(os.environ.get('ANALYSIS_CACHE_MAX_ENTRIES', 100000))
+    ANALYSIS_CACHE_TTL = int(os.environ.get('ANALYSIS_CACHE_TTL', 7 * 24 * 3600))
+
+    # Room keyword summaries: messages kept per room, keyphrases shown and
+    # seconds between background refreshes of rooms with new messages
+    ROOM_KEYWORDS_WINDOW = int(os.environ.get('ROOM_KEYWORDS_WINDOW', 200))
+    ROOM_KEYWORDS_TOP_N = int(os.environ.get('ROOM_KEYWORDS_TOP_N', 8))
+    ROOM_KEYWORDS_REFRESH_SECONDS = int(os.environ.get('ROOM_KEYWORDS_REFRESH_SECONDS', 120))
+
+    # Near-duplicate detection: messages of at least NEAR_DUPLICATE_MIN_TOKENS
+    # words whose SimHash fingerprints differ in at most
+    # NEAR_DUPLICATE_MAX_DISTANCE of 64 bits count as copies. The in-memory
+    # index keeps the NEAR_DUPLICATE_MAX_ENTRIES most recent fingerprints.
+    NEAR_DUPLICATE_MIN_TOKENS = int(os.environ.get('NEAR_DUPLICATE_MIN_TOKENS', 5))
+    NEAR_DUPLICATE_MAX_DISTANCE = int(os.environ.get('NEAR_DUPLICATE_MAX_DISTANCE', 3))
+    NEAR_DUPLICATE_MAX_ENTRIES = int(os.environ.get('NEAR_DUPLICATE_MAX_ENTRIES', 50000))
+
+    # Message pipeline: background threads for the deferred stages (emotion
+    # analysis) and how many messages may wait for them before new ones skip
+    # the deferred stages.
+    PIPELINE_DEFERRED_WORKERS = int(os.environ.get('PIPELINE_DEFERRED_WORKERS', 2))
+    PIPELINE_MAX_DEFERRED = int(os.environ.get('PIPELINE_MAX_DEFERRED', 200))
+
+    # Socket event rate limits per user and room, as "event=rate/burst" with
+    # rate in events per second (e.g. "message=1/5,vote_message=2/10").
+    # Events not listed keep the defaults in app/rate_limit.py.
+    RATE_LIMIT_ENABLED = os.environ.get('RATE_LIMIT_ENABLED', 'true').lower() in ['true', 'on', '1']
+    RATE_LIMITS = os.environ.get('RATE_LIMITS', '')
+
+    # Room presence is kept in memory; RoomMembership.is_active/last_active
+    # are written in batches every PRESENCE_FLUSH_SECONDS, or as soon as
+    # PRESENCE_FLUSH_BATCH changes are pending.
+    PRESENCE_FLUSH_SECONDS = float(os.environ.get('PRESENCE_FLUSH_SECONDS', 5))
+    PRESENCE_FLUSH_BATCH = int(os.environ.get('PRESENCE_FLUSH_BATCH', 500))
+
+    # Group commit for chat message inserts (app/write_behind.py): messages
+    # from concurrent handlers are written in one transaction after at most
+    # GROUP_COMMIT_MAX_DELAY_MS. GROUP_COMMIT_ACK is durable, committed or
+    # written and decides how durable a message is when its sender is answered.
+    GROUP_COMMIT_ENABLED = os.environ.get('GROUP_COMMIT_ENABLED', 'false').lower() in ['true', 'on', '1']
+    GROUP_COMMIT_MAX_DELAY_MS = float(os.environ.get('GROUP_COMMIT_MAX_DELAY_MS', 5))
+    GROUP_COMMIT_MAX_BATCH = int(os.environ.get('GROUP_COMMIT_MAX_BATCH', 100))
+    GROUP_COMMIT_ACK = os.environ.get('GROUP_COMMIT_ACK', 'committed').lower()
+    GROUP_COMMIT_TIMEOUT = float(os.environ.get('GROUP_COMMIT_TIMEOUT', 5))
+
+    # At most one vote_updated broadcast per message per interval
+    VOTE_BROADCAST_INTERVAL_MS = int(os.environ.get('VOTE_BROADCAST_INTERVAL_MS', 250))
+
+    # Batched room broadcasts: rooms with at least ROOM_BATCH_MIN_RATE events
+    # a second get their events in one 'batch' frame every
+    # ROOM_BATCH_WINDOW_MS (or every ROOM_BATCH_MAX_EVENTS events)
+    ROOM_BATCH_ENABLED = os.environ.get('ROOM_BATCH_ENABLED', 'false').lower() in ['true', 'on', '1']
+    ROOM_BATCH_WINDOW_MS = int(os.environ.get('ROOM_BATCH_WINDOW_MS', 50))
+    ROOM_BATCH_MAX_EVENTS = int(os.environ.get('ROOM_BATCH_MAX_EVENTS', 50))
+    ROOM_BATCH_MIN_RATE = int(os.environ.get('ROOM_BATCH_MIN_RATE', 20))
+
+    # Points ledger: balances are snapshotted every POINTS_SNAPSHOT_SECONDS,
+    # leaving out ledger rows younger than POINTS_SNAPSHOT_LAG_SECONDS
+    POINTS_SNAPSHOT_SECONDS = int(os.environ.get('POINTS_SNAPSHOT_SECONDS', 3600))
+    POINTS_SNAPSHOT_LAG_SECONDS = int(os.environ.get('POINTS_SNAPSHOT_LAG_SECONDS', 60))
+
+    # Room broadcasts carry a per-room sequence number; the last ROOM_LOG_SIZE
+    # events of each room are kept so a reconnecting client gets only what it
+    # missed. Otherwise up to ROOM_LOG_RESUME_LIMIT messages come from the database
+    # and the client reloads the room.
+    ROOM_LOG_ENABLED = os.environ.get('ROOM_LOG_ENABLED', 'true').lower() in ['true', 'on', '1']
+    ROOM_LOG_SIZE = int(os.environ.get('ROOM_LOG_SIZE', 200))
+    ROOM_LOG_RESUME_LIMIT = int(os.environ.get('ROOM_LOG_RESUME_LIMIT', 200))
+
+    # Outbound queue limits per connection, in packets: from
+    # OUTBOUND_QUEUE_HIGH until the queue is back at OUTBOUND_QUEUE_LOW,
+    # low-priority events to the connection are dropped. Connections with
+    # OUTBOUND_QUEUE_MAX packets queued, or congested for longer than
+    # OUTBOUND_STUCK_SECONDS, are disconnected.
+    OUTBOUND_GUARD_ENABLED = os.environ.get('OUTBOUND_GUARD_ENABLED', 'true').lower() in ['true', 'on', '1']
+    OUTBOUND_QUEUE_HIGH = int(os.environ.get('OUTBOUND_QUEUE_HIGH', 100))
+    OUTBOUND_QUEUE_LOW = int(os.environ.get('OUTBOUND_QUEUE_LOW', 20))
+    OUTBOUND_QUEUE_MAX = int(os.environ.get('OUTBOUND_QUEUE_MAX', 1000))
+    OUTBOUND_STUCK_SECONDS = float(os.environ.get('OUTBOUND_STUCK_SECONDS', 30))
+    OUTBOUND_LOW_PRIORITY_EVENTS = os.environ.get('OUTBOUND_LOW_PRIORITY_EVENTS', '')
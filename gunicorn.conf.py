@@ -0,0 +1,41 @@
+"""
+Gunicorn configuration
+
+Loads the app (and, with PRELOAD_MODELS=sync, every TextAnalyzer model) in the
+master process before forking, so the worker starts with warm models.
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+The worker class follows SOCKETIO_ASYNC_MODE: 'gthread' for threading (one
+thread per connection, GUNICORN_THREADS of them), 'eventlet' or 'gevent' for
+the green modes (up to GUNICORN_WORKER_CONNECTIONS connections). wsgi.py
+monkey patches before the app is loaded, so preloading is safe in every mode.
+
+Broadcasts only reach the clients of the worker that emits them unless the
+workers share a message queue, so GUNICORN_WORKERS is only honoured when
+SOCKETIO_MESSAGE_QUEUE is set (see app/socket_queue.py). gunicorn's own
+load balancing is not sticky, which is fine for the app's websocket-only
+clients; clients using the long-polling transport need every request of a
+session to reach the same worker, i.e. one gunicorn per port behind a
+load balancer with sticky sessions (see README).
+"""
+import os
+
+os.environ.setdefault('PRELOAD_MODELS', 'sync')
+
+async_mode = os.environ.get('SOCKETIO_ASYNC_MODE', 'threading').lower()
+
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:8000')
+workers = int(os.environ.get('GUNICORN_WORKERS', 1))
+if workers > 1 and not os.environ.get('SOCKETIO_MESSAGE_QUEUE'):
+    print("GUNICORN_WORKERS ignored: set SOCKETIO_MESSAGE_QUEUE so broadcasts reach every worker")
+    workers = 1
+preload_app = True
+timeout = 120
+
+if async_mode in ('eventlet', 'gevent'):
+    worker_class = async_mode
+    worker_connections = int(os.environ.get('GUNICORN_WORKER_CONNECTIONS', 5000))
+else:
+    worker_class = 'gthread'
+    threads = int(os.environ.get('GUNICORN_THREADS', 100))
@@ -0,0 +1,28 @@
+"""Add is_flagged to Message for the moderation backfill
+
+Revision ID: b41f6c2d9e07
+Revises: 8329f570a116
+Create Date: 2026-10-19 10:12:44.201518
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b41f6c2d9e07'
+down_revision = '8329f570a116'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('message', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('is_flagged', sa.Boolean(), nullable=False, server_default=sa.text('0')))
+        batch_op.create_index(batch_op.f('ix_message_is_flagged'), ['is_flagged'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('message', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_message_is_flagged'))
+        batch_op.drop_column('is_flagged')
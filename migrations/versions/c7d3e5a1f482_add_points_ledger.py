@@ -0,0 +1,68 @@
+"""Add the points ledger and balance snapshots
+
+Revision ID: c7d3e5a1f482
+Revises: b41f6c2d9e07
+Create Date: 2026-10-19 14:05:31.480126
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c7d3e5a1f482'
+down_revision = 'b41f6c2d9e07'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('points_ledger',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('delta', sa.Integer(), nullable=False),
+    sa.Column('balance', sa.Integer(), nullable=False),
+    sa.Column('reason', sa.String(length=32), nullable=False),
+    sa.Column('message_id', sa.Integer(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['message_id'], ['message.id'], ondelete='SET NULL'),
+    sa.ForeignKeyConstraint(['user_id'], ['user.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('points_ledger', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_points_ledger_created_at'), ['created_at'], unique=False)
+        batch_op.create_index(batch_op.f('ix_points_ledger_user_id'), ['user_id'], unique=False)
+
+    op.create_table('points_snapshot',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('balance', sa.Integer(), nullable=False),
+    sa.Column('ledger_id', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['user.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('points_snapshot', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_points_snapshot_user_id'), ['user_id'], unique=False)
+
+    # Existing balances become the opening rows of the ledger
+    user = sa.table('user', sa.column('id'), sa.column('points'))
+    ledger = sa.table('points_ledger', sa.column('user_id'), sa.column('delta'), sa.column('balance'),
+                      sa.column('reason'), sa.column('created_at'))
+    op.execute(ledger.insert().from_select(
+        ['user_id', 'delta', 'balance', 'reason', 'created_at'],
+        sa.select(user.c.id, sa.func.coalesce(user.c.points, 0), sa.func.coalesce(user.c.points, 0),
+                  sa.literal('opening'), sa.func.current_timestamp())
+    ))
+
+
+def downgrade():
+    with op.batch_alter_table('points_snapshot', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_points_snapshot_user_id'))
+
+    op.drop_table('points_snapshot')
+    with op.batch_alter_table('points_ledger', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_points_ledger_user_id'))
+        batch_op.drop_index(batch_op.f('ix_points_ledger_created_at'))
+
+    op.drop_table('points_ledger')
@@ -3,4 +3,10 @@ from app import create_app, socketio
 app = create_app()
 
 if __name__ == '__main__':
-    socketio.run(app, debug=True, allow_unsafe_werkzeug=True) 
\ No newline at end of file
+    # Single process: set PRELOAD_MODELS=background to warm the models while
+    # the server starts (/health/ready reports 503 until they are loaded).
+    # The reloader would run create_app - and the warm-up - a second time in
+    # its child process, so it is disabled whenever models are preloaded.
+    # Development server; for eventlet/gevent serving use wsgi.py.
+    socketio.run(app, debug=True, allow_unsafe_werkzeug=True,
+                 use_reloader=app.config['PRELOAD_MODELS'] == 'off')
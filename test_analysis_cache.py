@@ -0,0 +1,82 @@
+import os
+import tempfile
+import time
+from app.analysis_cache import AnalysisCache
+from app.text_analysis import text_analyzer, ANALYSIS_VERSION
+
+# Sample analysis result
+sample_result = {
+    'emotions': {'primary_emotion': 'joy', 'emotion_score': 1.0, 'all_emotions': {'joy': 1.0}, 'emoji': '😊'},
+    'intent': {'intent': 'gratitude', 'confidence': 1.0, 'all_intents': {'gratitude': 1.0}, 'emoji': '🙏'}
+}
+
+def test_analysis_cache_tiers():
+    print("\nAnalysis Cache - Memory and Disk Tiers")
+    print("=" * 60)
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'cache.db')
+        cache = AnalysisCache(path=path, memory_size=2)
+        assert cache.get('Thanks, great job!', 'v1') is None
+        cache.set('Thanks, great job!', 'v1', sample_result)
+        
+        # Case and whitespace differences share an entry
+        assert cache.get('  thanks,   GREAT job! ', 'v1') == sample_result
+        # A different model version does not
+        assert cache.get('Thanks, great job!', 'v2') is None
+        
+        # A fresh process-level cache finds the entry on disk
+        other = AnalysisCache(path=path)
+        assert other.get('thanks, great job!', 'v1') == sample_result
+        stats = cache.stats()
+        print(f"Stats: {stats}")
+        assert stats['memory_hits'] == 1 and stats['misses'] == 2
+        assert other.stats()['disk_hits'] == 1
+        
+        # The memory tier is an LRU bounded by memory_size
+        cache.set('one', 'v1', sample_result)
+        cache.set('two', 'v1', sample_result)
+        assert cache.stats()['memory_entries'] == 2
+
+def test_analysis_cache_ttl_and_cap():
+    print("\nAnalysis Cache - TTL and Size Cap")
+    print("=" * 60)
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = AnalysisCache(path=os.path.join(tmp, 'cache.db'), ttl=0.2, max_entries=10)
+        cache.set('hello', 'v1', sample_result)
+        time.sleep(0.3)
+        assert cache.get('hello', 'v1') is None
+        
+        cache.ttl = 0
+        for i in range(30):
+            cache.set(f"message {i}", 'v1', sample_result)
+        cache._prune(time.time())
+        print(f"Rows after prune: {cache.stats()['disk_entries']}")
+        assert cache.stats()['disk_entries'] == 10
+
+def test_analyze_message_uses_cache():
+    print("\nAnalysis Cache - analyze_message")
+    print("=" * 60)
+    
+    import app.text_analysis as text_analysis
+    shared_cache = text_analysis.analysis_cache
+    with tempfile.TemporaryDirectory() as tmp:
+        # Its own cache, so the shared one (and its file) are left alone
+        cache = text_analysis.analysis_cache = AnalysisCache(path=os.path.join(tmp, 'cache.db'))
+        try:
+            # Rule-only message: no model is needed for either result
+            text = "Thank you, I'm so happy with this!"
+            first = text_analyzer.analyze_message(text)
+            second = text_analyzer.analyze_message(text.upper())
+            print(f"Analysis: {first}, stats: {cache.stats()}")
+            assert first == second
+            assert cache.get(text, ANALYSIS_VERSION) == first
+            assert cache.stats()['disk_entries'] == 1
+        finally:
+            text_analysis.analysis_cache = shared_cache
+
+if __name__ == "__main__":
+    test_analysis_cache_tiers()
+    test_analysis_cache_ttl_and_cap()
+    test_analyze_message_uses_cache()
@@ -0,0 +1,41 @@
+from flask import Flask
+
+from app import async_mode
+
+def make_app(**config):
+    app = Flask(__name__)
+    app.config.update(SQLALCHEMY_DATABASE_URI='sqlite:///:memory:', **config)
+    return app
+
+def test_async_mode_configuration():
+    print("\nAsync Mode - Configuration")
+    print("=" * 60)
+
+    app = make_app(SOCKETIO_ASYNC_MODE='threading')
+    assert async_mode.configure(app) == 'threading'
+    assert 'SQLALCHEMY_ENGINE_OPTIONS' not in app.config
+
+    # Green modes cap how long SQLite may block the event loop
+    app = make_app(SOCKETIO_ASYNC_MODE='eventlet', SQLITE_BUSY_TIMEOUT=0.5)
+    assert async_mode.configure(app) == 'eventlet'
+    print(f"Engine options: {app.config['SQLALCHEMY_ENGINE_OPTIONS']}")
+    assert app.config['SQLALCHEMY_ENGINE_OPTIONS']['connect_args']['timeout'] == 0.5
+
+    try:
+        async_mode.configure(make_app(SOCKETIO_ASYNC_MODE='asyncio'))
+    except ValueError as e:
+        print(f"Rejected: {e}")
+    else:
+        assert False, "unknown mode was accepted"
+    async_mode.configure(make_app(SOCKETIO_ASYNC_MODE='threading'))
+
+def test_offload_runs_call():
+    print("\nAsync Mode - Offload")
+    print("=" * 60)
+
+    async_mode.configure(make_app(SOCKETIO_ASYNC_MODE='threading'))
+    assert async_mode.offload(lambda a, b=0: a + b, 2, b=3) == 5
+
+if __name__ == "__main__":
+    test_async_mode_configuration()
+    test_offload_runs_call()
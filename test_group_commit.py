@@ -0,0 +1,133 @@
+import os
+import tempfile
+import threading
+
+from sqlalchemy import Column, Integer, MetaData, String, Table, create_engine, select
+
+from app.write_behind import GroupCommitWriter
+
+metadata = MetaData()
+messages = Table(
+    'message', metadata,
+    Column('id', Integer, primary_key=True),
+    Column('content', String, nullable=False),
+    Column('likes', Integer, default=0),
+)
+
+def make_writer(directory, **options):
+    engine = create_engine(f"sqlite:///{os.path.join(directory, 'messages.db')}")
+    metadata.create_all(engine)
+    writer = GroupCommitWriter(table=messages, **options)
+    writer.bind(engine)
+    return writer, engine
+
+def test_group_commit_batches_concurrent_inserts():
+    print("\nGroup Commit - Concurrent Senders Share Transactions")
+    print("=" * 60)
+
+    with tempfile.TemporaryDirectory() as directory:
+        writer, engine = make_writer(directory, max_delay_ms=20)
+        ids = {}
+
+        def send(n):
+            ids[n] = writer.insert({'content': f'message {n}'})
+
+        threads = [threading.Thread(target=send, args=(n,)) for n in range(40)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        stats = writer.stats()
+        print(f"Stats: {stats}")
+        assert stats['rows'] == 40 and stats['failed'] == 0
+        assert stats['batches'] < 40
+
+        # Every sender got the id of its own row
+        with engine.connect() as conn:
+            rows = dict(conn.execute(select(messages.c.id, messages.c.content)).all())
+        assert all(rows[ids[n]] == f'message {n}' for n in range(40))
+
+def test_group_commit_isolates_bad_rows():
+    print("\nGroup Commit - A Bad Row Only Fails Its Sender")
+    print("=" * 60)
+
+    with tempfile.TemporaryDirectory() as directory:
+        writer, engine = make_writer(directory, max_delay_ms=50, ack='durable')
+        good = writer.submit({'content': 'fine'})
+        bad = writer.submit({'content': None})
+        assert good.result(timeout=5) > 0
+        try:
+            bad.result(timeout=5)
+        except Exception as e:
+            print(f"Bad row: {type(e).__name__}")
+        else:
+            assert False, "NULL content was accepted"
+        assert writer.stats()['failed'] == 1
+
+def test_group_commit_fills_defaults():
+    print("\nGroup Commit - Column Defaults")
+    print("=" * 60)
+
+    writer = GroupCommitWriter(table=messages)
+    row = writer.with_defaults({'content': 'hello'})
+    print(f"Row: {row}")
+    assert row == {'content': 'hello', 'likes': 0}
+
+def test_failed_question_insert_keeps_points():
+    print("\nGroup Commit - Question Points Commit With the Message")
+    print("=" * 60)
+
+    from sqlalchemy.exc import IntegrityError
+    from app import db
+    from app.events import save_message
+    from app.models import Message, User
+    from app.write_behind import group_commit
+    from testing_helpers import make_app
+
+    def failing_insert(values):
+        raise TimeoutError('group commit timed out')
+
+    with tempfile.TemporaryDirectory() as directory:
+        app, (asker,), room_id = make_app(directory, users=['asker'])
+        enabled, insert, table = group_commit.enabled, group_commit.insert, group_commit.table
+        group_commit.enabled, group_commit.insert, group_commit.table = True, failing_insert, Message.__table__
+        try:
+            with app.app_context():
+                user = db.session.get(User, asker)
+
+                # Plain messages go through the writer
+                try:
+                    save_message(content='hello', user_id=user.id, room_id=room_id)
+                except TimeoutError:
+                    pass
+                else:
+                    assert False, "message did not go through the writer"
+
+                # A question whose insert fails keeps the asker's points
+                assert user.deduct_points(30)
+                try:
+                    save_message(content=None, user_id=user.id, room_id=room_id, is_question=True, points_offered=30)
+                except IntegrityError:
+                    db.session.rollback()
+                else:
+                    assert False, "NULL content was accepted"
+                db.session.remove()
+                print(f"Points after the failed question: {db.session.get(User, asker).points}")
+                assert db.session.get(User, asker).points == 100
+
+                user = db.session.get(User, asker)
+                assert user.deduct_points(30)
+                question = save_message(content='Which card has lounge access?', user_id=user.id, room_id=room_id,
+                                        is_question=True, points_offered=30).id
+                db.session.remove()
+                assert db.session.get(User, asker).points == 70
+                assert db.session.get(Message, question).points_offered == 30
+        finally:
+            group_commit.enabled, group_commit.insert, group_commit.table = enabled, insert, table
+
+if __name__ == "__main__":
+    test_group_commit_batches_concurrent_inserts()
+    test_group_commit_isolates_bad_rows()
+    test_group_commit_fills_defaults()
+    test_failed_question_insert_keeps_points()
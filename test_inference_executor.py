@@ -0,0 +1,61 @@
+import threading
+import time
+from app.inference import InferenceExecutor, InferenceUnavailable
+
+def slow_model(seconds):
+    time.sleep(seconds)
+    return 'model result'
+
+def test_inference_backpressure():
+    print("\nInference Executor - Backpressure")
+    print("=" * 60)
+    
+    executor = InferenceExecutor(slots=1, queue_size=1, timeout=5.0)
+    results = []
+    
+    # One call runs, one waits in the queue, the third is rejected
+    threads = [threading.Thread(target=lambda: results.append(executor.run(slow_model, 0.3)))
+               for _ in range(2)]
+    for t in threads:
+        t.start()
+    time.sleep(0.05)
+    
+    rejected = executor.run(slow_model, 0.3, fallback=lambda: 'fallback result')
+    for t in threads:
+        t.join()
+    
+    metrics = executor.metrics()
+    print(f"Results: {results}, rejected call got: {rejected}")
+    print(f"Metrics: {metrics}")
+    assert results == ['model result', 'model result']
+    assert rejected == 'fallback result'
+    assert metrics['rejected'] == 1
+    assert metrics['max_queue_depth'] == 1
+    assert metrics['wait_ms']['max'] >= 200  # the queued call waited for the slot
+    assert metrics['queue_depth'] == 0 and metrics['running'] == 0
+
+def test_inference_timeout():
+    print("\nInference Executor - Timeouts")
+    print("=" * 60)
+    
+    executor = InferenceExecutor(slots=1, queue_size=4, timeout=0.1)
+    
+    result = executor.run(slow_model, 0.3, fallback=lambda: 'fallback result')
+    print(f"Slow call with fallback: {result}")
+    assert result == 'fallback result'
+    
+    try:
+        executor.run(slow_model, 0.3)
+        raised = False
+    except InferenceUnavailable:
+        raised = True
+    print(f"Slow call without fallback raised: {raised}")
+    assert raised
+    assert executor.metrics()['timeouts'] == 2
+    
+    # Per-call timeout overrides the default
+    assert executor.run(slow_model, 0.2, timeout=None) == 'model result'
+
+if __name__ == "__main__":
+    test_inference_backpressure()
+    test_inference_timeout()
@@ -0,0 +1,46 @@
+from app.language import detect_language, uses_english_models
+from app.text_analysis import text_analyzer
+
+# Sample messages with their expected language codes
+test_messages = [
+    ("Is this credit card good for online shopping?", 'en'),
+    ("Thanks a lot yaar, that helped", 'en'),
+    ("bhai ye card kaisa hai", 'hi-Latn'),
+    ("mujhe personal loan chahiye, kitna interest lagega?", 'hi-Latn'),
+    ("क्या यह कार्ड अच्छा है?", 'hi'),
+    ("আমি একটি ঋণ চাই", 'bn'),
+    ("இந்த கார்டு நல்லதா?", 'ta'),
+    ("ఈ కార్డు మంచిదా?", 'te'),
+    ("ਕੀ ਇਹ ਕਾਰਡ ਵਧੀਆ ਹੈ?", 'pa'),
+    ("👍👍", 'und'),
+]
+
+def test_detect_language():
+    print("\nLanguage Detection")
+    print("=" * 60)
+    
+    for text, expected in test_messages:
+        detected = detect_language(text)
+        print(f"{text!r}: {detected}")
+        assert detected == expected, f"{text!r}: expected {expected}, got {detected}"
+
+def test_non_english_skips_models():
+    print("\nLanguage Routing - English Models Skipped")
+    print("=" * 60)
+    
+    assert uses_english_models('en') and not uses_english_models('hi-Latn')
+    
+    # No rule matches: an English message would go to the models, these stay
+    # neutral/'other' without touching them
+    for text in ["bhai ye card kaisa hai", "क्या यह कार्ड अच्छा है?"]:
+        analysis = text_analyzer.analyze_message(text)
+        print(f"{text!r}: {analysis}")
+        assert analysis['language'] != 'en'
+        assert analysis['emotions']['primary_emotion'] == 'neutral'
+        assert analysis['intent']['intent'] == 'other'
+        assert analysis['intent']['confidence'] == 0.0
+        assert 'fallback' not in analysis['intent']
+
+if __name__ == "__main__":
+    test_detect_language()
+    test_non_english_skips_models()
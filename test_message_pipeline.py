@@ -0,0 +1,150 @@
+import threading
+import time
+
+from app.pipeline import MessagePipeline, MessageContext, message_pipeline
+
+# Sample chat messages
+clean = "Which mutual fund has the lowest expense ratio for a SIP of 5000?"
+hinglish = "bhai kya yeh card lena chahiye, fee kitna hai"
+
+def build_pipeline(calls, gate=None, **kwargs):
+    pipeline = MessagePipeline(**kwargs)
+
+    @pipeline.stage('check')
+    def check(ctx):
+        calls.append('check')
+        if 'blocked' in ctx.tokens:
+            ctx.reject('no')
+
+    @pipeline.stage('persist')
+    def persist(ctx):
+        calls.append('persist')
+        return len(ctx.tokens)
+
+    @pipeline.stage('slow', deferred=True)
+    def slow(ctx):
+        if gate is not None:
+            gate.wait(5)
+        calls.append('slow')
+
+    return pipeline
+
+def wait_for_deferred(pipeline, timeout=5):
+    deadline = time.time() + timeout
+    while pipeline.metrics()['deferred_pending'] and time.time() < deadline:
+        time.sleep(0.01)
+
+def test_pipeline_stages_and_rejection():
+    print("\nMessage Pipeline - Stage Order and Rejection")
+    print("=" * 60)
+
+    calls = []
+    pipeline = build_pipeline(calls)
+    ctx = pipeline.run(MessageContext("this message is blocked here"))
+    assert ctx.rejected == 'no'
+    assert calls == ['check']  # later stages never ran
+
+    ctx = pipeline.run(MessageContext(clean))
+    wait_for_deferred(pipeline)
+    print(f"Timings: {ctx.timings}")
+    assert ctx.rejected is None
+    assert ctx.results['persist'] == len(ctx.tokens)
+    assert set(ctx.timings) == {'check', 'persist', 'slow'}
+    assert calls[1:] == ['check', 'persist', 'slow']
+
+    metrics = pipeline.metrics()
+    print(f"Metrics: {metrics}")
+    assert metrics['rejected'] == 1
+    assert metrics['stages']['check']['calls'] == 2
+    assert metrics['stages']['slow']['deferred']
+
+def test_context_tokenizes_once():
+    print("\nMessage Pipeline - Shared Tokenization")
+    print("=" * 60)
+
+    ctx = MessageContext(hinglish)
+    assert ctx.tokens is ctx.tokens
+    assert ctx.chars is ctx.chars
+    print(f"Language: {ctx.language}, tokens: {ctx.tokens}")
+    assert ctx.language == 'hi-Latn'
+    assert ctx.text_lower == hinglish.lower()
+
+def test_deferred_backlog_is_bounded():
+    print("\nMessage Pipeline - Deferred Backlog Bound")
+    print("=" * 60)
+
+    calls = []
+    gate = threading.Event()
+    pipeline = build_pipeline(calls, gate=gate, deferred_workers=1, max_deferred=2)
+    for _ in range(5):
+        pipeline.run(MessageContext(clean))
+    metrics = pipeline.metrics()
+    print(f"Pending: {metrics['deferred_pending']}, dropped: {metrics['deferred_dropped']}")
+    assert metrics['deferred_pending'] == 2
+    assert metrics['deferred_dropped'] == 3
+
+    gate.set()
+    wait_for_deferred(pipeline)
+    assert calls.count('slow') == 2
+
+def test_default_pipeline_moderation():
+    print("\nMessage Pipeline - Default Stages")
+    print("=" * 60)
+
+    names = [name for name, _, _ in message_pipeline.stages]
+    print(f"Stages: {names}")
+    assert names == ['normalize', 'moderate', 'sales', 'persist', 'emotion']
+
+    # No persist callback and no message id: nothing is saved
+    ctx = MessageContext("you are such an a$$hole")
+    for name, fn, deferred in message_pipeline.stages:
+        if not deferred:
+            ctx.results[name] = fn(ctx)
+            if ctx.rejected:
+                break
+    assert ctx.rejected is not None
+    assert 'persist' not in ctx.results
+
+def test_deferred_analysis_reuses_context():
+    print("\nMessage Pipeline - Deferred Analysis Reuses the Context")
+    print("=" * 60)
+
+    import app.near_duplicate as near_duplicate
+    import app.text_analysis as text_analysis
+    from app.analysis_cache import AnalysisCache
+    from app.pipeline import emotion_stage
+
+    analyzer = text_analysis.text_analyzer
+    seen = {}
+
+    def recompute(*args, **kwargs):
+        raise AssertionError("recomputed a form the context already has")
+
+    def spy(name, method):
+        def wrapper(text, use_model=True, text_lower=None):
+            seen[name] = text_lower
+            return method(text, use_model=use_model, text_lower=text_lower)
+        return wrapper
+
+    ctx = MessageContext(hinglish)
+    ctx.tokens, ctx.language  # computed by the inline stages
+    saved = (text_analysis.analysis_cache, text_analysis.detect_language, near_duplicate.fingerprint_tokens)
+    text_analysis.analysis_cache = AnalysisCache()  # memory only, starts empty
+    text_analysis.detect_language = near_duplicate.fingerprint_tokens = recompute
+    analyzer.analyze_emotions = spy('emotions', analyzer.analyze_emotions)
+    analyzer.detect_intent = spy('intent', analyzer.detect_intent)
+    try:
+        analysis = emotion_stage(ctx)
+    finally:
+        text_analysis.analysis_cache, text_analysis.detect_language, near_duplicate.fingerprint_tokens = saved
+        del analyzer.analyze_emotions, analyzer.detect_intent
+    print(f"Analysis: {analysis}")
+    assert analysis['language'] == 'hi-Latn'
+    assert seen['emotions'] is ctx.text_lower and seen['intent'] is ctx.text_lower
+
+if __name__ == "__main__":
+    test_pipeline_stages_and_rejection()
+    test_context_tokenizes_once()
+    test_deferred_backlog_is_bounded()
+    test_default_pipeline_moderation()
+    test_deferred_analysis_reuses_context()
@@ -0,0 +1,81 @@
+import os
+import time
+from app.model_registry import ModelRegistry
+
+MB = 1024 * 1024
+
+def make_registry(budget_mb=0, idle_ttl=0):
+    registry = ModelRegistry(memory_budget_mb=budget_mb, idle_ttl=idle_ttl)
+    # Fake models: plain byte buffers sized in MB
+    for name, size in [('small', 10), ('medium', 40), ('large', 70)]:
+        registry.register(name, lambda size=size: bytearray(size * MB), sizer=len)
+    return registry
+
+def test_model_registry_budget():
+    print("\nModel Registry - Memory Budget")
+    print("=" * 60)
+    
+    registry = make_registry(budget_mb=100)
+    registry.get('small')
+    registry.get('medium')
+    assert registry.is_loaded('small') and registry.is_loaded('medium')
+    
+    # Loading the large model pushes the total over 100 MB; the least
+    # recently used models are unloaded until it fits
+    registry.get('large')
+    print(f"Loaded after 'large': {[n for n in ('small', 'medium', 'large') if registry.is_loaded(n)]}")
+    print(f"Total memory: {registry.total_memory() / MB:.1f} MB")
+    assert registry.is_loaded('large')
+    assert registry.total_memory() <= 100 * MB
+    assert any(e['event'] == 'unload' and e['reason'] == 'budget' for e in registry.events)
+    
+    # Evicted models are reloaded on demand
+    registry.get('small')
+    assert registry.is_loaded('small')
+    assert registry.load_counts['small'] == 2
+
+def test_model_registry_idle_eviction():
+    print("\nModel Registry - Idle Eviction")
+    print("=" * 60)
+    
+    registry = make_registry(idle_ttl=0.2)
+    registry.get('small')
+    registry.get('medium')
+    time.sleep(0.3)
+    registry.get('medium')  # touch - stays loaded
+    
+    evicted = registry.evict_idle()
+    print(f"Evicted: {evicted}")
+    assert evicted == ['small']
+    assert registry.is_loaded('medium')
+    
+    stats = registry.stats()
+    print(f"Stats: {stats['models']}")
+    assert stats['models']['small']['loaded'] is False
+    assert stats['models']['medium']['memory_mb'] >= 40
+
+def test_model_registry_pinned_and_sweeper():
+    print("\nModel Registry - Pinned Models and Sweeper")
+    print("=" * 60)
+    
+    # Preloaded (pinned) models are never evicted, by budget or idleness
+    registry = make_registry(budget_mb=100, idle_ttl=0.2)
+    registry.get('small')
+    registry.get('medium')
+    registry.pin()
+    registry.get('large')
+    time.sleep(0.3)
+    evicted = registry.evict_idle()
+    print(f"Evicted: {evicted}")
+    assert registry.is_loaded('small') and registry.is_loaded('medium')
+    assert evicted == ['large']
+    assert registry.stats()['models']['small']['pinned'] is True
+    
+    # The sweeper is started by get() in the current process, not init_app
+    assert registry._sweeper_pid == os.getpid()
+    assert make_registry(idle_ttl=0.2)._sweeper_pid is None
+
+if __name__ == "__main__":
+    test_model_registry_budget()
+    test_model_registry_idle_eviction()
+    test_model_registry_pinned_and_sweeper()
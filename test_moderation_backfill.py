@@ -0,0 +1,78 @@
+import json
+import os
+import tempfile
+
+from sqlalchemy import create_engine, text
+
+from app.moderation_backfill import run_backfill
+
+# Sample stored messages; the word list below grows after they were saved
+messages = [
+    "Which credit card has the best cashback on fuel?",
+    "this insurance agent is a total scammerx",
+    "SIP in an index fund is the simplest start",
+    "dont trust that scammerx, he sold me a bad policy",
+    "the s.c.a.m.m.e.r.x called me again today",
+]
+
+def make_database(directory):
+    engine = create_engine(f"sqlite:///{os.path.join(directory, 'messages.db')}")
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE message (id INTEGER PRIMARY KEY, content TEXT, "
+                          "is_flagged BOOLEAN NOT NULL DEFAULT 0)"))
+        for i, content in enumerate(messages * 50, start=1):
+            conn.execute(text("INSERT INTO message (id, content, is_flagged) VALUES (:id, :content, :flag)"),
+                         {'id': i, 'content': content, 'flag': i == 1})
+    return engine
+
+def flagged_ids(engine):
+    with engine.connect() as conn:
+        return {row[0] for row in conn.execute(text("SELECT id FROM message WHERE is_flagged"))}
+
+def test_moderation_backfill_flags_matching_rows():
+    print("\nModeration Backfill - Keyset Chunks and Bulk Flags")
+    print("=" * 60)
+
+    with tempfile.TemporaryDirectory() as directory:
+        words_path = os.path.join(directory, 'words.json')
+        with open(words_path, 'w') as f:
+            json.dump(['scammerx'], f)
+        engine = make_database(directory)
+
+        report = run_backfill(engine, words_path=words_path, chunk_size=37, workers=0, dry_run=True)
+        assert flagged_ids(engine) == {1}  # dry run writes nothing
+        assert report['matched'] == 150
+
+        report = run_backfill(engine, words_path=words_path, chunk_size=37, workers=0)
+        print(f"Report: {report}")
+        assert report['scanned'] == 250
+        assert report['last_id'] == 250
+        assert report['newly_flagged'] == 150
+        assert report['unflagged'] == 1  # message 1 no longer matches
+        assert report['top_words'] == [('scammerx', 150)]
+        assert flagged_ids(engine) == {i for i in range(1, 251) if (i - 1) % 5 in (1, 3, 4)}
+
+        # Resuming after the last id scans nothing
+        assert run_backfill(engine, words_path=words_path, workers=0, start_id=250)['scanned'] == 0
+        engine.dispose()
+
+def test_moderation_backfill_process_pool():
+    print("\nModeration Backfill - Process Pool")
+    print("=" * 60)
+
+    with tempfile.TemporaryDirectory() as directory:
+        words_path = os.path.join(directory, 'words.json')
+        with open(words_path, 'w') as f:
+            json.dump(['scammerx'], f)
+        engine = make_database(directory)
+
+        report = run_backfill(engine, words_path=words_path, chunk_size=20, workers=2, nice=0)
+        print(f"Report: {report}")
+        assert report['scanned'] == 250
+        assert report['newly_flagged'] == 150
+        assert len(flagged_ids(engine)) == 150
+        engine.dispose()
+
+if __name__ == "__main__":
+    test_moderation_backfill_flags_matching_rows()
+    test_moderation_backfill_process_pool()
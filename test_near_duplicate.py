@@ -0,0 +1,52 @@
+from app.near_duplicate import NearDuplicateIndex, simhash, fingerprint_tokens
+
+# Sample promotional spam and its lightly edited copies
+spam = "Get a lifetime free credit card with zero joining fee, apply now at bit.ly/offer123"
+spam_copies = [
+    "Get a lifetime free credit card with zero joining fee, apply now at bit.ly/offer124",
+    "get a LIFETIME free credit card with zero joining fee!! apply now at bit.ly/offer123",
+]
+unrelated = [
+    "Which demat account has the lowest brokerage for intraday trading?",
+    "My home loan EMI went up after the rate hike last month",
+    "ok thanks"
+]
+
+def test_near_duplicate_detection():
+    print("\nNear Duplicates - SimHash Detection")
+    print("=" * 60)
+    
+    index = NearDuplicateIndex()
+    assert index.observe(spam, message_id=1) is None
+    for i, copy in enumerate(spam_copies):
+        distance = bin(simhash(fingerprint_tokens(spam)) ^ simhash(fingerprint_tokens(copy))).count('1')
+        duplicate = index.observe(copy, message_id=10 + i)
+        print(f"Copy {i + 1}: distance {distance} bits -> {duplicate and duplicate['message_id']}")
+        assert duplicate is not None
+        assert duplicate['message_id'] == 1 and duplicate['count'] == i + 2
+    
+    for text in unrelated:
+        assert index.observe(text) is None
+    print(f"Stats: {index.stats()}")
+    assert index.stats()['duplicates'] == 2
+
+def test_near_duplicate_analysis_reuse_and_bound():
+    print("\nNear Duplicates - Analysis Reuse and Size Bound")
+    print("=" * 60)
+    
+    index = NearDuplicateIndex(max_entries=3)
+    analysis = {'emotions': {'primary_emotion': 'joy'}, 'intent': {'intent': 'request'}}
+    index.store_analysis(spam, analysis)
+    assert index.analysis_for(spam_copies[0]) == analysis
+    assert index.analysis_for(unrelated[0]) is None
+    
+    # The oldest fingerprints are dropped first
+    for i in range(5):
+        index.observe(f"message number {i} about a completely different subject each time")
+    print(f"Stats: {index.stats()}")
+    assert index.stats()['entries'] == 3
+    assert index.analysis_for(spam_copies[0]) is None
+
+if __name__ == "__main__":
+    test_near_duplicate_detection()
+    test_near_duplicate_analysis_reuse_and_bound()
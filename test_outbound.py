@@ -0,0 +1,104 @@
+import queue
+import threading
+
+from engineio import packet as eio_packet
+from socketio import packet
+
+from app.outbound import OutboundGuard
+
+class FakeSocket:
+    def __init__(self):
+        self.queue = queue.Queue()
+        self.closed = False
+
+    def close(self, wait=True, abort=False):
+        self.closed = True
+
+class FakeServer:
+    """The parts of socketio.Server the guard uses"""
+    def __init__(self, sids):
+        self.eio = type('FakeEngineIO', (), {})()
+        self.eio.sockets = {sid: FakeSocket() for sid in sids}
+
+    def _send_packet(self, eio_sid, pkt):
+        socket = self.eio.sockets.get(eio_sid)
+        if socket is not None:  # like Engine.IO, ignore closed connections
+            socket.queue.put(pkt)
+
+    # Broadcasts arrive encoded, as Engine.IO packets
+    _send_eio_packet = _send_packet
+
+    def start_background_task(self, target, *args):
+        thread = threading.Thread(target=target, args=args)
+        thread.start()
+        thread.join()
+
+def event(name):
+    return packet.Packet(packet.EVENT, data=[name, {}])
+
+def broadcast(name):
+    return eio_packet.Packet(eio_packet.MESSAGE, packet.Packet(packet.EVENT, data=[name, {}]).encode())
+
+def event_of(pkt):
+    if isinstance(pkt, packet.Packet):
+        return pkt.data[0]
+    return packet.Packet(encoded_packet=pkt.data).data[0]
+
+def make_guard(**options):
+    server = FakeServer(['fast', 'slow'])
+    guard = OutboundGuard(**options)
+    guard.init_socketio(type('FakeSocketIO', (), {'server': server})())
+    return guard, server
+
+def test_low_priority_events_dropped_when_congested():
+    print("\nOutbound Guard - Watermarks")
+    print("=" * 60)
+
+    guard, server = make_guard(high=10, low=3, max_depth=100)
+    slow = server.eio.sockets['slow'].queue
+    # The slow client never drains its queue; the fast one always does
+    for n in range(30):
+        for name in ('message', 'vote_updated'):
+            server._send_eio_packet('slow', broadcast(name))
+            server._send_eio_packet('fast', broadcast(name))
+            server.eio.sockets['fast'].queue.queue.clear()
+
+    stats = guard.stats()
+    print(f"Slow queue: {slow.qsize()}, stats: {stats}")
+    # Every message arrives, votes stop at the high watermark
+    queued = [event_of(p) for p in slow.queue]
+    assert queued.count('message') == 30
+    assert queued.count('vote_updated') == 5
+    assert stats['dropped'] == {'vote_updated': 25}
+    assert stats['congested'] == 1
+    assert stats['queue_depths']['>1000'] == 0 and stats['queue_depths']['<=50'] == 1
+
+    # Drained below the low watermark: low-priority events flow again
+    slow.queue.clear()
+    server._send_packet('slow', event('vote_updated'))
+    assert slow.qsize() == 1 and guard.stats()['congested'] == 0
+
+def test_stuck_client_is_evicted():
+    print("\nOutbound Guard - Eviction")
+    print("=" * 60)
+
+    guard, server = make_guard(high=5, low=1, max_depth=20)
+    slow = server.eio.sockets['slow']
+    for n in range(50):
+        server._send_packet('slow', event('message'))
+
+    stats = guard.stats()
+    print(f"Stats: {stats}")
+    assert slow.closed and slow.queue.qsize() == 0
+    assert 'slow' not in server.eio.sockets
+    assert stats['evicted'] == 1 and stats['connections'] == 1
+
+    # Stuck for too long counts as well, even below the hard limit
+    guard, server = make_guard(high=5, low=1, max_depth=1000, stuck_seconds=0)
+    for n in range(10):
+        server._send_packet('slow', event('message'))
+    assert guard.stats()['evicted'] == 1
+
+if __name__ == "__main__":
+    test_low_priority_events_dropped_when_congested()
+    test_stuck_client_is_evicted()
@@ -0,0 +1,114 @@
+import tempfile
+import threading
+
+from app import db
+from app.models import Message, PointsLedger, User
+from app.points_ledger import reconcile, snapshot_balances
+from testing_helpers import make_app
+
+def run_threads(target, args_list):
+    threads = [threading.Thread(target=target, args=args) for args in args_list]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+def test_concurrent_spends_cannot_overdraw():
+    print("\nPoints Ledger - Concurrent Spends")
+    print("=" * 60)
+
+    with tempfile.TemporaryDirectory() as directory:
+        app, users, _ = make_app(directory)
+        results = []
+
+        def spend(user_id):
+            with app.app_context():
+                user = db.session.get(User, user_id)
+                results.append(user.deduct_points(30))
+                db.session.commit()
+                db.session.remove()
+
+        # Ten questions of 30 points against a balance of 100
+        run_threads(spend, [(users[0],)] * 10)
+
+        with app.app_context():
+            user = db.session.get(User, users[0])
+            rows = PointsLedger.query.filter_by(user_id=users[0]).order_by(PointsLedger.id).all()
+            print(f"Successful spends: {results.count(True)}, balance: {user.points}")
+            assert results.count(True) == 3 and user.points == 10
+            assert [(r.reason, r.delta) for r in rows] == [('opening', 100)] + [('question', -30)] * 3
+            assert sum(r.delta for r in rows) == user.points == rows[-1].balance
+            assert not user.deduct_points(-5) and user.points == 10
+            assert reconcile(db.engine)['mismatched'] == 0
+
+def test_answer_is_paid_once():
+    print("\nPoints Ledger - Accepting an Answer")
+    print("=" * 60)
+
+    with tempfile.TemporaryDirectory() as directory:
+        app, users, _ = make_app(directory)
+        with app.app_context():
+            asker = db.session.get(User, users[0])
+            assert asker.deduct_points(50)
+            question = Message(content='Which loan has the lowest rate?', user_id=users[0], room_id=1,
+                               is_question=True, points_offered=50)
+            db.session.add(question)
+            db.session.commit()
+            answers = [Message(content=f'Answer {n}', user_id=users[n], room_id=1, parent_id=question.id,
+                               is_answer=True) for n in (1, 2)]
+            db.session.add_all(answers)
+            db.session.commit()
+            question_id, answer_ids = question.id, [a.id for a in answers]
+
+        accepted = []
+
+        def accept(answer_id):
+            with app.app_context():
+                accepted.append(db.session.get(Message, question_id).accept_answer(answer_id, db.session))
+                db.session.remove()
+
+        # The asker double-clicks two different answers
+        run_threads(accept, [(answer_id,) for answer_id in answer_ids])
+
+        with app.app_context():
+            paid = PointsLedger.query.filter_by(reason='answer_accepted').all()
+            balances = [db.session.get(User, user_id).points for user_id in users]
+            print(f"Accepted: {accepted}, balances: {balances}")
+            assert accepted.count(True) == 1 and len(paid) == 1
+            assert paid[0].message_id == db.session.get(Message, question_id).accepted_answer_id
+            assert sorted(balances) == [50, 100, 150]
+            assert reconcile(db.engine)['mismatched'] == 0
+
+def test_reconcile_finds_drift():
+    print("\nPoints Ledger - Reconciliation")
+    print("=" * 60)
+
+    with tempfile.TemporaryDirectory() as directory:
+        app, users, _ = make_app(directory)
+        with app.app_context():
+            # An edit through the ORM (the admin view) is ledgered as an adjustment
+            user = db.session.get(User, users[1])
+            user.points = 250
+            db.session.commit()
+            assert PointsLedger.query.filter_by(reason='adjustment').one().delta == 150
+
+            assert snapshot_balances(db.engine, lag_seconds=0) == len(users)
+            assert db.session.get(User, users[2]).add_points(5, reason='bonus')
+            db.session.commit()
+
+            # A write that bypasses the ledger
+            db.session.execute(db.text('UPDATE user SET points = points + 7 WHERE id = :id'), {'id': users[0]})
+            db.session.commit()
+            report = reconcile(db.engine)
+            print(f"Report: {report}")
+            assert report['mismatched'] == 1
+            assert report['mismatches'] == [(users[0], 107, 100)]
+
+            # Snapshots come from the ledger, so the drift is still reported after one
+            snapshot_balances(db.engine, lag_seconds=0)
+            assert reconcile(db.engine)['mismatches'] == [(users[0], 107, 100)]
+
+if __name__ == "__main__":
+    test_concurrent_spends_cannot_overdraw()
+    test_answer_is_paid_once()
+    test_reconcile_finds_drift()
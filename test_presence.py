@@ -0,0 +1,75 @@
+import tempfile
+
+from app import db
+from app.models import RoomMembership
+from app.presence import PresenceService
+from testing_helpers import make_app
+
+def make_presence_app(directory):
+    app, users, room_id = make_app(directory, users=['asha', 'ravi'])
+    with app.app_context():
+        # asha visited the room page before, ravi never did
+        db.session.add(RoomMembership(user_id=users[0], room_id=room_id, is_active=False))
+        db.session.commit()
+    return app, users, room_id
+
+def test_presence_deltas():
+    print("\nPresence - Join and Leave Deltas")
+    print("=" * 60)
+
+    presence = PresenceService()
+    # Two tabs of user 1, one of user 2
+    assert presence.join(5, 1, 'asha', 'sid-a') is True
+    assert presence.join(5, 1, 'asha', 'sid-b') is False
+    assert presence.join(5, 2, 'ravi', 'sid-c') is True
+    assert presence.join(6, 2, 'ravi', 'sid-c') is True
+    print(f"Room 5: {presence.members(5)}")
+    assert presence.members(5) == [{'user_id': 1, 'username': 'asha'}, {'user_id': 2, 'username': 'ravi'}]
+
+    # Closing one tab is not a departure; the last one is
+    assert presence.leave(5, 1, 'sid-a') is False
+    assert presence.leave(5, 1, 'sid-b') is True
+    assert presence.leave(5, 1, 'sid-b') is False
+    assert not presence.is_present(5, 1)
+
+    # A dropped connection leaves every room it was in
+    vanished = presence.disconnect('sid-c')
+    print(f"Disconnect: {vanished}")
+    assert sorted(vanished) == [(5, 2, 'ravi'), (6, 2, 'ravi')]
+    assert presence.stats()['present'] == 0
+    assert presence.stats()['connections'] == 0
+
+def test_presence_batched_flush():
+    print("\nPresence - Batched Membership Writes")
+    print("=" * 60)
+
+    with tempfile.TemporaryDirectory() as directory:
+        app, (asha, ravi), room_id = make_presence_app(directory)
+        presence = PresenceService()
+        presence._app = app
+
+        presence.join(room_id, asha, 'asha', 'sid-a')
+        presence.join(room_id, ravi, 'ravi', 'sid-r')
+        presence.leave(room_id, ravi, 'sid-r')
+        # Nothing is written until the flush
+        with app.app_context():
+            assert RoomMembership.query.filter_by(is_active=True).count() == 0
+
+        written = presence.flush()
+        print(f"Rows written: {written}, stats: {presence.stats()}")
+        assert written == 2
+        assert presence.flush() == 0
+        with app.app_context():
+            rows = {m.user_id: m for m in RoomMembership.query.filter_by(room_id=room_id)}
+            assert rows[asha].is_active is True and rows[asha].last_active is not None
+            assert rows[ravi].is_active is False
+            assert RoomMembership.query.count() == 2
+
+            # Shared mode adds members that other workers flushed
+            other_worker = PresenceService()
+            other_worker.shared = True
+            assert other_worker.active_members(room_id) == [{'user_id': asha, 'username': 'asha'}]
+
+if __name__ == "__main__":
+    test_presence_deltas()
+    test_presence_batched_flush()
@@ -0,0 +1,138 @@
+import json
+import os
+import tempfile
+from app.profanity import ProfanityMatcher, profanity_matcher
+
+# Sample word list with single words and multi-word phrases
+sample_words = ["badword", "Worse", "f off", "piece of s"]
+
+def write_words(path, words, mtime):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(words, f)
+    os.utime(path, (mtime, mtime))
+
+def test_profanity_matching():
+    print("\nProfanity Matcher - Words and Phrases")
+    print("=" * 60)
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'words.json')
+        write_words(path, sample_words, 1000)
+        matcher = ProfanityMatcher(path)
+        
+        cases = [
+            ("you are a BADWORD!", ["badword"]),
+            ("this is (worse)", ["worse"]),
+            ("just f off, seriously", ["f off"]),
+            ("what a piece of s.", ["piece of s"]),
+            ("off you go, f", []),
+            ("badwords are fine", []),
+        ]
+        for text, expected in cases:
+            found = matcher.find(text)
+            print(f"{text!r}: {found}")
+            assert found == expected
+        assert matcher.loads == 1  # loaded once, not per message
+
+def test_profanity_hot_reload():
+    print("\nProfanity Matcher - Reload on File Change")
+    print("=" * 60)
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'words.json')
+        write_words(path, sample_words, 1000)
+        matcher = ProfanityMatcher(path, check_interval=0)
+        assert not matcher.contains_profanity("newword here")
+        
+        write_words(path, sample_words + ["newword"], 2000)
+        assert matcher.contains_profanity("newword here")
+        
+        # A broken file keeps the last good list
+        with open(path, 'w') as f:
+            f.write('["unterminated')
+        os.utime(path, (3000, 3000))
+        assert matcher.contains_profanity("newword here")
+        print(f"Loads: {matcher.loads}")
+        assert matcher.loads == 2
+
+def test_shipped_word_list():
+    print("\nProfanity Matcher - Shipped Word List")
+    print("=" * 60)
+    
+    assert profanity_matcher.contains_profanity("eff off")
+    assert not profanity_matcher.contains_profanity("What is the best credit card for travel?")
+    print(f"{len(profanity_matcher.words)} words loaded")
+
+def test_profanity_obfuscation():
+    print("\nProfanity Matcher - Obfuscated Spellings")
+    print("=" * 60)
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'words.json')
+        write_words(path, sample_words, 1000)
+        matcher = ProfanityMatcher(path)
+        
+        obfuscated = [
+            "b@dword",          # leet
+            "BAAADWOOORD",      # repeated letters
+            "b.a.d.w.o.r.d",    # separators
+            "b a d w o r d",    # spacing
+            "bad\u200bword",    # zero-width space
+            "ｂａｄｗｏｒｄ",       # full width (NFKC)
+            "bаdword",          # Cyrillic a
+            "w0r$e!",
+            "f   off",
+        ]
+        for text in obfuscated:
+            spans = matcher.find_spans(text)
+            print(f"{text!r}: {spans}")
+            assert len(spans) == 1
+        
+        # Spans index the original text
+        text = "well, W.0.R.S.E than ever"
+        (start, end, entry), = matcher.find_spans(text)
+        assert text[start:end] == "W.0.R.S.E" and entry == "worse"
+        
+        clean = [
+            "bad word",          # spacing only counts between single letters
+            "a badwordsmith",    # must end at a word boundary
+            "worsen the deal",
+            "price is 8.5 lakh",
+        ]
+        for text in clean:
+            assert matcher.find_spans(text) == [], text
+
+def test_short_entries_need_a_plain_word():
+    print("\nProfanity Matcher - Short Entries and Initialisms")
+    print("=" * 60)
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'words.json')
+        write_words(path, sample_words + ["bc", "tf"], 1000)
+        matcher = ProfanityMatcher(path)
+        
+        assert matcher.find("shut up bc") == ["bc"]
+        assert matcher.find("tf is this") == ["tf"]
+        clean = [
+            "B.C. era coins",        # punctuated initialism
+            "b c d are options",     # spaced single letters
+            "rank them with tf-idf",  # joined to another word
+            "idf-tf weighting",
+        ]
+        for text in clean:
+            print(f"{text!r}: {matcher.find_spans(text)}")
+            assert matcher.find_spans(text) == [], text
+        # Longer words are still caught through separators
+        assert matcher.find("b.a.d.w.o.r.d") == ["badword"]
+    
+    # The shipped list has two-letter entries too
+    for text in ["Coins from the B.C. era", "Audited by A.F. Ferguson", "A painting by M.F. Husain",
+                 "Rank the documents with tf-idf"]:
+        assert not profanity_matcher.contains_profanity(text), text
+
+if __name__ == "__main__":
+    test_profanity_matching()
+    test_profanity_hot_reload()
+    test_shipped_word_list()
+    test_profanity_obfuscation()
+    test_short_entries_need_a_plain_word()
@@ -0,0 +1,82 @@
+import threading
+import time
+
+from app.rate_limit import RateLimiter, parse_limits
+
+def test_token_bucket_burst_and_refill():
+    print("\nRate Limiter - Burst and Refill")
+    print("=" * 60)
+
+    limiter = RateLimiter({'message': (20.0, 3)})
+    results = [limiter.allow('message', user_id=1) for _ in range(5)]
+    print(f"Burst of 5: {results}")
+    assert results == [True, True, True, False, False]
+
+    # Other users and unlimited events are unaffected
+    assert limiter.allow('message', user_id=2)
+    assert limiter.allow('join', user_id=1)
+
+    time.sleep(0.1)  # 2 tokens at 20/s
+    assert limiter.allow('message', user_id=1)
+
+    stats = limiter.stats()
+    print(f"Stats: {stats}")
+    assert stats['throttled'] == {'message': 2}
+    assert stats['allowed']['message'] == 5
+
+def test_throttle_notices():
+    print("\nRate Limiter - One Notice per Throttled Stretch")
+    print("=" * 60)
+
+    limiter = RateLimiter({'message': (20.0, 2)})
+    notices = []
+    for _ in range(10):
+        if not limiter.allow('message', user_id=1):
+            notices.append(limiter.notify('message', user_id=1))
+    print(f"Notices for 8 throttled events: {notices}")
+    assert notices == [True] + [False] * 7
+
+    # Allowed again, then throttled again: a new notice
+    time.sleep(0.06)
+    assert limiter.allow('message', user_id=1)
+    while limiter.allow('message', user_id=1):
+        pass
+    assert limiter.notify('message', user_id=1) is True
+    assert limiter.notify('message', user_id=1) is False
+
+def test_rate_limiter_thread_safety():
+    print("\nRate Limiter - Concurrent Senders")
+    print("=" * 60)
+
+    limiter = RateLimiter({'vote_message': (0.001, 50)})
+    allowed = []
+
+    def spam():
+        allowed.append(sum(limiter.allow('vote_message', user_id=1) for _ in range(100)))
+
+    threads = [threading.Thread(target=spam) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    print(f"Allowed {sum(allowed)} of 800")
+    assert sum(allowed) == 50
+
+def test_parse_limits_and_pruning():
+    print("\nRate Limiter - Config Parsing and Bounded Buckets")
+    print("=" * 60)
+
+    limits = parse_limits("message=2/4, vote_message=0.5/1,broken")
+    print(f"Parsed: {limits}")
+    assert limits == {'message': (2.0, 4), 'vote_message': (0.5, 1)}
+
+    limiter = RateLimiter({'message': (1000.0, 1)}, max_buckets=10)
+    for user_id in range(50):
+        limiter.allow('message', user_id)
+    assert limiter.stats()['buckets'] <= 10
+
+if __name__ == "__main__":
+    test_token_bucket_burst_and_refill()
+    test_throttle_notices()
+    test_rate_limiter_thread_safety()
+    test_parse_limits_and_pruning()
@@ -0,0 +1,78 @@
+import time
+
+from app.room_batch import RoomBatcher
+from testing_helpers import FakeSocketIO
+
+def make_batcher(**options):
+    socketio = FakeSocketIO()
+    batcher = RoomBatcher(**options)
+    batcher._socketio = socketio
+    batcher.enabled = True
+    return batcher, socketio
+
+def delivered(frames, room='7'):
+    """The events of room in the order a client would handle them"""
+    events = []
+    for event, data, frame_room, _ in frames:
+        if frame_room != room:
+            continue
+        if event == 'batch':
+            events.extend(tuple(e) for e in data['events'])
+        else:
+            events.append((event, data))
+    return events
+
+def test_busy_room_is_batched_in_order():
+    print("\nRoom Batch - Busy Room")
+    print("=" * 60)
+
+    batcher, socketio = make_batcher(window_ms=30, min_rate=5)
+    sent = [('message', {'id': n}) if n % 3 else ('vote_updated', {'message_id': n}) for n in range(40)]
+    for event, data in sent:
+        batcher.emit(event, data, 7)
+        if event == 'vote_updated':
+            batcher.emit('message', {'id': 'other room'}, 8)
+    time.sleep(0.2)
+
+    stats = batcher.stats()
+    print(f"Frames for room 7: {len([f for f in socketio.frames if f[2] == '7'])}, stats: {stats}")
+    assert delivered(socketio.frames) == sent
+    # The first events of a quiet room go out at once
+    assert socketio.frames[0][0] != 'batch'
+    assert stats['batches'] >= 1 and stats['frames'] < stats['events']
+    assert stats['open_batches'] == 0
+
+def test_quiet_room_is_not_delayed():
+    print("\nRoom Batch - Quiet Room and Disabled Batcher")
+    print("=" * 60)
+
+    batcher, socketio = make_batcher(min_rate=20)
+    for n in range(3):
+        batcher.emit('message', {'id': n}, 7)
+    assert [f[0] for f in socketio.frames] == ['message'] * 3
+
+    batcher, socketio = make_batcher(min_rate=1)
+    batcher.enabled = False
+    batcher.emit('message', {'id': 1}, 7)
+    assert socketio.frames == [('message', {'id': 1}, '7', None)]
+
+def test_skip_sid_and_full_batches_keep_order():
+    print("\nRoom Batch - Early Sends Keep Order")
+    print("=" * 60)
+
+    batcher, socketio = make_batcher(window_ms=1000, min_rate=1, max_events=3)
+    batcher.emit('message', {'id': 1}, 7)
+    batcher.emit('message', {'id': 2}, 7)
+    # An event that skips its sender cannot join the batch: the batch goes first
+    batcher.emit('user_joined', {'user_id': 9}, 7, skip_sid='sid-9')
+    for n in range(3, 6):
+        batcher.emit('message', {'id': n}, 7)
+    print(f"Frames: {[(f[0], len(f[1].get('events', [])) or 1) for f in socketio.frames]}")
+    assert [f[0] for f in socketio.frames] == ['batch', 'user_joined', 'batch']
+    assert socketio.frames[1][3] == 'sid-9'
+    assert [data.get('id', data.get('user_id')) for _, data in delivered(socketio.frames)] == [1, 2, 9, 3, 4, 5]
+
+if __name__ == "__main__":
+    test_busy_room_is_batched_in_order()
+    test_quiet_room_is_not_delayed()
+    test_skip_sid_and_full_batches_keep_order()
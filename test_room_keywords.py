@@ -0,0 +1,87 @@
+import numpy as np
+from app.room_keywords import RoomKeywordSummarizer
+
+# Sample room conversations
+room_messages = {
+    1: [(1, "Which credit card has the lowest annual fee?"),
+        (2, "The credit card offer includes cashback on fuel")],
+    2: [(3, "How do I open a demat account online?"),
+        (4, "Demat account charges are waived this month")]
+}
+
+class FakeEmbedder:
+    """Deterministic bag-of-letters embeddings that count encoded texts"""
+    def __init__(self):
+        self.encoded = []
+
+    def embed(self, texts, verbose=False):
+        self.encoded.extend(texts)
+        vectors = np.zeros((len(texts), 26))
+        for row, text in enumerate(texts):
+            for char in text.lower():
+                if 'a' <= char <= 'z':
+                    vectors[row, ord(char) - ord('a')] += 1
+        return vectors
+
+class FakeKeyBERT:
+    def __init__(self):
+        self.model = FakeEmbedder()
+        self.calls = 0
+
+    def extract_keywords(self, docs, vectorizer, top_n, doc_embeddings, word_embeddings):
+        self.calls += 1
+        assert len(doc_embeddings) == len(docs)
+        words = vectorizer.fit(docs).get_feature_names_out()
+        assert len(words) == len(word_embeddings)
+        results = []
+        for doc, doc_embedding in zip(docs, doc_embeddings):
+            candidates = [i for i, w in enumerate(words) if w in doc.lower()]
+            scores = [(words[i], float(word_embeddings[i] @ doc_embedding)) for i in candidates]
+            results.append(sorted(scores, key=lambda x: x[1], reverse=True)[:top_n])
+        return results[0] if len(docs) == 1 else results
+
+def test_room_keywords_batched():
+    print("\nRoom Keywords - Batched Extraction")
+    print("=" * 60)
+    
+    summarizer = RoomKeywordSummarizer(top_n=5)
+    model = FakeKeyBERT()
+    for room_id, messages in room_messages.items():
+        summarizer.load_room(room_id, messages)
+    
+    # Asking for one room summarizes every changed room in one call
+    keywords = summarizer.keywords(1, model)
+    print(f"Room 1 keywords: {keywords}")
+    assert model.calls == 1
+    assert any('credit' in phrase for phrase, _ in keywords)
+    assert summarizer.stats()['dirty_rooms'] == 0
+    assert any('demat' in phrase for phrase, _ in summarizer.keywords(2, model))
+    assert model.calls == 1
+
+def test_room_keywords_incremental():
+    print("\nRoom Keywords - Incremental Updates Reuse Embeddings")
+    print("=" * 60)
+    
+    summarizer = RoomKeywordSummarizer(top_n=5)
+    model = FakeKeyBERT()
+    summarizer.load_room(1, room_messages[1])
+    summarizer.keywords(1, model)
+    encoded_before = len(model.model.encoded)
+    
+    # Messages for rooms that were never loaded are ignored until seeded
+    summarizer.add_message(99, 10, "ignored")
+    summarizer.add_message(1, 5, "Annual fee waiver on the credit card")
+    keywords = summarizer.keywords(1, model)
+    newly_encoded = model.model.encoded[encoded_before:]
+    print(f"Encoded on refresh: {newly_encoded}")
+    print(f"Stats: {summarizer.stats()}")
+    # Only the new message and phrases not seen before are encoded
+    assert "Annual fee waiver on the credit card" in newly_encoded
+    assert room_messages[1][0][1] not in newly_encoded
+    assert 'credit card' not in newly_encoded
+    assert keywords and summarizer.stats()['refreshes'] == 2
+    assert not summarizer.is_loaded(99)
+
+if __name__ == "__main__":
+    test_room_keywords_batched()
+    test_room_keywords_incremental()
@@ -0,0 +1,104 @@
+from app.room_batch import RoomBatcher
+from app.room_log import RoomEventLog
+from testing_helpers import FakeSocketIO
+
+def make_log(size=10):
+    log = RoomEventLog(size=size)
+    log.enabled = True
+    return log
+
+def make_batcher(log, **options):
+    socketio = FakeSocketIO()
+    batcher = RoomBatcher(**options)
+    batcher._socketio = socketio
+    batcher._log = log
+    return batcher, socketio
+
+def test_events_are_numbered_per_room():
+    print("\nRoom Log - Sequence Numbers")
+    print("=" * 60)
+
+    log = make_log()
+    batcher, socketio = make_batcher(log)
+    for n in range(3):
+        batcher.emit('message', {'id': n}, 7)
+    batcher.emit('message', {'id': 'other room'}, 8)
+    batcher.emit('answer_rated', {'message_id': 1}, 'question_5')
+
+    for event, data, room, _ in socketio.frames:
+        print(f"{room}: {event} {data}")
+    assert [f[1].get('seq') for f in socketio.frames] == [1, 2, 3, 1, None]
+    assert all(f[1]['epoch'] == log.epoch for f in socketio.frames[:4])
+    assert log.head('7') == (log.epoch, 3)
+
+def test_since_answers_only_what_it_has():
+    print("\nRoom Log - Replay and Misses")
+    print("=" * 60)
+
+    log = make_log(size=5)
+    for n in range(1, 9):
+        log.stamp('7', 'message', {'id': n})
+
+    assert [data['id'] for _, data in log.since('7', log.epoch, 5)] == [6, 7, 8]
+    assert log.since('7', log.epoch, 8) == []
+    # Pushed out of the buffer, another process's numbers, or numbers from the future
+    assert log.since('7', log.epoch, 2) is None
+    assert log.since('7', 'restarted', 6) is None
+    assert log.since('7', log.epoch, 9) is None
+    print(f"Stats: {log.stats()}")
+    assert log.stats()['database_fallbacks'] == 3
+
+    log.shared = True
+    assert log.since('7', log.epoch, 7) is None
+
+def test_resume_replays_after_the_join():
+    print("\nRoom Log - Resume")
+    print("=" * 60)
+
+    log = make_log()
+    batcher, socketio = make_batcher(log, window_ms=1000, min_rate=1)
+    batcher.enabled = True
+    batcher.emit('message', {'id': 1}, 7)
+    batcher.emit('vote_updated', {'message_id': 1, 'likes': 1}, 7)  # waits in the open batch
+    calls = []
+
+    source = batcher.resume(7, 'sid-2', log.epoch, 1, join=lambda: calls.append('join'),
+                            load_missed=lambda: calls.append('database'))
+    reply = socketio.frames[-1]
+    print(f"Source: {source}, reply: {reply}")
+    # The open batch went out before the join; its events are in the reply
+    assert [f[0] for f in socketio.frames] == ['batch', 'resumed']
+    assert calls == ['join'] and source == 'log'
+    assert reply[2] == 'sid-2'
+    assert reply[1]['events'] == [['vote_updated', {'message_id': 1, 'likes': 1, 'seq': 2, 'epoch': log.epoch}]]
+    assert (reply[1]['epoch'], reply[1]['seq'], reply[1]['complete']) == (log.epoch, 2, True)
+
+def test_resume_falls_back_to_the_database():
+    print("\nRoom Log - Database Fallback")
+    print("=" * 60)
+
+    log = make_log()
+    batcher, socketio = make_batcher(log)
+    batcher.emit('message', {'id': 1}, 7)
+    stored = [['message', {'id': 41}], ['message', {'id': 42}]]
+
+    source = batcher.resume(7, 'sid-2', 'old-epoch', 30, join=lambda: None,
+                            load_missed=lambda: stored)
+    reply = socketio.frames[-1][1]
+    print(f"Source: {source}, reply: {reply}")
+    assert source == 'database'
+    assert reply['events'] == stored and reply['complete'] is False
+    # The client continues from this process's numbering
+    assert (reply['epoch'], reply['seq']) == (log.epoch, 1)
+
+    # With a shared message queue even an up-to-date client gets the partial database reply
+    log.shared = True
+    source = batcher.resume(7, 'sid-3', log.epoch, 1, join=lambda: None, load_missed=lambda: [])
+    reply = socketio.frames[-1][1]
+    assert source == 'database' and reply['events'] == [] and reply['complete'] is False
+
+if __name__ == "__main__":
+    test_events_are_numbered_per_room()
+    test_since_answers_only_what_it_has()
+    test_resume_replays_after_the_join()
+    test_resume_falls_back_to_the_database()
@@ -0,0 +1,68 @@
+import random
+from app.rule_matcher import RuleMatcher
+from app.text_analysis import EMOTION_PATTERNS, INTENT_EXAMPLES, EMOTION_MATCHER, INTENT_MATCHER
+
+# Sample messages
+test_messages = [
+    "I'm so happy and excited about this!",
+    "This is amazing, wow 😮",
+    "I love it, I really love this place ❤️",
+    "Could you please help me with this?",
+    "Thanks a lot, see you later",
+    "I hate waiting, I'm so frustrated and sad",
+    "nothing to see here",
+    ""
+]
+
+def naive_emotions(text_lower):
+    counts = {}
+    for emotion, patterns in EMOTION_PATTERNS.items():
+        for pattern in patterns:
+            if pattern in text_lower:
+                counts[emotion] = counts.get(emotion, 0) + 1
+    return counts
+
+def naive_intent(text_lower):
+    for intent, examples in INTENT_EXAMPLES.items():
+        for example in examples:
+            if example.lower() in text_lower:
+                return intent
+    return None
+
+def test_rule_matcher_matches_naive_scan():
+    print("\nRule Matcher - Same Results as Substring Scan")
+    print("=" * 60)
+    
+    for text in test_messages:
+        text_lower = text.lower()
+        counts = EMOTION_MATCHER.counts(text_lower)
+        intent = INTENT_MATCHER.first_label(text_lower)
+        print(f"{text!r}: emotions={counts} intent={intent}")
+        # Same counts in the same order (ties pick the first emotion)
+        assert list(counts.items()) == list(naive_emotions(text_lower).items())
+        assert intent == naive_intent(text_lower)
+    
+    # Random text built from pattern fragments exercises overlapping matches
+    random.seed(7)
+    fragments = [p for patterns in EMOTION_PATTERNS.values() for p in patterns]
+    fragments += [e.lower() for examples in INTENT_EXAMPLES.values() for e in examples]
+    fragments += [' ', 'a', 'x', 'lo', 'ha', 'ppy']
+    for _ in range(500):
+        text = ''.join(random.choice(fragments)[:random.randint(1, 12)] for _ in range(10))
+        assert list(EMOTION_MATCHER.counts(text).items()) == list(naive_emotions(text).items())
+        assert INTENT_MATCHER.first_label(text) == naive_intent(text)
+
+def test_rule_matcher_overlapping_patterns():
+    print("\nRule Matcher - Overlapping Patterns")
+    print("=" * 60)
+    
+    matcher = RuleMatcher({'a': ['he', 'she', 'hers'], 'b': ['his', 'she']})
+    hits = matcher.find('ushers')
+    print(f"'ushers': {hits}")
+    assert hits == {'a': ['he', 'she', 'hers'], 'b': ['she']}
+    assert matcher.first_label('this') == 'b'
+    assert matcher.find('nothing') == {}
+
+if __name__ == "__main__":
+    test_rule_matcher_matches_naive_scan()
+    test_rule_matcher_overlapping_patterns()
@@ -0,0 +1,121 @@
+import os
+import queue
+import tempfile
+import threading
+
+from app.socket_queue import FileQueueManager, LocalQueueManager, make_client_manager
+
+# Messages as Flask-SocketIO publishes them for a room broadcast
+broadcasts = [
+    {'method': 'emit', 'event': 'message', 'data': {'content': f'hello {n}'}, 'namespace': '/', 'room': '7'}
+    for n in range(3)
+]
+
+def collect(manager, received, count):
+    """Read count messages from the manager's listener on a background thread"""
+    def run():
+        for message in manager._listen():
+            received.put(message)
+            count[0] -= 1
+            if count[0] == 0:
+                return
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    return thread
+
+def test_file_queue_fan_out():
+    print("\nSocket Queue - File Queue Between Managers")
+    print("=" * 60)
+
+    with tempfile.TemporaryDirectory() as directory:
+        url = f"file://{os.path.join(directory, 'bus.jsonl')}"
+        publisher = FileQueueManager(url, channel='chat')
+        subscriber = FileQueueManager(url, channel='chat')
+        other_channel = FileQueueManager(url, channel='other')
+
+        received = queue.Queue()
+        thread = collect(subscriber, received, [len(broadcasts)])
+        threading.Event().wait(0.1)  # listener is at the end of the file
+
+        other_channel._publish({'method': 'emit', 'event': 'ignored'})
+        for message in broadcasts:
+            publisher._publish(message)
+        thread.join(timeout=5)
+
+        messages = [received.get_nowait() for _ in range(received.qsize())]
+        print(f"Received: {[m['data']['content'] for m in messages]}")
+        assert messages == broadcasts
+
+def test_file_queue_rotation():
+    print("\nSocket Queue - File Queue Rotation")
+    print("=" * 60)
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'bus.jsonl')
+        publisher = FileQueueManager(f"file://{path}", channel='chat', max_bytes=400)
+        publisher.keep_segments = 10
+        subscriber = FileQueueManager(f"file://{path}", channel='chat')
+        sent = [{'method': 'emit', 'event': 'message', 'data': {'content': f'hello {n}'}, 'room': '7'}
+                for n in range(20)]
+
+        received = queue.Queue()
+        thread = collect(subscriber, received, [len(sent)])
+        threading.Event().wait(0.1)
+        # No pause between publishes: the reader wakes up several rotations behind
+        for message in sent:
+            publisher._publish(message)
+        thread.join(timeout=5)
+
+        messages = [received.get_nowait() for _ in range(received.qsize())]
+        files = sorted(os.listdir(directory))
+        print(f"Rotations: {publisher.rotations}, received {len(messages)} of {len(sent)}, files: {files}")
+        assert publisher.rotations >= 3
+        assert messages == sent
+        assert all(os.path.getsize(os.path.join(directory, name)) < 400 + 200 for name in files)
+
+        # Only the last keep_segments rotated segments stay on disk
+        os.makedirs(os.path.join(directory, 'short'))
+        publisher = FileQueueManager(f"file://{os.path.join(directory, 'short', 'bus.jsonl')}", max_bytes=400)
+        publisher.keep_segments = 2
+        for message in sent:
+            publisher._publish(message)
+        files = sorted(os.listdir(os.path.join(directory, 'short')))
+        assert files == ['bus.jsonl'] + [f'bus.jsonl.{n}' for n in (publisher.rotations - 2, publisher.rotations - 1)]
+
+def test_local_queue_fan_out():
+    print("\nSocket Queue - Local Queue")
+    print("=" * 60)
+
+    publisher = LocalQueueManager(channel='local-test')
+    subscribers = [LocalQueueManager(channel='local-test') for _ in range(2)]
+    received = [queue.Queue() for _ in subscribers]
+    threads = [collect(s, r, [1]) for s, r in zip(subscribers, received)]
+    threading.Event().wait(0.1)
+
+    publisher._publish(broadcasts[0])
+    for thread in threads:
+        thread.join(timeout=5)
+    print(f"Subscribers reached: {sum(r.qsize() for r in received)}")
+    assert all(r.get_nowait() == broadcasts[0] for r in received)
+
+def test_make_client_manager():
+    print("\nSocket Queue - Backend Selection")
+    print("=" * 60)
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'queues', 'bus.jsonl')
+        manager = make_client_manager(f'file://{path}', channel='chat')
+        assert isinstance(manager, FileQueueManager)
+        assert manager.channel == 'chat' and os.path.exists(path)
+
+    assert isinstance(make_client_manager('local://'), LocalQueueManager)
+    # Redis and Kombu URLs are left to Flask-SocketIO
+    assert make_client_manager('redis://localhost:6379/0') is None
+    assert make_client_manager('') is None
+    print("file:// and local:// handled here, others by Flask-SocketIO")
+
+if __name__ == "__main__":
+    test_file_queue_fan_out()
+    test_file_queue_rotation()
+    test_local_queue_fan_out()
+    test_make_client_manager()
@@ -0,0 +1,98 @@
+from app.socket_router import EventRouter, LATENCY_BUCKETS_MS
+
+# Events the chat client relies on; each must have exactly one handler
+chat_events = {
+    'connect', 'disconnect', 'join', 'resume', 'leave', 'message', 'answer', 'start_answer',
+    'cancel_answer', 'get_answers', 'get_question_details', 'rate_answer',
+    'accept_answer', 'vote_message'
+}
+
+def build_router(log):
+    router = EventRouter()
+
+    def errors(call, next_fn):
+        try:
+            return next_fn(call)
+        except ValueError:
+            call.outcome = 'error'
+            log.append(('error', call.event))
+
+    def auth(call, next_fn):
+        if call.options['auth'] and not call.data.get('user'):
+            call.outcome = 'unauthenticated'
+            return None
+        return next_fn(call)
+
+    router.use(errors)
+    router.use(auth)
+    return router
+
+def test_router_middleware_chain():
+    print("\nSocket Router - Middleware Chain")
+    print("=" * 60)
+
+    log = []
+    router = build_router(log)
+
+    @router.on('message')
+    def handle_message(data):
+        if data.get('content') == 'boom':
+            raise ValueError('boom')
+        log.append(('message', data['content']))
+        return 'saved'
+
+    @router.on('connect', auth=False)
+    def handle_connect():
+        log.append(('connect',))
+
+    assert router.dispatch('message', {'user': 1, 'content': 'hi'}) == 'saved'
+    assert router.dispatch('message', {'content': 'anonymous'}) is None
+    router.dispatch('message', {'user': 1, 'content': 'boom'})
+    # Flask-SocketIO passes the auth payload to connect; the handler takes none
+    router.dispatch('connect', {'token': 'x'})
+    print(f"Log: {log}")
+    assert log == [('message', 'hi'), ('error', 'message'), ('connect',)]
+
+    metrics = router.metrics()
+    print(f"Metrics: {metrics['message']}")
+    assert metrics['message']['calls'] == 3
+    assert metrics['message']['errors'] == 1
+    assert metrics['message']['outcomes'] == {'ok': 1, 'unauthenticated': 1, 'error': 1}
+    assert metrics['message']['p95_ms'] <= LATENCY_BUCKETS_MS[-1]
+    assert sum(metrics['message']['histogram'].values()) == 3
+
+def test_router_rejects_duplicate_handlers():
+    print("\nSocket Router - One Handler per Event")
+    print("=" * 60)
+
+    router = EventRouter()
+
+    @router.on('join')
+    def first(data):
+        pass
+
+    try:
+        @router.on('join')
+        def second(data):
+            pass
+    except ValueError as e:
+        print(f"Rejected: {e}")
+    else:
+        assert False, "duplicate handler was accepted"
+
+def test_chat_events_registered_once():
+    print("\nSocket Router - Chat Handlers")
+    print("=" * 60)
+
+    from app import events
+    from app.socket_router import event_router
+
+    print(f"Events: {sorted(event_router.handlers)}")
+    assert set(event_router.handlers) == chat_events
+    assert all(handler.__module__ == 'app.events' for handler, _ in event_router.handlers.values())
+    assert event_router.handlers['message'][1]['rate_limit'] == 'message'
+
+if __name__ == "__main__":
+    test_router_middleware_chain()
+    test_router_rejects_duplicate_handlers()
+    test_chat_events_registered_once()
@@ -0,0 +1,19 @@
+from app.cli import measure_startup, STARTUP_BUDGET_SECONDS
+
+def test_startup_time():
+    print("\nApp Startup Budget")
+    print("=" * 60)
+    
+    report = measure_startup()
+    
+    print(f"Startup time: {report['startup_seconds']:.3f}s (budget {STARTUP_BUDGET_SECONDS:.1f}s)")
+    print(f"Import time: {report['import_seconds']:.3f}s")
+    print(f"Heavy modules imported: {report['heavy_modules'] or 'none'}")
+    
+    # The ML stack must only load when a model is first used
+    assert report['heavy_modules'] == [], f"Heavy modules imported at startup: {report['heavy_modules']}"
+    assert report['startup_seconds'] <= STARTUP_BUDGET_SECONDS, \
+        f"Startup took {report['startup_seconds']:.3f}s, over the {STARTUP_BUDGET_SECONDS:.1f}s budget"
+
+if __name__ == "__main__":
+    test_startup_time()
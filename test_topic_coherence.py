@@ -0,0 +1,63 @@
+import numpy as np
+from app.text_analysis import TextAnalyzer
+
+# Fake word vectors: related words point the same way
+word_vectors = {
+    'price': [1.0, 0.1, 0.0],
+    'discount': [0.9, 0.2, 0.0],
+    'offer': [1.0, 0.0, 0.1],
+    'weather': [0.0, 1.0, 0.0],
+    'rain': [0.1, 0.9, 0.0]
+}
+
+class FakeEmbedder:
+    def __init__(self):
+        self.calls = []
+
+    def embed_words(self, words, verbose=False):
+        self.calls.append(list(words))
+        return np.array([word_vectors[w] for w in words])
+
+class FakeTopicModel:
+    def __init__(self):
+        self.embedding_model = FakeEmbedder()
+
+def naive_coherence(vectors):
+    vectors = [np.array(v) / np.linalg.norm(v) for v in vectors]
+    total, count = 0.0, 0
+    for i in range(len(vectors)):
+        for j in range(i + 1, len(vectors)):
+            total += float(vectors[i] @ vectors[j])
+            count += 1
+    return total / count
+
+def test_topic_coherence_vectorized():
+    print("\nTopic Coherence - Vectorized Upper Triangle Mean")
+    print("=" * 60)
+    
+    analyzer = TextAnalyzer()
+    words = ['price', 'discount', 'offer']
+    coherence = analyzer.calculate_topic_coherence(words, [word_vectors[w] for w in words])
+    mixed = analyzer.calculate_topic_coherence(['price', 'rain'], [word_vectors['price'], word_vectors['rain']])
+    print(f"Coherent topic: {coherence:.3f}, mixed topic: {mixed:.3f}")
+    assert abs(coherence - naive_coherence([word_vectors[w] for w in words])) < 1e-9
+    assert coherence > mixed
+    assert analyzer.calculate_topic_coherence(['price'], [word_vectors['price']]) == 0.0
+
+def test_topic_word_embeddings_cached():
+    print("\nTopic Coherence - Cached Word Embeddings")
+    print("=" * 60)
+    
+    analyzer = TextAnalyzer()
+    model = FakeTopicModel()
+    first = analyzer.embed_words(model, ['price', 'discount', 'offer'])
+    second = analyzer.embed_words(model, ['price', 'weather', 'rain', 'weather'])
+    print(f"Embedding calls: {model.embedding_model.calls}")
+    # Only words not seen before are encoded, once each
+    assert model.embedding_model.calls == [['price', 'discount', 'offer'], ['weather', 'rain']]
+    assert first.shape == (3, 3) and second.shape == (4, 3)
+    assert np.allclose(second[0], word_vectors['price'])
+
+if __name__ == "__main__":
+    test_topic_coherence_vectorized()
+    test_topic_word_embeddings_cached()
@@ -0,0 +1,87 @@
+import tempfile
+import threading
+import time
+
+from app import db
+from app.models import Message, MessageVote
+from app.room_batch import RoomBatcher
+from app.vote_broadcast import VoteBroadcaster
+from testing_helpers import FakeSocketIO, make_app
+
+def make_votes_app(directory, users=20):
+    """App with users and a message to vote on; returns (app, user ids, message id, room id)"""
+    app, people, room_id = make_app(directory, users=users)
+    with app.app_context():
+        message = Message(content='Which card has no annual fee?', user_id=people[0], room_id=room_id)
+        db.session.add(message)
+        db.session.commit()
+        return app, people, message.id, room_id
+
+def vote(app, message_id, user_id, vote_type):
+    with app.app_context():
+        result = db.session.get(Message, message_id).vote(user_id, vote_type)
+        db.session.remove()
+        return result
+
+def test_concurrent_votes_are_not_lost():
+    print("\nVotes - Concurrent Clicks")
+    print("=" * 60)
+
+    with tempfile.TemporaryDirectory() as directory:
+        app, users, message_id, _ = make_votes_app(directory)
+        threads = [threading.Thread(target=vote, args=(app, message_id, user_id, 'like')) for user_id in users]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        with app.app_context():
+            message = db.session.get(Message, message_id)
+            print(f"Likes after {len(users)} concurrent likes: {message.likes}")
+            assert message.likes == len(users)
+            assert MessageVote.query.count() == len(users)
+
+def test_vote_toggle_and_switch():
+    print("\nVotes - Toggle and Switch")
+    print("=" * 60)
+
+    with tempfile.TemporaryDirectory() as directory:
+        app, users, message_id, _ = make_votes_app(directory, users=2)
+        assert vote(app, message_id, users[0], 'like') == (1, 0)
+        assert vote(app, message_id, users[1], 'like') == (2, 0)
+        # Switching moves the vote, clicking again removes it
+        assert vote(app, message_id, users[0], 'dislike') == (1, 1)
+        assert vote(app, message_id, users[0], 'dislike') == (1, 0)
+        with app.app_context():
+            assert MessageVote.query.count() == 1
+
+def test_vote_broadcasts_are_coalesced():
+    print("\nVotes - Coalesced Broadcasts")
+    print("=" * 60)
+
+    with tempfile.TemporaryDirectory() as directory:
+        app, users, message_id, room_id = make_votes_app(directory)
+        socketio = FakeSocketIO()
+        batcher = RoomBatcher()
+        batcher.init_app(app, socketio)
+        broadcaster = VoteBroadcaster()
+        broadcaster.init_app(app, socketio, batcher)
+        broadcaster.interval_ms = 100
+
+        for user_id in users:
+            likes, dislikes = vote(app, message_id, user_id, 'like')
+            broadcaster.publish(message_id, room_id, likes, dislikes)
+        time.sleep(0.4)
+
+        print(f"{len(users)} votes, {len(socketio.frames)} broadcasts: {socketio.frames}")
+        assert 1 < len(socketio.frames) < len(users)
+        # The first vote goes out at once, the last broadcast has the final counts
+        assert socketio.frames[0][1]['likes'] == 1
+        assert socketio.frames[-1] == ('vote_updated', {'message_id': message_id, 'likes': len(users),
+                                                         'dislikes': 0}, str(room_id), None)
+        assert broadcaster.stats()['pending'] == 0
+
+if __name__ == "__main__":
+    test_concurrent_votes_are_not_lost()
+    test_vote_toggle_and_switch()
+    test_vote_broadcasts_are_coalesced()
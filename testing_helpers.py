@@ -0,0 +1,44 @@
+"""
+Shared helpers of the test_*.py scripts: an app on a throwaway SQLite
+database and a Socket.IO stand-in that records emits.
+"""
+import os
+import threading
+import time
+
+from flask import Flask
+
+from app import db
+from app.models import Room, User
+
+def make_app(directory, users=3):
+    """App on directory/app.db with users user0.. (or the given usernames) and one room.
+
+    Returns (app, user ids, room id).
+    """
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{os.path.join(directory, 'app.db')}"
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {'connect_args': {'timeout': 30}}
+    db.init_app(app)
+    names = [f'user{n}' for n in range(users)] if isinstance(users, int) else list(users)
+    with app.app_context():
+        db.create_all()
+        people = [User(username=name, email=f'{name}@example.com', state='Goa') for name in names]
+        room = Room(name='cards', description='Credit cards')
+        db.session.add_all(people + [room])
+        db.session.commit()
+        return app, [p.id for p in people], room.id
+
+class FakeSocketIO:
+    """Records emits as (event, data, room, skip_sid); background tasks are plain threads"""
+    def __init__(self):
+        self.frames = []
+
+    def emit(self, event, data, room=None, skip_sid=None):
+        self.frames.append((event, data, room, skip_sid))
+
+    def start_background_task(self, target):
+        threading.Thread(target=target, daemon=True).start()
+
+    def sleep(self, seconds):
+        time.sleep(seconds)
@@ -0,0 +1,32 @@
+"""
+Production entry point
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+    python wsgi.py                          # same serving mode, no gunicorn
+
+With SOCKETIO_ASYNC_MODE=eventlet or gevent the standard library is monkey
+patched here, before Flask, SQLAlchemy or the app are imported - patching
+any later leaves locks and sockets created at import time blocking. Use
+run.py for development and for `flask` CLI commands.
+"""
+import os
+
+mode = os.environ.get('SOCKETIO_ASYNC_MODE', 'threading').lower()
+if mode == 'eventlet':
+    import eventlet
+    eventlet.monkey_patch()
+elif mode == 'gevent':
+    from gevent import monkey
+    monkey.patch_all()
+
+from app import create_app, socketio
+
+app = create_app()
+
+if __name__ == '__main__':
+    host, _, port = os.environ.get('GUNICORN_BIND', '0.0.0.0:8000').rpartition(':')
+    options = {'allow_unsafe_werkzeug': True} if mode == 'threading' else {}
+    if mode == 'eventlet':
+        # eventlet's server otherwise stops accepting at 1024 green threads
+        options['max_size'] = int(os.environ.get('GUNICORN_WORKER_CONNECTIONS', 5000))
+    socketio.run(app, host=host, port=int(port), **options)